@@ -0,0 +1,94 @@
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+import subprocess
+
+# Runs the shared-folder job queue with several local worker processes on a temporary folder and checks that every
+# job runs exactly once: fake jobs record each completed run, and one job starts out claimed by a worker that
+# "crashed" (its claim has an old heartbeat), so it has to be re-queued and picked up by a live worker.
+#
+# Usage: python benchmarks/checkJobQueue.py [--workers 4] [--jobs 40]
+#        python benchmarks/checkJobQueue.py --worker <queue folder>   (started by the check itself)
+
+benchmarks_dir = os.path.dirname(os.path.abspath(__file__))
+repo_dir = os.path.dirname(benchmarks_dir)
+sys.path.append(os.path.join(repo_dir, "src"))
+
+import jobQueue
+
+STALE_AFTER = 3
+
+# Fake job: sleep a little, then record the completed run as <runs>/<job id>.<pid>
+FAKE_JOB = "import os, sys, time; time.sleep(float(sys.argv[3])); open(os.path.join(sys.argv[1], sys.argv[2] + '.' + str(os.getpid())), 'w').close()"
+
+def build_command(job):
+    return [sys.executable, '-c', FAKE_JOB, job['runs'], job['id'], str(job['seconds'])]
+
+def run_worker(queue_dir):
+    worker = jobQueue.QueueWorker(queue_dir, build_command, heartbeat_interval=0.5, stale_after=STALE_AFTER, poll_interval=0.2)
+    results = worker.run()
+    sys.exit(0 if all(result['returncode'] == 0 for result in results) else 1)
+
+def check(workers, job_count):
+    folder = tempfile.mkdtemp(prefix="autorender_queue_")
+    queue_dir = os.path.join(folder, 'queue')
+    runs_dir = os.path.join(folder, 'runs')
+    os.makedirs(runs_dir)
+    try:
+        jobs = [(f"job{i:03d}", {'id': f"job{i:03d}", 'runs': runs_dir, 'seconds': 0.05 + 0.01 * (i % 5)}) for i in range(job_count)]
+        jobQueue.submit_jobs(queue_dir, jobs)
+
+        # A worker that died while holding job000: its claim stopped receiving heartbeats long ago
+        stale_claim = os.path.join(queue_dir, 'claimed', "job000@crashed-worker.json")
+        os.rename(os.path.join(queue_dir, 'pending', "job000.json"), stale_claim)
+        old = jobQueue.get_queue_time(queue_dir) - 10 * STALE_AFTER
+        os.utime(stale_claim, (old, old))
+
+        start = time.time()
+        processes = [subprocess.Popen([sys.executable, os.path.abspath(__file__), '--worker', queue_dir],
+                                      stdout=subprocess.DEVNULL) for _ in range(workers)]
+        returncodes = [process.wait(timeout=300) for process in processes]
+        seconds = time.time() - start
+
+        runs = {}
+        for file_name in os.listdir(runs_dir):
+            job_id = file_name.split('.')[0]
+            runs[job_id] = runs.get(job_id, 0) + 1
+
+        problems = []
+        if any(returncodes):
+            problems.append(f"worker exit codes {returncodes}")
+        for job_id, _ in jobs:
+            if runs.get(job_id, 0) != 1:
+                problems.append(f"{job_id} ran {runs.get(job_id, 0)} times")
+        status = jobQueue.queue_status(queue_dir)
+        if status != {'pending': 0, 'claimed': 0, 'done': job_count, 'failed': 0}:
+            problems.append(f"queue ended as {status}")
+
+        print(f"{workers} workers ran {sum(runs.values())} runs of {job_count} jobs in {seconds:.1f}s, queue: {status}")
+        return problems
+    finally:
+        shutil.rmtree(folder, ignore_errors=True)
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Check that the shared-folder job queue runs every job exactly once.")
+    parser.add_argument('--workers', type=int, default=4, help='Number of local worker processes')
+    parser.add_argument('--jobs', type=int, default=40, help='Number of fake jobs')
+    parser.add_argument('--worker', type=str, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args.worker)
+
+    problems = check(args.workers, args.jobs)
+    for problem in problems:
+        print("FAILED: " + problem)
+    if problems:
+        sys.exit(1)
+    print("Every job was claimed and run exactly once, including the re-queued stale claim.")
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,110 @@
+import os
+import sys
+import zlib
+import shutil
+import struct
+import argparse
+import tempfile
+
+# Pipes a few PNG frames through the streaming video encoder and checks the result: the encoder received every
+# frame, and the frames are deleted only when keep_frames is off and only after the encoder exited successfully.
+# Uses the stub encoder from src/optionalScripts by default, or ffmpeg from the PATH with --ffmpeg. The stub writes
+# no real video, so it must always keep the frames.
+#
+# Usage: python benchmarks/checkVideoEncoder.py [--frames 8] [--ffmpeg]
+
+benchmarks_dir = os.path.dirname(os.path.abspath(__file__))
+repo_dir = os.path.dirname(benchmarks_dir)
+sys.path.append(os.path.join(repo_dir, "src"))
+
+import videoEncoder
+import frameWriter
+
+def write_frame(path, frame, width=64, height=48):
+    row = bytes((frame * 7 + x) % 256 for x in range(width * 3))
+    image_data = zlib.compress(b''.join(b'\x00' + row for _ in range(height)))
+    header = struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0)
+    frameWriter.write_png(path, [(b'IHDR', header), (b'IDAT', image_data), (b'IEND', b'')])
+
+def render_frames(camera_dir, count):
+    os.makedirs(camera_dir, exist_ok=True)
+    paths = []
+    for frame in range(1, count + 1):
+        paths.append(os.path.join(camera_dir, f"frame_{frame:04d}.png"))
+        write_frame(paths[-1], frame)
+    return paths
+
+def stream(folder, count, keep_frames, use_ffmpeg, fail=False):
+    """
+    Stream `count` frames of one camera through a VideoStreamSink.
+
+    :param fail: Kill the encoder after the first frame.
+    :return: (finish() result, frame paths, encoder)
+    """
+    sink = videoEncoder.VideoStreamSink(25, keep_frames=keep_frames, stub_encoder=not use_ffmpeg)
+    paths = render_frames(os.path.join(folder, "Cam"), count)
+    for frame, path in enumerate(paths, start=1):
+        sink.frame_written("Cam", frame, path)
+        if fail and frame == 1:
+            # The first frame started the encoder; let it die mid-stream
+            sink.encoders["Cam"].process.kill()
+            sink.encoders["Cam"].process.wait()
+    encoder = sink.encoders["Cam"]
+    return sink.finish(), paths, encoder
+
+def count_stub_frames(output_path):
+    with open(output_path, 'rb') as f:
+        return f.read().count(frameWriter.PNG_SIGNATURE)
+
+def check(count, use_ffmpeg):
+    problems = []
+    folder = tempfile.mkdtemp(prefix="autorender_encoder_")
+    try:
+        for keep_frames in (False, True):
+            case = os.path.join(folder, f"keep_{keep_frames}")
+            success, paths, encoder = stream(case, count, keep_frames, use_ffmpeg)
+            kept = sum(os.path.exists(path) for path in paths)
+            if not success:
+                problems.append(f"keep_frames={keep_frames}: encoder failed")
+            if encoder.frames != count:
+                problems.append(f"keep_frames={keep_frames}: encoder took {encoder.frames} of {count} frames")
+            if not use_ffmpeg and count_stub_frames(encoder.output_path) != count:
+                problems.append(f"keep_frames={keep_frames}: stub output holds {count_stub_frames(encoder.output_path)} of {count} frames")
+            if kept != (count if keep_frames or not use_ffmpeg else 0):
+                problems.append(f"keep_frames={keep_frames}: {kept} of {count} frames left on disk")
+            print(f"keep_frames={keep_frames}: encoded {encoder.frames} frames into {os.path.basename(encoder.output_path)}, {kept} frames kept")
+
+        # A failed encoder must never cost the frames
+        success, paths, encoder = stream(os.path.join(folder, "failed"), count, False, use_ffmpeg, fail=True)
+        kept = sum(os.path.exists(path) for path in paths)
+        if success:
+            problems.append("failed encoder: finish() reported success")
+        if kept != count:
+            problems.append(f"failed encoder: only {kept} of {count} frames left on disk")
+        print(f"failed encoder: {kept} of {count} frames kept")
+    finally:
+        shutil.rmtree(folder, ignore_errors=True)
+    return problems
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Check the streaming video encoder with the stub encoder or ffmpeg.")
+    parser.add_argument('--frames', type=int, default=8, help='Number of frames to stream')
+    parser.add_argument('--ffmpeg', action='store_true', help='Use ffmpeg from the PATH instead of the stub encoder')
+    args = parser.parse_args()
+
+    if args.ffmpeg and not videoEncoder.find_ffmpeg():
+        print("ffmpeg not found on the PATH")
+        sys.exit(1)
+
+    problems = check(args.frames, args.ffmpeg)
+    for problem in problems:
+        print("FAILED: " + problem)
+    if problems:
+        sys.exit(1)
+    if args.ffmpeg:
+        print("The encoder received every frame, and frames were only deleted after a successful encode without keep_frames.")
+    else:
+        print("The stub encoder received every frame and never cost a frame.")
+
+if __name__ == "__main__":
+    main_cli()
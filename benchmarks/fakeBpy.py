@@ -0,0 +1,395 @@
+import sys
+import math
+import types
+import numpy as np
+
+# Lightweight stand-in for the parts of the bpy API the render pipeline's hot paths touch: ID collections,
+# actions and F-Curves with bulk keyframe access, objects with animation data, armatures with bones, pose bones
+# and edit bones, scene frame evaluation and the few operators used. It only models what those code paths need,
+# with costs that scale the same way (e.g. frame_set evaluates every animated object, keyframe_insert moves the
+# keys after the insert position), so algorithmic changes show up in the benchmarks.
+#
+# Call install() before importing any module from src/.
+
+class IDProperties:
+    """
+    Custom properties (obj["name"] = value) as found on every ID.
+    """
+    def __init__(self):
+        self.properties = {}
+
+    def get(self, key, default=None):
+        return self.properties.get(key, default)
+
+    def __getitem__(self, key):
+        return self.properties[key]
+
+    def __setitem__(self, key, value):
+        self.properties[key] = value
+
+    def __delitem__(self, key):
+        del self.properties[key]
+
+    def __contains__(self, key):
+        return key in self.properties
+
+class IDCollection:
+    """
+    Name-indexed collection like bpy.data.objects or collection.objects: iterates over values, supports lookup and
+    membership by name.
+    """
+    def __init__(self, factory=None):
+        self.items = {}
+        self.factory = factory
+
+    def __iter__(self):
+        return iter(list(self.items.values()))
+
+    def __len__(self):
+        return len(self.items)
+
+    def __contains__(self, key):
+        if isinstance(key, str):
+            return key in self.items
+        return any(item is key for item in self.items.values())
+
+    def __getitem__(self, key):
+        if isinstance(key, int):
+            return list(self.items.values())[key]
+        return self.items[key]
+
+    def get(self, name, default=None):
+        return self.items.get(name, default)
+
+    def keys(self):
+        return self.items.keys()
+
+    def values(self):
+        return self.items.values()
+
+    def link(self, item):
+        self.items[item.name] = item
+
+    def unlink(self, item):
+        self.items.pop(item.name, None)
+
+    def new(self, name, *args, **kwargs):
+        item = self.factory(name, *args, **kwargs)
+        self.items[item.name] = item
+        return item
+
+    def remove(self, item, *args, **kwargs):
+        self.items.pop(item.name, None)
+
+class KeyframePoints:
+    """
+    Keyframes of an F-Curve, stored as an (N, 2) array of (frame, value).
+    """
+    def __init__(self):
+        self.co = np.empty((0, 2), dtype=np.float64)
+
+    def __len__(self):
+        return len(self.co)
+
+    def add(self, count):
+        self.co = np.concatenate([self.co, np.zeros((count, 2))])
+
+    def clear(self):
+        self.co = np.empty((0, 2), dtype=np.float64)
+
+    def foreach_get(self, attribute, array):
+        if attribute != 'co':
+            raise AttributeError(attribute)
+        array[:] = self.co.ravel()
+
+    def foreach_set(self, attribute, array):
+        if attribute != 'co':
+            raise AttributeError(attribute)
+        self.co = np.asarray(array, dtype=np.float64).reshape(-1, 2).copy()
+
+    def insert(self, frame, value):
+        # Like Blender: binary search for the position, replace an existing key or move the later keys up
+        index = int(np.searchsorted(self.co[:, 0], frame))
+        if index < len(self.co) and self.co[index, 0] == frame:
+            self.co[index, 1] = value
+        else:
+            self.co = np.insert(self.co, index, (frame, value), axis=0)
+
+class FCurve:
+    def __init__(self, data_path, index=0, action_group=""):
+        self.data_path = data_path
+        self.array_index = index
+        self.group = action_group
+        self.keyframe_points = KeyframePoints()
+
+    def update(self):
+        self.keyframe_points.co = self.keyframe_points.co[np.argsort(self.keyframe_points.co[:, 0], kind='stable')]
+
+    def evaluate(self, frame):
+        co = self.keyframe_points.co
+        if not len(co):
+            return 0.0
+        return float(np.interp(frame, co[:, 0], co[:, 1]))
+
+class FCurves(list):
+    def find(self, data_path, index=0):
+        for fcurve in self:
+            if fcurve.data_path == data_path and fcurve.array_index == index:
+                return fcurve
+        return None
+
+    def new(self, data_path, index=0, action_group=""):
+        fcurve = FCurve(data_path, index, action_group)
+        self.append(fcurve)
+        return fcurve
+
+class Action(IDProperties):
+    def __init__(self, name):
+        super().__init__()
+        self.name = name
+        self.fcurves = FCurves()
+
+    @property
+    def frame_range(self):
+        frames = [fc.keyframe_points.co[:, 0] for fc in self.fcurves if len(fc.keyframe_points)]
+        if not frames:
+            return (0.0, 0.0)
+        return (min(f.min() for f in frames), max(f.max() for f in frames))
+
+class AnimationData:
+    def __init__(self):
+        self.action = None
+
+class Matrix:
+    """
+    Minimal mathutils.Matrix: a numpy array with to_3x3().
+    """
+    def __init__(self, values):
+        self.values = np.asarray(values, dtype=np.float64)
+
+    def to_3x3(self):
+        return Matrix(self.values[:3, :3])
+
+class Bone:
+    def __init__(self, name, head, tail, matrix):
+        self.name = name
+        self.head_local = tuple(head)
+        self.tail_local = tuple(tail)
+        self.matrix_local = Matrix(matrix)
+
+    @staticmethod
+    def AxisRollFromMatrix(matrix, axis=None):
+        m = matrix.values
+        return tuple(m[:, 1]), math.atan2(m[0, 2], m[2, 2])
+
+class EditBone:
+    def __init__(self, name, roll=0.0):
+        self.name = name
+        self.roll = roll
+
+class Armature(IDProperties):
+    def __init__(self, name):
+        super().__init__()
+        self.name = name
+        self.bones = IDCollection()
+        self.edit_bones = IDCollection()
+
+    def build_edit_bones(self):
+        # Entering Edit Mode converts every bone into an edit bone
+        rolls = {bone.name: edit_bone.roll for bone, edit_bone in zip(self.bones, self.edit_bones)}
+        self.edit_bones = IDCollection()
+        for bone in self.bones:
+            self.edit_bones.link(EditBone(bone.name, rolls.get(bone.name, 0.0)))
+
+class Key:
+    def __init__(self):
+        self.animation_data = AnimationData()
+        self.key_blocks = IDCollection()
+
+class Mesh(IDProperties):
+    def __init__(self, name):
+        super().__init__()
+        self.name = name
+        self.shape_keys = None
+
+class Animatable(IDProperties):
+    """
+    Anything with location, rotation_euler and scale that can be keyed.
+    """
+    CHANNELS = ['location', 'rotation_euler', 'scale']
+
+    def __init__(self, name):
+        super().__init__()
+        self.name = name
+        self.location = [0.0, 0.0, 0.0]
+        self.rotation_euler = [0.0, 0.0, 0.0]
+        self.scale = [1.0, 1.0, 1.0]
+
+    def keyframe_insert(self, data_path, frame=None, index=-1):
+        owner, prefix = self.keyframe_owner()
+        if owner.animation_data is None:
+            owner.animation_data_create()
+        if owner.animation_data.action is None:
+            owner.animation_data.action = context.blend_data.actions.new(f"{owner.name}Action")
+        action = owner.animation_data.action
+        if frame is None:
+            frame = context.scene.frame_current
+
+        values = getattr(self, data_path)
+        for i, value in enumerate(values):
+            if index not in (-1, i):
+                continue
+            fcurve = action.fcurves.find(prefix + data_path, index=i)
+            if fcurve is None:
+                fcurve = action.fcurves.new(prefix + data_path, index=i)
+            fcurve.keyframe_points.insert(float(frame), float(value))
+        return True
+
+class Object(Animatable):
+    def __init__(self, name, data=None):
+        super().__init__(name)
+        self.data = data
+        if isinstance(data, Armature):
+            self.type = 'ARMATURE'
+            self.pose = types.SimpleNamespace(bones=IDCollection())
+            for bone in data.bones:
+                self.pose.bones.link(PoseBone(bone.name, self))
+        elif isinstance(data, Mesh):
+            self.type = 'MESH'
+        else:
+            self.type = 'EMPTY'
+        self.animation_data = None
+        self.modifiers = IDCollection()
+        self.constraints = IDCollection()
+        self.selected = False
+        self.mode = 'OBJECT'
+
+    def keyframe_owner(self):
+        return self, ""
+
+    def animation_data_create(self):
+        if self.animation_data is None:
+            self.animation_data = AnimationData()
+        return self.animation_data
+
+    def select_set(self, state):
+        self.selected = state
+
+    def evaluate(self, frame):
+        """
+        Set the animated channels to their values at a frame, like the depsgraph does on frame_set.
+        """
+        if self.animation_data is None or self.animation_data.action is None:
+            return
+        for fcurve in self.animation_data.action.fcurves:
+            channel = getattr(self, fcurve.data_path, None)
+            if isinstance(channel, list) and fcurve.array_index < len(channel):
+                channel[fcurve.array_index] = fcurve.evaluate(frame)
+
+class PoseBone(Animatable):
+    def __init__(self, name, armature_object):
+        super().__init__(name)
+        self.id_data = armature_object
+
+    def keyframe_owner(self):
+        return self.id_data, f'pose.bones["{self.name}"].'
+
+class Collection:
+    def __init__(self, name):
+        self.name = name
+        self.objects = IDCollection()
+        self.children = IDCollection()
+
+class Scene:
+    def __init__(self, name="Scene"):
+        self.name = name
+        self.frame_start = 1
+        self.frame_end = 250
+        self.frame_step = 1
+        self.frame_current = 1
+        self.collection = Collection("Scene Collection")
+        self.camera = None
+        self.render = types.SimpleNamespace(fps=30, fps_base=1.0, filepath="", use_persistent_data=False)
+
+    def frame_set(self, frame, subframe=0.0):
+        self.frame_current = frame
+        for obj in data.objects:
+            obj.evaluate(frame)
+
+class BlendData:
+    def __init__(self):
+        self.filepath = ""
+        self.objects = IDCollection(Object)
+        self.collections = IDCollection(Collection)
+        self.actions = IDCollection(Action)
+        self.armatures = IDCollection(Armature)
+        self.meshes = IDCollection(Mesh)
+
+class Context:
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.blend_data = BlendData()
+        self.scene = Scene()
+        self.selected_objects = []
+        layer_collection = types.SimpleNamespace(collection=self.scene.collection)
+        self.view_layer = types.SimpleNamespace(objects=types.SimpleNamespace(active=None), layer_collection=layer_collection, active_layer_collection=layer_collection)
+        self.preferences = types.SimpleNamespace(addons={})
+
+    @property
+    def object(self):
+        return self.view_layer.objects.active
+
+class ObjectOperators:
+    def mode_set(self, mode='OBJECT'):
+        obj = context.view_layer.objects.active
+        if mode == 'EDIT' and obj.mode != 'EDIT' and obj.type == 'ARMATURE':
+            obj.data.build_edit_bones()
+        obj.mode = mode
+        return {'FINISHED'}
+
+context = Context()
+data = context.blend_data
+
+def reset():
+    """
+    Start from an empty scene, like loading a new .blend file.
+    """
+    global data
+    context.reset()
+    data = context.blend_data
+    module = sys.modules.get('bpy')
+    if module is not None:
+        module.data = data
+
+def install():
+    """
+    Register this stand-in as the bpy module (with bpy.types, bpy.props, bpy.ops and bpy.app) in sys.modules.
+
+    :return: The fake bpy module.
+    """
+    if 'bpy' in sys.modules and getattr(sys.modules['bpy'], 'IS_FAKE_BPY', False):
+        return sys.modules['bpy']
+
+    bpy = types.ModuleType('bpy')
+    bpy.IS_FAKE_BPY = True
+    bpy.context = context
+    bpy.data = data
+
+    bpy.types = types.ModuleType('bpy.types')
+    bpy.types.Bone = Bone
+    bpy.types.Operator = type('Operator', (), {})
+    bpy.types.Panel = type('Panel', (), {})
+
+    bpy.props = types.ModuleType('bpy.props')
+    for prop in ['StringProperty', 'BoolProperty', 'IntProperty', 'FloatProperty', 'EnumProperty']:
+        setattr(bpy.props, prop, lambda *args, **kwargs: None)
+
+    bpy.ops = types.SimpleNamespace(object=ObjectOperators())
+    bpy.app = types.SimpleNamespace(handlers=types.SimpleNamespace(render_write=[], render_pre=[], render_post=[]), version=(4, 3, 0))
+
+    sys.modules['bpy'] = bpy
+    sys.modules['bpy.types'] = bpy.types
+    sys.modules['bpy.props'] = bpy.props
+    return bpy
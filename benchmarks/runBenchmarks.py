@@ -0,0 +1,152 @@
+import io
+import os
+import sys
+import json
+import shutil
+import time
+import argparse
+import tempfile
+import contextlib
+import statistics
+import numpy as np
+
+# Runs the hot paths of the render pipeline against synthetic workloads in the fakeBpy stand-in, without Blender
+# or a GPU, and reports how their run time scales with the workload size. The slope of the log-log fit is the
+# empirical complexity exponent: ~1 means linear, ~2 quadratic.
+#
+# Usage: python benchmarks/runBenchmarks.py [--only NAME ...] [--repeat 3] [--quick] [--output results.json]
+#        [--compare baseline.json]
+
+benchmarks_dir = os.path.dirname(os.path.abspath(__file__))
+repo_dir = os.path.dirname(benchmarks_dir)
+sys.path.append(benchmarks_dir)
+sys.path.append(os.path.join(repo_dir, "src"))
+sys.path.append(repo_dir)
+
+import fakeBpy
+fakeBpy.install()
+
+import workloads
+import importAnim as ia
+import bonerolls
+import jobCache
+import main
+
+# Temporary folders of the launch_blender benchmark, removed after the run
+temp_folders = []
+
+def setup_animation_range(bones, frames, shape_keys, trim_idle):
+    workloads.make_imported_animation(bones, frames, shape_keys)
+    importer = ia.AnimImporter()
+    importer.find_action_body()
+    importer.find_shape_key_animation()
+    return lambda: importer.get_animation_range(trim_idle=trim_idle)
+
+def setup_link_nodes(bones, frames, bulk):
+    workloads.make_node_animation(bones, frames)
+    transfer = ia.AnimationTransfer(None, None, fakeBpy.data.collections["mainAvatar"])
+    return lambda: transfer.link_animation_nodes_to_armature(bulk=bulk)
+
+def setup_copy_bone_rolls(bones, cached):
+    workloads.make_imported_animation(bones, 2, 0)
+    if cached:
+        # The target already carries the rolls of this source skeleton
+        bonerolls.copy_bone_rolls()
+    return lambda: bonerolls.copy_bone_rolls()
+
+def setup_launch_blender(files, jobs):
+    folder = tempfile.mkdtemp(prefix="autorender_bench_")
+    temp_folders.append(folder)
+    paths = workloads.make_input_folder(folder, files)
+    # Hash the inputs again on every repeat, like a fresh run of main.py
+    jobCache.file_hashes.clear()
+    return lambda: main.launch_blender(paths['blender'], paths['scene'], paths['input'], paths['output'], jobs=jobs, cache_dir=os.path.join(folder, '.cache'))
+
+# name: (size parameter, sizes, setup(size) -> callable to time)
+BENCHMARKS = {
+    'animation_range': ('bones', [16, 32, 64, 128, 256], lambda b: setup_animation_range(b, 500, 50, False)),
+    'animation_range_trim': ('frames', [250, 500, 1000, 2000, 4000], lambda f: setup_animation_range(64, f, 50, True)),
+    'link_nodes_bulk_bones': ('bones', [8, 16, 32, 64], lambda b: setup_link_nodes(b, 250, True)),
+    'link_nodes_bulk_frames': ('frames', [125, 250, 500, 1000], lambda f: setup_link_nodes(32, f, True)),
+    'link_nodes_per_frame': ('frames', [50, 100, 200, 400], lambda f: setup_link_nodes(8, f, False)),
+    'copy_bone_rolls': ('bones', [32, 64, 128, 256, 512], lambda b: setup_copy_bone_rolls(b, False)),
+    'copy_bone_rolls_cached': ('bones', [32, 64, 128, 256, 512], lambda b: setup_copy_bone_rolls(b, True)),
+    'launch_blender': ('files', [4, 8, 16, 32], lambda n: setup_launch_blender(n, 4)),
+}
+
+def time_call(setup, size, repeat):
+    """
+    Time a benchmark at one size. Every repeat gets a fresh workload; setup isn't timed.
+
+    :return: Median seconds.
+    """
+    timings = []
+    for _ in range(repeat):
+        with contextlib.redirect_stdout(io.StringIO()):
+            call = setup(size)
+            start = time.perf_counter()
+            call()
+            timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+def scaling_exponent(sizes, seconds):
+    """
+    Slope of the least squares fit of log(seconds) over log(size).
+    """
+    if len(sizes) < 2 or min(seconds) <= 0:
+        return None
+    return float(np.polyfit(np.log(sizes), np.log(seconds), 1)[0])
+
+def run_benchmark(name, repeat, quick):
+    parameter, sizes, setup = BENCHMARKS[name]
+    if quick:
+        sizes = sizes[:3]
+
+    seconds = []
+    print(f"\n{name} (scaling over {parameter}):")
+    for size in sizes:
+        seconds.append(time_call(setup, size, repeat))
+        print(f"  {parameter}={size:<6} {seconds[-1] * 1000:10.2f} ms")
+
+    exponent = scaling_exponent(sizes, seconds)
+    if exponent is not None:
+        print(f"  scaling: ~O({parameter}^{exponent:.2f})")
+    return {'parameter': parameter, 'sizes': sizes, 'seconds': seconds, 'exponent': exponent}
+
+def print_comparison(results, baseline):
+    print("\nComparison with baseline (time / baseline time):")
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        base = dict(zip(baseline[name]['sizes'], baseline[name]['seconds']))
+        ratios = [f"{size}: {seconds / base[size]:.2f}x" for size, seconds in zip(result['sizes'], result['seconds']) if base.get(size)]
+        print(f"  {name}: {', '.join(ratios)}")
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Benchmark the render pipeline's hot paths with a bpy stand-in.")
+    parser.add_argument('--only', nargs='+', choices=list(BENCHMARKS), help='Run only these benchmarks')
+    parser.add_argument('--repeat', type=int, default=3, help='Repeats per size; the median is reported')
+    parser.add_argument('--quick', action='store_true', help='Run only the three smallest sizes of every benchmark')
+    parser.add_argument('--output', type=str, help='Write the results to this JSON file')
+    parser.add_argument('--compare', type=str, help='Compare with the results in this JSON file')
+    args = parser.parse_args()
+
+    results = {}
+    try:
+        for name in args.only or BENCHMARKS:
+            results[name] = run_benchmark(name, args.repeat, args.quick)
+    finally:
+        for folder in temp_folders:
+            shutil.rmtree(folder, ignore_errors=True)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"\nWrote results to {args.output}")
+
+    if args.compare:
+        with open(args.compare, 'r') as f:
+            print_comparison(results, json.load(f))
+
+if __name__ == "__main__":
+    main_cli()
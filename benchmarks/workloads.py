@@ -0,0 +1,160 @@
+import os
+import numpy as np
+
+import fakeBpy
+
+# Synthetic workloads for the benchmarks: armatures with B bones, animations with F frames and K animated shape
+# keys, built in the fakeBpy scene the same way the importer leaves a .glb in Blender (an importedAnimation and
+# a mainAvatar collection).
+
+CHANNELS = [('location', 3), ('rotation_quaternion', 4), ('scale', 3)]
+
+def bone_names(bones):
+    return [f"Bone_{i:03d}" for i in range(bones)]
+
+def new_collection(name):
+    collection = fakeBpy.data.collections.new(name)
+    fakeBpy.context.scene.collection.children.link(collection)
+    return collection
+
+def new_object(name, data, collection):
+    obj = fakeBpy.Object(name, data)
+    fakeBpy.data.objects.link(obj)
+    collection.objects.link(obj)
+    return obj
+
+def make_armature(name, bones, rng):
+    """
+    Armature with a chain of bones with random rest orientations.
+    """
+    armature = fakeBpy.data.armatures.new(name)
+    for i, bone_name in enumerate(bone_names(bones)):
+        q, _ = np.linalg.qr(rng.normal(size=(3, 3)))
+        matrix = np.eye(4)
+        matrix[:3, :3] = q
+        matrix[:3, 3] = (0.0, 0.0, 0.1 * i)
+        armature.bones.link(fakeBpy.Bone(bone_name, (0.0, 0.0, 0.1 * i), (0.0, 0.0, 0.1 * (i + 1)), matrix))
+    armature.build_edit_bones()
+    return armature
+
+def fill_fcurve(fcurve, frames, values):
+    co = np.empty(len(frames) * 2)
+    co[0::2] = frames
+    co[1::2] = values
+    fcurve.keyframe_points.add(len(frames))
+    fcurve.keyframe_points.foreach_set('co', co)
+
+def motion(frames, rng, idle=0.1):
+    """
+    Smooth random curve over the frames, holding still for the first and last `idle` fraction.
+    """
+    t = np.linspace(0.0, 1.0, len(frames))
+    values = np.sin(2 * np.pi * (rng.uniform(0.5, 2.0) * t + rng.uniform()))
+    hold = int(len(frames) * idle)
+    if hold:
+        values[:hold] = values[hold]
+        values[-hold:] = values[-hold - 1]
+    return values
+
+def make_body_action(name, bones, frames, rng):
+    """
+    Action keying location, rotation and scale of every bone on every frame.
+    """
+    action = fakeBpy.data.actions.new(name)
+    frame_numbers = np.arange(1, frames + 1, dtype=np.float64)
+    for bone_name in bone_names(bones):
+        for channel, size in CHANNELS:
+            for index in range(size):
+                fcurve = action.fcurves.new(f'pose.bones["{bone_name}"].{channel}', index=index, action_group=bone_name)
+                fill_fcurve(fcurve, frame_numbers, motion(frame_numbers, rng))
+    return action
+
+def make_shape_key_action(name, shape_keys, frames, rng):
+    action = fakeBpy.data.actions.new(name)
+    frame_numbers = np.arange(1, frames + 1, dtype=np.float64)
+    for i in range(shape_keys):
+        fcurve = action.fcurves.new(f'key_blocks["Key_{i:03d}"].value')
+        fill_fcurve(fcurve, frame_numbers, 0.5 + 0.5 * motion(frame_numbers, rng))
+    return action
+
+def make_mesh(name, shape_key_action, collection):
+    mesh = fakeBpy.data.meshes.new(name)
+    mesh.shape_keys = fakeBpy.Key()
+    mesh.shape_keys.animation_data.action = shape_key_action
+    return new_object(name, mesh, collection)
+
+def make_imported_animation(bones, frames, shape_keys, seed=0):
+    """
+    Scene with an imported, animated armature and shape key animation plus the main avatar to retarget onto.
+
+    :return: Dictionary with the source and target armature objects.
+    """
+    fakeBpy.reset()
+    rng = np.random.default_rng(seed)
+
+    imported = new_collection("importedAnimation")
+    source = new_object("Armature", make_armature("ImportedSkeleton", bones, rng), imported)
+    source.animation_data_create().action = make_body_action("ImportedAction", bones, frames, rng)
+    make_mesh("ImportedFace", make_shape_key_action("ImportedShapeKeys", shape_keys, frames, rng), imported)
+
+    avatar = new_collection("mainAvatar")
+    target = new_object("Avatar", make_armature("AvatarSkeleton", bones, rng), avatar)
+    make_mesh("AvatarMesh", None, avatar)
+
+    fakeBpy.context.scene.frame_start, fakeBpy.context.scene.frame_end = 1, frames
+    return {'source': source, 'target': target}
+
+def make_node_animation(bones, frames, seed=0):
+    """
+    Scene with one animated node (empty) per bone, as some exporters write skeletons, and the main avatar whose
+    bones match the node names.
+
+    :return: Dictionary with the node objects and the target armature object.
+    """
+    fakeBpy.reset()
+    rng = np.random.default_rng(seed)
+    frame_numbers = np.arange(1, frames + 1, dtype=np.float64)
+
+    imported = new_collection("importedAnimation")
+    nodes = []
+    for bone_name in bone_names(bones):
+        node = new_object(bone_name, None, imported)
+        action = fakeBpy.data.actions.new(f"{bone_name}Action")
+        for channel in fakeBpy.Animatable.CHANNELS:
+            for index in range(3):
+                fill_fcurve(action.fcurves.new(channel, index=index), frame_numbers, motion(frame_numbers, rng, idle=0))
+        node.animation_data_create().action = action
+        nodes.append(node)
+
+    avatar = new_collection("mainAvatar")
+    target = new_object("Avatar", make_armature("AvatarSkeleton", bones, rng), avatar)
+
+    fakeBpy.context.scene.frame_start, fakeBpy.context.scene.frame_end = 1, frames
+    return {'nodes': nodes, 'target': target}
+
+def make_input_folder(folder, files, file_size=256 * 1024, seed=0):
+    """
+    Folder with `files` dummy .glb files of `file_size` bytes (only hashed, never parsed), a dummy scene and a stub
+    Blender executable that exits right away.
+
+    :return: Dictionary with the input, output and scene paths and the stub executable.
+    """
+    rng = np.random.default_rng(seed)
+    input_folder = os.path.join(folder, "in")
+    output_folder = os.path.join(folder, "out")
+    os.makedirs(input_folder, exist_ok=True)
+    os.makedirs(output_folder, exist_ok=True)
+    for i in range(files):
+        with open(os.path.join(input_folder, f"clip_{i:04d}.glb"), 'wb') as f:
+            f.write(rng.bytes(file_size))
+
+    scene_path = os.path.join(folder, "scene.blend")
+    with open(scene_path, 'wb') as f:
+        f.write(rng.bytes(file_size))
+
+    blender_stub = os.path.join(folder, "blender")
+    with open(blender_stub, 'w') as f:
+        f.write("#!/bin/sh\nexit 0\n")
+    os.chmod(blender_stub, 0o755)
+
+    return {'input': input_folder, 'output': output_folder, 'scene': scene_path, 'blender': blender_stub}
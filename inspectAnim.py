@@ -0,0 +1,332 @@
+import os
+import sys
+import json
+import time
+import zlib
+import struct
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+# Reads what the render pipeline needs to know about an animation file straight from the file, without Blender:
+# animation length, joint (bone) names and morph target (shape key) names. GLB files are read from their JSON
+# chunk, binary FBX files from their node tree (array payloads are skipped, never decompressed).
+#
+# Usage: python inspectAnim.py <folder or files...> [--workers 4] [--json report.json]
+#
+# Named inspectAnim rather than inspect so it doesn't shadow the standard library module next to main.py.
+
+GLB_MAGIC = b'glTF'
+GLB_JSON_CHUNK = 0x4E4F534A
+FBX_MAGIC = b'Kaydara FBX Binary  \x00'
+
+# FBX time values count in these units per second
+FBX_KTIME_PER_SECOND = 46186158000
+
+# FBX GlobalSettings TimeMode to frames per second (14 is a custom rate, stored separately)
+FBX_TIME_MODES = {1: 120.0, 2: 100.0, 3: 60.0, 4: 50.0, 5: 48.0, 6: 30.0, 7: 30.0, 8: 29.97, 9: 29.97, 10: 25.0,
+                  11: 24.0, 12: 1000.0, 13: 23.976, 15: 96.0, 16: 72.0, 17: 59.94, 18: 119.88}
+
+def new_report(path):
+    return {
+        'file': os.path.basename(path),
+        'path': path,
+        'format': None,
+        'size': os.path.getsize(path),
+        'duration': None,
+        'fps': None,
+        'frames': None,
+        'joints': [],
+        'morph_targets': [],
+        'animated_morph_targets': 0,
+        'animations': 0,
+        'error': None,
+        'parse_ms': None,
+    }
+
+def read_glb_json(path):
+    """
+    Read the JSON chunk of a .glb file.
+
+    :return: The parsed glTF JSON.
+    """
+    with open(path, 'rb') as f:
+        header = f.read(12)
+        if len(header) < 12 or header[:4] != GLB_MAGIC:
+            raise ValueError("Not a GLB file")
+        chunk_length, chunk_type = struct.unpack('<II', f.read(8))
+        if chunk_type != GLB_JSON_CHUNK:
+            raise ValueError("GLB file doesn't start with a JSON chunk")
+        return json.loads(f.read(chunk_length).decode('utf-8'))
+
+def inspect_glb(path, report):
+    gltf = read_glb_json(path)
+    report['format'] = 'glb'
+    nodes = gltf.get('nodes', [])
+    accessors = gltf.get('accessors', [])
+
+    joints = []
+    for skin in gltf.get('skins', []):
+        for index in skin.get('joints', []):
+            name = nodes[index].get('name', f"node_{index}")
+            if name not in joints:
+                joints.append(name)
+    report['joints'] = joints
+
+    morph_targets = []
+    for mesh in gltf.get('meshes', []):
+        names = mesh.get('extras', {}).get('targetNames')
+        if names is None:
+            # Unnamed targets; Blender's importer names them by index
+            count = max((len(p.get('targets', [])) for p in mesh.get('primitives', [])), default=0)
+            names = [f"target_{i}" for i in range(count)]
+        morph_targets.extend(name for name in names if name not in morph_targets)
+    report['morph_targets'] = morph_targets
+
+    # The key times of every sampler are an accessor with min/max, so the length needs no binary data
+    start, end, keyframes = None, None, 0
+    animated_morph_meshes = set()
+    for animation in gltf.get('animations', []):
+        samplers = animation.get('samplers', [])
+        for channel in animation.get('channels', []):
+            accessor = accessors[samplers[channel['sampler']]['input']]
+            if 'min' in accessor and 'max' in accessor:
+                start = accessor['min'][0] if start is None else min(start, accessor['min'][0])
+                end = accessor['max'][0] if end is None else max(end, accessor['max'][0])
+            keyframes = max(keyframes, accessor.get('count', 0))
+            if channel.get('target', {}).get('path') == 'weights':
+                animated_morph_meshes.add(channel['target'].get('node'))
+    report['animations'] = len(gltf.get('animations', []))
+
+    if animated_morph_meshes:
+        meshes = gltf.get('meshes', [])
+        animated = set()
+        for node_index in animated_morph_meshes:
+            mesh = meshes[nodes[node_index]['mesh']] if node_index is not None and 'mesh' in nodes[node_index] else {}
+            animated.update(mesh.get('extras', {}).get('targetNames', []))
+        report['animated_morph_targets'] = len(animated) or len(morph_targets)
+
+    if start is not None:
+        report['duration'] = end - start
+        report['frames'] = keyframes
+        if end > start and keyframes > 1:
+            # glTF stores seconds; the sampling rate of the exporter follows from the key count
+            report['fps'] = round((keyframes - 1) / (end - start), 3)
+
+class FbxReader:
+    """
+    Minimal reader for the node tree of binary FBX files (version 7.x).
+    """
+    def __init__(self, data):
+        if not data.startswith(FBX_MAGIC):
+            raise ValueError("Not a binary FBX file")
+        self.data = data
+        self.version = struct.unpack_from('<I', data, 23)[0]
+        self.wide = self.version >= 7500
+        self.header_format = '<QQQB' if self.wide else '<IIIB'
+        self.header_size = struct.calcsize(self.header_format)
+
+    def read_node(self, offset):
+        """
+        :return: (name, properties, offset of the first child, end offset) or None at a null record.
+        """
+        end, prop_count, prop_length, name_length = struct.unpack_from(self.header_format, self.data, offset)
+        if end == 0:
+            return None
+        offset += self.header_size
+        name = self.data[offset:offset + name_length].decode('ascii', errors='replace')
+        offset += name_length
+        properties, _ = self.read_properties(offset, prop_count)
+        return name, properties, offset + prop_length, end
+
+    def read_properties(self, offset, count):
+        data = self.data
+        properties = []
+        for _ in range(count):
+            type_code = chr(data[offset])
+            offset += 1
+            if type_code in 'SR':
+                length = struct.unpack_from('<I', data, offset)[0]
+                value = bytes(data[offset + 4:offset + 4 + length])
+                offset += 4 + length
+                properties.append(value.decode('utf-8', errors='replace') if type_code == 'S' else value)
+            elif type_code in 'fdlibc':
+                # Arrays are only needed for geometry; skip them without decompressing
+                length, encoding, compressed_length = struct.unpack_from('<III', data, offset)
+                offset += 12 + compressed_length
+                properties.append(None)
+            else:
+                fmt = {'Y': '<h', 'C': '<?', 'I': '<i', 'F': '<f', 'D': '<d', 'L': '<q'}[type_code]
+                properties.append(struct.unpack_from(fmt, data, offset)[0])
+                offset += struct.calcsize(fmt)
+        return properties, offset
+
+    def children(self, offset, end):
+        """
+        Iterate over the nodes between offset and end.
+        """
+        while offset < end:
+            node = self.read_node(offset)
+            if node is None:
+                return
+            yield node
+            offset = node[3]
+
+    def top_level(self):
+        return self.children(27, len(self.data))
+
+    def properties70(self, node):
+        """
+        :return: Dictionary from property name to its values, for the Properties70 child of a node.
+        """
+        _, _, child_offset, end = node
+        values = {}
+        for child in self.children(child_offset, end):
+            if child[0] == 'Properties70':
+                for p in self.children(child[2], child[3]):
+                    if p[0] == 'P' and p[1]:
+                        values[p[1][0]] = p[1][4:]
+        return values
+
+def fbx_object_name(value):
+    # Object names are stored as "Name\x00\x01Class"
+    return value.split('\x00\x01')[0] if isinstance(value, str) else str(value)
+
+def inspect_fbx(path, report):
+    with open(path, 'rb') as f:
+        data = f.read()
+    if not data.startswith(FBX_MAGIC):
+        raise ValueError("Not a binary FBX file (ASCII FBX isn't supported)")
+    reader = FbxReader(data)
+    report['format'] = 'fbx'
+
+    joints = []
+    channels = {}
+    stacks = []
+    settings = {}
+    connections = []
+    for node in reader.top_level():
+        name, properties, child_offset, end = node
+        if name == 'GlobalSettings':
+            settings = reader.properties70(node)
+        elif name == 'Objects':
+            for child in reader.children(child_offset, end):
+                child_name, child_properties = child[0], child[1]
+                if child_name == 'Model' and len(child_properties) > 2 and child_properties[2] == 'LimbNode':
+                    joints.append(fbx_object_name(child_properties[1]))
+                elif child_name == 'Deformer' and len(child_properties) > 2 and child_properties[2] == 'BlendShapeChannel':
+                    channels[child_properties[0]] = fbx_object_name(child_properties[1])
+                elif child_name == 'AnimationStack':
+                    stacks.append(reader.properties70(child))
+        elif name == 'Connections':
+            for child in reader.children(child_offset, end):
+                if child[0] == 'C' and len(child[1]) >= 4 and child[1][0] == 'OP':
+                    connections.append((child[1][1], child[1][2], child[1][3]))
+
+    report['joints'] = joints
+    report['morph_targets'] = list(channels.values())
+    report['animated_morph_targets'] = len(set(parent for _, parent, prop in connections if prop == 'DeformPercent' and parent in channels))
+    report['animations'] = len(stacks)
+
+    time_mode = settings.get('TimeMode', [None])[-1]
+    if time_mode == 14:
+        report['fps'] = settings.get('CustomFrameRate', [None])[-1]
+    else:
+        report['fps'] = FBX_TIME_MODES.get(time_mode)
+
+    # The animation stack's local span is the take's length; fall back to the global time span
+    start = end = None
+    for stack in stacks:
+        if 'LocalStart' in stack and 'LocalStop' in stack:
+            start, end = stack['LocalStart'][-1], stack['LocalStop'][-1]
+            break
+    if start is None and 'TimeSpanStart' in settings and 'TimeSpanStop' in settings:
+        start, end = settings['TimeSpanStart'][-1], settings['TimeSpanStop'][-1]
+    if start is not None:
+        report['duration'] = (end - start) / FBX_KTIME_PER_SECOND
+        if report['fps']:
+            report['frames'] = int(round(report['duration'] * report['fps'])) + 1
+
+def inspect_file(path):
+    """
+    Inspect a .glb or binary .fbx file.
+
+    :param path: Path to the file.
+    :return: Report dictionary (format, duration in seconds, fps, frames, joints, morph_targets,
+        animated_morph_targets, animations, parse_ms). On a parse failure, 'error' holds the reason.
+    """
+    report = new_report(path)
+    start = time.perf_counter()
+    try:
+        if path.lower().endswith('.glb'):
+            inspect_glb(path, report)
+        elif path.lower().endswith('.fbx'):
+            inspect_fbx(path, report)
+        else:
+            raise ValueError("Unsupported file type")
+    except (OSError, ValueError, KeyError, IndexError, struct.error, zlib.error, UnicodeDecodeError) as e:
+        report['error'] = f"{type(e).__name__}: {e}"
+    report['parse_ms'] = (time.perf_counter() - start) * 1000
+    return report
+
+def inspect_files(paths, workers=None):
+    """
+    Inspect many files in parallel.
+
+    :param paths: Paths to the files.
+    :param workers: Number of processes (default: one per CPU, 0 or 1 to inspect in this process).
+    :return: List of reports in the order of paths.
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if workers <= 1 or len(paths) < 2:
+        return [inspect_file(path) for path in paths]
+    with ProcessPoolExecutor(max_workers=min(workers, len(paths))) as pool:
+        return list(pool.map(inspect_file, paths, chunksize=max(1, len(paths) // (workers * 4))))
+
+def check_report(report):
+    """
+    Sanity-check a report.
+
+    :return: List of problems; empty if the file looks renderable.
+    """
+    if report['error']:
+        return [report['error']]
+    problems = []
+    if not report['duration']:
+        problems.append("no animation")
+    if not report['joints']:
+        problems.append("no skinned joints")
+    return problems
+
+def print_reports(reports):
+    print(f"{'file':<40} {'fmt':<4} {'frames':>7} {'seconds':>8} {'fps':>7} {'joints':>7} {'morphs':>7} {'ms':>7}  problems")
+    for r in reports:
+        frames = r['frames'] if r['frames'] is not None else '-'
+        seconds = f"{r['duration']:.2f}" if r['duration'] is not None else '-'
+        fps = f"{r['fps']:.2f}" if r['fps'] else '-'
+        morphs = f"{r['animated_morph_targets']}/{len(r['morph_targets'])}"
+        print(f"{r['file'][:40]:<40} {r['format'] or '-':<4} {frames:>7} {seconds:>8} {fps:>7} {len(r['joints']):>7} {morphs:>7} {r['parse_ms']:>7.1f}  {', '.join(check_report(r))}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inspect .glb and .fbx animation files without Blender.")
+    parser.add_argument('paths', nargs='+', help='Files or folders to inspect')
+    parser.add_argument('--workers', type=int, default=None, help='Number of processes (default: one per CPU)')
+    parser.add_argument('--json', type=str, help='Write the full reports (including joint and morph target names) to this file')
+    args = parser.parse_args()
+
+    paths = []
+    for path in args.paths:
+        if os.path.isdir(path):
+            paths.extend(os.path.join(path, name) for name in sorted(os.listdir(path)) if name.lower().endswith(('.glb', '.fbx')))
+        else:
+            paths.append(path)
+
+    start = time.perf_counter()
+    reports = inspect_files(paths, args.workers)
+    print_reports(reports)
+    print(f"\nInspected {len(reports)} files in {time.perf_counter() - start:.2f}s")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(reports, f, indent=2)
+    sys.exit(1 if any(check_report(r) for r in reports) else 0)
@@ -2,78 +2,688 @@ import os
 import sys
 import subprocess
 import argparse
+import json
+import hashlib
+from datetime import datetime
 
-def launch_blender(blender_path, scene_path, input_folder, output_folder, deheaded=True, render_engine="CYCLES", background=None, timestretch=None, frame_range=None, output_format='PNG', render_resolution=[1920, 1080], render_samples=128, render=True, cameras_apply_modifiers='True', compute_device='OPTIX', save_blend='False', fbx_import='False', vicon_color=False, bone_roll=True):
-    for file_name in os.listdir(input_folder):
+script_dir = os.path.dirname(os.path.abspath(__file__))
+src_dir = os.path.join(script_dir, "src")
+sys.path.append(src_dir)
+
+import workerPool as wp
+import scheduler
+import jobCache
+import jobQueue
+import stageStats
+import jobMonitor
+import inspectAnim
+import compatIndex
+import watchFolder
+import videoEncoder
+
+MAIN_PROCESSING_SCRIPT = os.path.join(src_dir, "mainProcessing.py")
+BATCH_PROCESSING_SCRIPT = os.path.join(src_dir, "batchProcessing.py")
+PREPARE_SCENE_SCRIPT = os.path.join(src_dir, "prepareScene.py")
+COMPAT_INDEX_SCRIPT = os.path.join(src_dir, "compatIndex.py")
+
+# Preview renders go into their own tree below the output folder, together with a list of the previewed clips
+PREVIEW_FOLDER = "preview"
+PREVIEW_LIST = "clips.txt"
+PREVIEW_SAMPLES = 16
+
+def find_animation_files(input_folder, fbx_import='False'):
+    """
+    List the animation files in the input folder that should be rendered.
+
+    :param input_folder: Folder containing the animation files.
+    :param fbx_import: 'True' to pick up .fbx files, otherwise .glb files are used.
+    :return: Sorted list of file names.
+    """
+    file_names = []
+    for file_name in sorted(os.listdir(input_folder)):
         if (file_name.endswith('.glb') and fbx_import == 'False') or (fbx_import == 'True' and file_name.endswith('.fbx')):
-            file_path = os.path.join(input_folder, file_name)
-            
+            file_names.append(file_name)
+    return file_names
+
+def inspect_queue(input_folder, file_names, sort_queue='name', preflight=False, compat_index=None, min_compat=None, reports=None):
+    """
+    Inspect the animation files without Blender to order the queue and leave out files that can't be rendered.
+
+    :param sort_queue: 'name', 'longest' (longest animations first, so parallel jobs finish close together) or
+        'shortest'.
+    :param preflight: Leave out files that can't be parsed, have no animation or no skinned joints.
+    :param compat_index: Compatibility index of the scene; files whose joints and morph targets don't all exist on
+        the avatar are reported.
+    :param min_compat: Leave out files whose compatibility score is below this.
+    :param reports: Reports of inspectAnim.inspect_files for these files, if they were already inspected.
+    :return: The file names to render, in order.
+    """
+    if reports is None:
+        reports = inspectAnim.inspect_files([os.path.join(input_folder, file_name) for file_name in file_names])
+
+    if compat_index is not None:
+        kept = []
+        for report in reports:
+            if report['error']:
+                kept.append(report)
+                continue
+            result = compatIndex.score(compat_index, report['joints'], report['morph_targets'])
+            if min_compat is not None and result['score'] < min_compat:
+                print(f"Compatibility: skipping {report['file']}: {compatIndex.describe(result)}")
+                continue
+            if result['score'] < 1.0:
+                print(f"Compatibility: warning for {report['file']}: {compatIndex.describe(result)}")
+            kept.append(report)
+        reports = kept
+
+    if preflight:
+        kept = []
+        for report in reports:
+            problems = inspectAnim.check_report(report)
+            if problems:
+                print(f"Preflight: skipping {report['file']}: {', '.join(problems)}")
+            else:
+                kept.append(report)
+        print(f"Preflight: {len(kept)} of {len(reports)} files passed")
+        reports = kept
+
+    if sort_queue != 'name':
+        reports.sort(key=lambda report: report['duration'] or 0, reverse=sort_queue == 'longest')
+    return [report['file'] for report in reports]
+
+def list_queue(input_folder, fbx_import='False'):
+    """
+    Print what every file in the input folder contains, without rendering anything.
+
+    :return: True if every file passed the sanity checks.
+    """
+    reports = inspectAnim.inspect_files([os.path.join(input_folder, file_name) for file_name in find_animation_files(input_folder, fbx_import)])
+    inspectAnim.print_reports(reports)
+    known = [report for report in reports if report['frames']]
+    print(f"\n{len(reports)} files, {sum(report['frames'] for report in known)} frames per camera in total")
+    return not any(inspectAnim.check_report(report) for report in reports)
+
+def read_approved_clips(list_path):
+    """
+    Read a list of approved clips, one clip name (with or without extension) per line. Empty lines and lines
+    starting with '#' are ignored.
+
+    :return: Set of clip names.
+    """
+    approved = set()
+    with open(list_path, 'r') as f:
+        for line in f:
+            line = line.strip()
+            if line and not line.startswith('#'):
+                approved.add(os.path.basename(line).split('.')[0])
+    return approved
+
+def write_preview_list(output_folder, file_names):
+    """
+    Write the names of the previewed clips to the preview folder. Remove the rejected clips from a copy of this
+    file and pass it to --promote to render the approved ones in full.
+    """
+    list_path = os.path.join(output_folder, PREVIEW_LIST)
+    with open(list_path, 'w') as f:
+        f.write("# Remove rejected clips and pass this file to --promote\n")
+        for file_name in file_names:
+            f.write(file_name.split('.')[0] + "\n")
+    print(f"Wrote the list of previewed clips to {list_path}")
+
+def build_job_args(file_path, output_folder, render_engine="CYCLES", background=None, timestretch=None, frame_range=None, output_format='PNG', render_resolution=[1920, 1080], render_samples=128, render=True, cameras_apply_modifiers='True', compute_device='OPTIX', save_blend='False', vicon_color=False, bone_roll=True, trim_idle=False, trim_tolerance=1e-4, cache_dir=None, render_mode='PER_CAMERA', stream_video=False, keep_frames=False, png_compression=None, color_depth=None, async_write=False, frame_step=1, preview=False, preview_camera=None, frame_time_budget=None, cpu_threads=None, tile_size=None, persistent_data=None, dedup_frames=False, dedup_tolerance=1e-5):
+    """
+    Build the arguments that mainProcessing.py expects after '--' for a single animation file.
+
+    :param file_path: Path to the animation file to render.
+    :return: List of string arguments.
+    """
+    args = [
+        file_path,  # Path to the .glb file to render
+        output_folder,  # Output folder for saving results
+        render_engine,  # Render engine to use
+    ]
+
+    # Add optional background replacement
+    if background:
+        args.extend(['--background_path', background])
+
+    # Add optional time-stretching parameters
+    if timestretch:
+        target_fps, old_fps = timestretch
+        args.extend(['--timestretch', str(target_fps), str(old_fps)])
+
+    # Add optional frame range
+    if frame_range:
+        start_frame, end_frame = frame_range
+        args.extend(['--frame_range', str(start_frame), str(end_frame)])
+
+    # Add optional output format
+    args.extend(['--output_format', output_format])
+
+    # Add optional PNG compression, bit depth and background compression
+    if png_compression is not None:
+        args.extend(['--png_compression', str(png_compression)])
+    if color_depth:
+        args.extend(['--color_depth', str(color_depth)])
+    if async_write:
+        args.extend(['--async_write', 'True'])
+
+    # Add optional render resolution
+    args.extend(['--render_resolution', str(render_resolution[0]), str(render_resolution[1])])
+
+    # Add optional render samples
+    args.extend(['--render_samples', str(render_samples)])
+
+    # Add optional time budget per frame, which tunes the samples instead
+    if frame_time_budget:
+        args.extend(['--frame_time_budget', str(frame_time_budget)])
+
+    # Add optional frame step
+    if frame_step > 1:
+        args.extend(['--frame_step', str(frame_step)])
+
+    # Add optional preview pass
+    if preview:
+        args.extend(['--preview', 'True'])
+        if preview_camera:
+            args.extend(['--preview_camera', preview_camera])
+
+    # Add optional render mode
+    args.extend(['--render_mode', render_mode])
+
+    # Add optional hold-frame dedup
+    if dedup_frames:
+        args.extend(['--dedup_frames', 'True', '--dedup_tolerance', str(dedup_tolerance)])
+
+    # Add optional video streaming
+    if stream_video:
+        args.extend(['--stream_video', 'True', '--keep_frames', str(keep_frames)])
+
+    # Add optional render
+    args.extend(['--render', str(render)])
+
+    # Add optional cameras apply modifiers
+    args.extend(['--cameras_apply_modifiers', str(cameras_apply_modifiers)])
+
+    # Add optional compute device
+    args.extend(['--compute_device', str(compute_device)])
+
+    # Add optional CPU profile settings
+    if cpu_threads is not None:
+        args.extend(['--cpu_threads', str(cpu_threads)])
+    if tile_size is not None:
+        args.extend(['--tile_size', str(tile_size)])
+    if persistent_data is not None:
+        args.extend(['--persistent_data', str(persistent_data)])
+
+    # Add optional save blend
+    args.extend(['--save_blend', str(save_blend)])
+
+    # File name
+    file_name = os.path.basename(file_path).split('.')[0]
+    args.extend(['--file_name', file_name])
+
+    # Add optional vicon color
+    if vicon_color:
+        args.extend(['--vicon_color', str(vicon_color)])
+
+    # Add optional bone roll
+    args.extend(['--bone_roll', str(bone_roll)])
+
+    # Add optional idle frame trimming
+    if trim_idle:
+        args.extend(['--trim_idle', 'True', '--trim_tolerance', str(trim_tolerance)])
+
+    # Folder for caches shared between jobs
+    if cache_dir:
+        args.extend(['--cache_dir', cache_dir])
+
+    return args
+
+def build_blender_command(blender_path, scene_path, script_args, deheaded=True, script=MAIN_PROCESSING_SCRIPT, threads=None):
+    """
+    Build the full command line to launch Blender on a scene with a python script.
+
+    :param script_args: Arguments passed to the script after '--'.
+    :param script: The python script Blender should run.
+    :param threads: Number of CPU threads Blender may use (None lets Blender use all of them).
+    :return: List of command line arguments.
+    """
+    command = [
+        blender_path,
+        scene_path,
+    ]
+
+    if threads:
+        command.extend(['-t', str(threads)])
+
+    if deheaded:
+        command.append('--background')
+
+    command.extend([
+        '--python', script,  # The main script for handling all operations
+        '--',  # Pass additional arguments after this
+    ])
+    command.extend(script_args)
+    return command
+
+def prepare_scene(blender_path, scene_path, cache_dir, background=None, cameras_apply_modifiers='True', vicon_color=False, bone_roll_source=None):
+    """
+    Apply the per-run scene setup (background, camera modifiers and constraints, vicon color) once and cache the
+    result as a prepared .blend. The cache is keyed by the scene file and these options, so changing any of them
+    prepares a new scene.
+
+    :param bone_roll_source: Animation file whose bone rolls are copied to the avatar in the prepared scene, so jobs
+        with the same source skeleton skip the copy. Jobs with another skeleton copy their rolls themselves, so which
+        file it is doesn't change the output and isn't part of the cache key; only whether rolls are copied is.
+
+    :return: Path to the prepared scene, or None if preparing failed.
+    """
+    options = []
+    if background:
+        options.extend(['--background_path', background])
+    options.extend(['--cameras_apply_modifiers', str(cameras_apply_modifiers)])
+    if vicon_color:
+        options.extend(['--vicon_color', str(vicon_color)])
+
+    description = {
+        'scene': jobCache.hash_file(scene_path),
+        'background': jobCache.hash_file(background) if background else None,
+        'options': [option for option in options if option != background],
+        'bone_rolls': bone_roll_source is not None,
+    }
+    if bone_roll_source:
+        options.extend(['--bone_roll_source', bone_roll_source])
+    key = hashlib.sha256(json.dumps(description, sort_keys=True).encode('utf-8')).hexdigest()
+    prepared_path = os.path.join(cache_dir, f"prepared_{key[:16]}.blend")
+
+    if os.path.isfile(prepared_path):
+        print(f"Using cached prepared scene {prepared_path}")
+        return prepared_path
+
+    command = build_blender_command(blender_path, scene_path, [prepared_path] + options, script=PREPARE_SCENE_SCRIPT)
+    print(f"Preparing scene:\n{command}\n")
+    if subprocess.run(command).returncode != 0 or not os.path.isfile(prepared_path):
+        print("Warning: preparing the scene failed, every job will do the setup itself")
+        return None
+    return prepared_path
+
+def get_compat_index(blender_path, scene_path):
+    """
+    Load the compatibility index stored next to the scene, building it with Blender if it is missing or was built
+    from another version of the scene.
+
+    :return: The index, or None if building it failed.
+    """
+    index_path = compatIndex.get_index_path(scene_path)
+    scene_hash = jobCache.hash_file(scene_path)
+    index = compatIndex.load_index(index_path, scene_hash)
+    if index is not None:
+        return index
+
+    command = build_blender_command(blender_path, scene_path, [index_path, scene_hash], script=COMPAT_INDEX_SCRIPT)
+    print(f"Building compatibility index:\n{command}\n")
+    subprocess.run(command)
+    index = compatIndex.load_index(index_path, scene_hash)
+    if index is None:
+        print("Warning: building the compatibility index failed, inputs are only checked after import")
+    return index
+
+def strip_prepared_options(job_args):
+    """
+    Remove the options that a prepared scene already applied from a job's arguments. --cameras_apply_modifiers
+    stays: the prepared scene leaves the camera constraints that target the avatar, and the job applies those after
+    its animation transfer. Everything else on the cameras is already applied, so nothing else is applied twice.
+    """
+    args = list(job_args)
+    for option in ['--background_path', '--vicon_color']:
+        if option in args:
+            index = args.index(option)
+            del args[index:index + 2]
+    return args
+
+def create_render_dir(output_folder, file_name):
+    """
+    Create the next free render_N folder for a file, the same layout CamerasRenderer uses, so several processes
+    can render parts of one job into it.
+
+    :return: Path to the created folder.
+    """
+    date_folder = datetime.now().strftime("%d_%m_%Y")
+    path = os.path.join(output_folder, date_folder, file_name)
+    os.makedirs(path, exist_ok=True)
+
+    i = 1
+    while True:
+        incremental_path = os.path.join(path, f"render_{i}")
+        try:
+            os.makedirs(incremental_path)
+            return incremental_path
+        except FileExistsError:
+            i += 1
+
+def get_expected_frames(job_args, file_frames):
+    """
+    Estimate the frames per camera a job renders from the inspected frame count of its animation file.
+
+    :param job_args: Arguments of the job, starting with the input file path.
+    :param file_frames: {file name: frame count} from inspectAnim.
+    :return: The estimate, or None if the file's frame count is unknown.
+    """
+    if '--frame_range' in job_args:
+        index = job_args.index('--frame_range')
+        frames = int(job_args[index + 2]) - int(job_args[index + 1]) + 1
+    else:
+        frames = file_frames.get(os.path.basename(job_args[0]))
+    if not frames:
+        return None
+    if '--frame_step' in job_args:
+        frame_step = int(job_args[job_args.index('--frame_step') + 1])
+        frames = -(-frames // frame_step)  # ceil
+    if '--shard' in job_args:
+        # Every shard renders about the same share of the cameras' frames
+        frames /= int(job_args[job_args.index('--shard') + 2])
+    return frames
+
+def write_batch_files(job_list, output_folder, batch_size):
+    """
+    Split the jobs into batches and write each batch as a job list for batchProcessing.py.
+
+    :param job_list: List of (name, args) tuples.
+    :param batch_size: Number of animation files per Blender session.
+    :return: List of (batch name, path to the job list) tuples.
+    """
+    batch_folder = os.path.join(output_folder, '.batches')
+    if not os.path.exists(batch_folder):
+        os.makedirs(batch_folder)
+
+    batches = []
+    for i in range(0, len(job_list), batch_size):
+        batch = [{'name': name, 'args': job_args} for name, job_args in job_list[i:i + batch_size]]
+        batch_name = f"batch_{i // batch_size + 1}"
+        batch_path = os.path.join(batch_folder, f"{batch_name}.json")
+        with open(batch_path, 'w') as f:
+            json.dump(batch, f, indent=2)
+        batches.append((batch_name, batch_path))
+    return batches
+
+def launch_blender(blender_path, scene_path, input_folder, output_folder, deheaded=True, render_engine="CYCLES", background=None, timestretch=None, frame_range=None, output_format='PNG', render_resolution=[1920, 1080], render_samples=128, render=True, cameras_apply_modifiers='True', compute_device='OPTIX', save_blend='False', fbx_import='False', vicon_color=False, bone_roll=True, workers=0, jobs=1, batch_size=0, force=False, shards=1, queue_dir=None, trim_idle=False, trim_tolerance=1e-4, cache_dir=None, prepare=False, render_mode='PER_CAMERA', stream_video=False, keep_frames=False, png_compression=None, color_depth=None, async_write=False, preview=False, preview_camera=None, preview_step=1, preview_engine='BLENDER_WORKBENCH', preview_scale=0.25, approved_clips=None, stats=False, stall_timeout=600, sort_queue='name', preflight=False, min_compat=None, import_cache=False, import_cache_size=2048, input_files=None, submit_job=None, resume=False, frame_time_budget=None, cpu_threads=None, tile_size=None, persistent_data=None, dedup_frames=False, dedup_tolerance=1e-5):
+    if cache_dir is None:
+        cache_dir = os.path.join(os.path.dirname(scene_path), '.cache')
+
+    file_names = input_files if input_files is not None else find_animation_files(input_folder, fbx_import)
+    # With a minimum compatibility, check every file against the avatar's bone and shape key names up front
+    compat_index = get_compat_index(blender_path, scene_path) if min_compat is not None else None
+    # Inspect the files once: for ordering and checking the queue, and for the frame total of the progress monitor
+    reports = None
+    if sort_queue != 'name' or preflight or compat_index is not None or not (queue_dir or submit_job):
+        reports = inspectAnim.inspect_files([os.path.join(input_folder, file_name) for file_name in file_names])
+    if sort_queue != 'name' or preflight or compat_index is not None:
+        file_names = inspect_queue(input_folder, file_names, sort_queue=sort_queue, preflight=preflight, compat_index=compat_index, min_compat=min_compat, reports=reports)
+
+    if preview:
+        # Cheap QC pass of one camera into a separate tree
+        output_folder = os.path.join(output_folder, PREVIEW_FOLDER)
+        os.makedirs(output_folder, exist_ok=True)
+        render_engine = preview_engine
+        render_resolution = [max(1, int(render_resolution[0] * preview_scale)), max(1, int(render_resolution[1] * preview_scale))]
+        render_samples = min(render_samples, PREVIEW_SAMPLES)
+        save_blend = 'False'
+        write_preview_list(output_folder, file_names)
+
+    if approved_clips is not None:
+        # Promote: render only the clips that passed the preview
+        found = [file_name for file_name in file_names if file_name.split('.')[0] in approved_clips]
+        missing = approved_clips - set(file_name.split('.')[0] for file_name in found)
+        if missing:
+            print(f"Warning: approved clips not found in {input_folder}: {sorted(missing)}")
+        print(f"Promoting {len(found)} of {len(file_names)} clips to a full render")
+        file_names = found
+
+    # Optionally record per-stage timings of every job in a folder for this run
+    stats_dir = None
+    if stats:
+        stats_dir = os.path.join(output_folder, 'stats', datetime.now().strftime("%Y%m%d_%H%M%S"))
+
+    # Optionally apply the per-run setup once and let every job load the prepared scene
+    prepared_scene_path = None
+    if prepare:
+        bone_roll_source = os.path.join(input_folder, file_names[0]) if bone_roll and file_names else None
+        prepared_scene_path = prepare_scene(blender_path, scene_path, cache_dir, background=background, cameras_apply_modifiers=cameras_apply_modifiers, vicon_color=vicon_color, bone_roll_source=bone_roll_source)
+
+    job_list = []
+    for file_name in file_names:
+        file_path = os.path.join(input_folder, file_name)
+        job_args = build_job_args(
+            file_path,
+            output_folder,
+            render_engine=render_engine,
+            background=background,
+            timestretch=timestretch,
+            frame_range=frame_range,
+            output_format=output_format,
+            render_resolution=render_resolution,
+            render_samples=render_samples,
+            render=render,
+            cameras_apply_modifiers=cameras_apply_modifiers,
+            compute_device=compute_device,
+            save_blend=save_blend,
+            vicon_color=vicon_color,
+            bone_roll=bone_roll,
+            trim_idle=trim_idle,
+            trim_tolerance=trim_tolerance,
+            cache_dir=cache_dir,
+            render_mode=render_mode,
+            stream_video=stream_video,
+            keep_frames=keep_frames,
+            png_compression=png_compression,
+            color_depth=color_depth,
+            async_write=async_write,
+            frame_step=preview_step if preview else 1,
+            preview=preview,
+            preview_camera=preview_camera,
+            frame_time_budget=None if preview else frame_time_budget,
+            cpu_threads=cpu_threads,
+            tile_size=tile_size,
+            persistent_data=persistent_data,
+            dedup_frames=dedup_frames,
+            dedup_tolerance=dedup_tolerance
+        )
+
+        # Optionally split the job into shards of (camera, frame chunk) units
+        job_name = file_name.split('.')[0]
+        if shards > 1:
+            units = [(f"{job_name}_shard{i + 1}", job_args + ['--shard', str(i), str(shards)]) for i in range(shards)]
+        else:
+            units = [(job_name, job_args)]
+
+        # Skip jobs whose inputs and settings were already rendered completely. A prepared scene renders the same as
+        # the per-job setup, so it isn't part of the key
+        job_keys = [jobCache.compute_job_key(unit_args, scene_path, background) for _, unit_args in units]
+        if prepared_scene_path:
+            units = [(unit_name, strip_prepared_options(unit_args)) for unit_name, unit_args in units]
+        if not force and all(jobCache.is_job_complete(output_folder, job_key) for job_key in job_keys):
+            print(f"Skipping {file_name}: already rendered with the same inputs and settings")
+            continue
+
+        # Optionally continue in the folder an interrupted run of this job left behind
+        render_dir = None
+        if resume and str(render) == 'True':
+            for job_key in job_keys:
+                render_dir = jobCache.find_render_dir(output_folder, job_name, job_key)
+                if render_dir:
+                    print(f"Resuming {file_name} in {render_dir}")
+                    break
+
+        # All shards of a file render into the same folder
+        resumed = render_dir is not None
+        if render_dir is None and shards > 1 and str(render) == 'True':
+            render_dir = create_render_dir(output_folder, job_name)
+
+        for (unit_name, unit_args), job_key in zip(units, job_keys):
+            unit_args.extend(['--job_key', job_key])
+            if stats_dir:
+                unit_args.extend(['--stats_dir', stats_dir])
+            if min_compat is not None:
+                unit_args.extend(['--min_compat', str(min_compat)])
+                if compat_index is not None:
+                    # The index was checked against the scene above, so jobs don't have to walk the avatar
+                    unit_args.extend(['--compat_index', compatIndex.get_index_path(scene_path)])
+            if import_cache:
+                unit_args.extend(['--import_cache_size', str(import_cache_size)])
+            if render_dir:
+                unit_args.extend(['--render_dir', render_dir])
+            if resumed:
+                unit_args.extend(['--resume', 'True'])
+            job_list.append((unit_name, unit_args))
+
+    if not job_list:
+        print("Nothing to render.")
+        return True
+
+    if prepared_scene_path:
+        scene_path = prepared_scene_path
+
+    if submit_job:
+        # Watch mode: the daemon feeds the jobs to its warm workers
+        for name, job_args in job_list:
+            submit_job(name, job_args, scene_path)
+        return True
+
+    if queue_dir:
+        # Coordinator mode: write the jobs to the shared queue and let workers on any node pick them up
+        queue_jobs = []
+        for name, job_args in job_list:
+            job_key = job_args[job_args.index('--job_key') + 1]
+            queue_jobs.append((f"{name}-{job_key[:12]}", {'scene': scene_path, 'args': job_args, 'deheaded': deheaded}))
+        added = jobQueue.submit_jobs(queue_dir, queue_jobs, force=force)
+        print(f"Added {added} jobs to queue {queue_dir}: {jobQueue.queue_status(queue_dir)}")
+        return True
+
+    # Split the CPU threads over everything that runs at the same time so jobs don't oversubscribe cores
+    threads = scheduler.threads_per_job(workers if workers > 0 else jobs)
+
+    # Capture every job's output in <output>/logs and show live progress instead of Blender's output
+    file_frames = {report['file']: report['frames'] for report in reports} if reports else {}
+    expected_frames = {name: get_expected_frames(job_args, file_frames) for name, job_args in job_list}
+    monitor = jobMonitor.JobMonitor(os.path.join(output_folder, 'logs'), total_jobs=len(job_list), stall_timeout=stall_timeout, expected_frames=expected_frames)
+
+    if workers > 0:
+        # Feed all jobs to a pool of long-lived Blender processes
+        pool = wp.BlenderWorkerPool(blender_path, scene_path, workers=workers, deheaded=deheaded)
+        pool.extra_blender_args = ['-t', str(threads)]
+        pool.monitor = monitor
+        pool.start()
+        monitor.start()
+        try:
+            results = pool.run(job_list)
+        finally:
+            monitor.stop()
+            pool.close()
+        pool.report_startup_savings()
+    elif batch_size > 0:
+        # Process several files per Blender session
+        commands = []
+        for batch_name, batch_path in write_batch_files(job_list, output_folder, batch_size):
+            commands.append((batch_name, build_blender_command(blender_path, scene_path, [batch_path], deheaded=deheaded, script=BATCH_PROCESSING_SCRIPT, threads=threads)))
+        monitor.total_jobs = len(commands)
+        monitor.expected_frames = {}
+        for i, (batch_name, _) in enumerate(commands):
+            frames = [expected_frames[name] for name, _ in job_list[i * batch_size:(i + 1) * batch_size]]
+            monitor.expected_frames[batch_name] = None if None in frames else sum(frames)
+        monitor.start()
+        try:
+            results = scheduler.JobScheduler(jobs=jobs, monitor=monitor).run(commands)
+        finally:
+            monitor.stop()
+    else:
+        commands = []
+        for name, job_args in job_list:
             # Create the command to launch Blender
-            command = [
-                blender_path,
-                scene_path,
-            ]
-            
-            if deheaded:
-                command.append('--background')
-                
-            command.extend([
-                '--python', '/src/mainProcessing.py',  # The main script for handling all operations
-                '--',  # Pass additional arguments after this
-                file_path,  # Path to the .glb file to render
-                output_folder,  # Output folder for saving results
-                render_engine,  # Render engine to use
-            ])
-            
-            # Add optional background replacement
-            if background:
-                command.extend(['--background_path', background])
-            
-            # Add optional time-stretching parameters
-            if timestretch:
-                target_fps, old_fps = timestretch
-                command.extend(['--timestretch', str(target_fps), str(old_fps)])
-            
-            # Add optional frame range
-            if frame_range:
-                start_frame, end_frame = frame_range
-                command.extend(['--frame_range', str(start_frame), str(end_frame)])
-
-            # Add optional output format
-            command.extend(['--output_format', output_format])
-
-            # Add optional render resolution
-            command.extend(['--render_resolution', str(render_resolution[0]), str(render_resolution[1])])
-
-            # Add optional render samples
-            command.extend(['--render_samples', str(render_samples)])
-
-            # Add optional render
-            command.extend(['--render', str(render)])
-
-            # Add optional cameras apply modifiers
-            command.extend(['--cameras_apply_modifiers', str(cameras_apply_modifiers)])
-
-            # Add optional compute device
-            command.extend(['--compute_device', str(compute_device)])
-
-            # Add optional save blend
-            command.extend(['--save_blend', str(save_blend)])
-
-            # File name
-            file_name = file_name.split('.')[0]
-            command.extend(['--file_name', file_name])
-
-            # Add optional vicon color
-            if vicon_color:
-                command.extend(['--vicon_color', str(vicon_color)])
-
-            # Add optional bone roll
-            command.extend(['--bone_roll', str(bone_roll)])
-
-            print(f"Running Blender command:\n{command}\n")
-            # Run the Blender command for this .glb file
-            subprocess.run(command)
+            commands.append((name, build_blender_command(blender_path, scene_path, job_args, deheaded=deheaded, threads=threads)))
+
+        # Run the Blender commands, up to `jobs` at a time
+        monitor.start()
+        try:
+            results = scheduler.JobScheduler(jobs=jobs, monitor=monitor).run(commands)
+        finally:
+            monitor.stop()
+
+    if stats_dir:
+        print_stage_summary(stats_dir)
+
+    return scheduler.print_summary(results)
+
+def print_stage_summary(stats_dir):
+    """
+    Collect the stage records of all jobs of a run, print per-stage percentiles and store them as summary.json.
+    """
+    if not os.path.isdir(stats_dir):
+        print("No stage records were written.")
+        return
+
+    summary = stageStats.summarize(stageStats.load_records(stats_dir))
+    stageStats.print_summary(summary)
+    with open(os.path.join(stats_dir, 'summary.json'), 'w') as f:
+        json.dump(summary, f, indent=2)
+    print(f"Stage records and summary are in {stats_dir}")
+
+def run_queue_worker(blender_path, queue_dir, jobs=1, stall_timeout=600):
+    """
+    Claim and render jobs from a shared queue folder until it is drained. Job logs go to <queue>/logs.
+
+    :param jobs: Number of queue workers running on this machine, used to split the CPU threads.
+    :param stall_timeout: Seconds without a finished frame after which a job is flagged as stalled.
+    """
+    threads = scheduler.threads_per_job(jobs)
+
+    def build_command(job):
+        return build_blender_command(blender_path, job['scene'], job['args'], deheaded=job['deheaded'], threads=threads)
+
+    monitor = jobMonitor.JobMonitor(os.path.join(queue_dir, 'logs'), stall_timeout=stall_timeout)
+    monitor.start()
+    try:
+        results = jobQueue.QueueWorker(queue_dir, build_command, monitor=monitor).run()
+    finally:
+        monitor.stop()
+    return scheduler.print_summary(results)
+
+def run_watch(blender_path, input_folder, output_folder, launch_options, workers=1, deheaded=True, settle_seconds=10, poll_interval=5, stall_timeout=600):
+    """
+    Render new and changed files in the input folder as soon as they stopped growing, on warm Blender workers, until
+    interrupted. The handled files are recorded in <output>/watch_state.json.
+
+    :param launch_options: Keyword arguments for launch_blender.
+    :param workers: Number of Blender worker processes to keep running.
+    :param settle_seconds: Seconds a file's size and modification time must stay the same before it is rendered.
+    :param poll_interval: Seconds between scans of the input folder.
+    """
+    monitor = jobMonitor.JobMonitor(os.path.join(output_folder, 'logs'), stall_timeout=stall_timeout)
+
+    def create_pool(scene_path):
+        pool = wp.BlenderWorkerPool(blender_path, scene_path, workers=workers, deheaded=deheaded)
+        pool.extra_blender_args = ['-t', str(scheduler.threads_per_job(workers))]
+        pool.monitor = monitor
+        pool.start()
+        return pool
+
+    def launch(file_names, submit_job):
+        launch_blender(input_files=file_names, submit_job=submit_job, **launch_options)
+
+    daemon = watchFolder.WatchDaemon(
+        input_folder,
+        lambda: find_animation_files(input_folder, launch_options['fbx_import']),
+        launch,
+        create_pool,
+        os.path.join(output_folder, watchFolder.STATE_FILE),
+        settle_seconds=settle_seconds,
+        poll_interval=poll_interval
+    )
+    monitor.start()
+    try:
+        daemon.run()
+    finally:
+        monitor.stop()
 
 def main():
     parser = argparse.ArgumentParser(description="Blender Auto Render Script")
@@ -92,15 +702,56 @@ def main():
     parser.add_argument('--timestretch', nargs=2, metavar=('TARGET_FPS', 'OLD_FPS'), type=int, help='Apply time stretching with target and old FPS values')
     parser.add_argument('--frame_range', nargs=2, metavar=('START_FRAME', 'END_FRAME'), type=int, help='Set the frame range for rendering')
     parser.add_argument('--output_format', type=str, default='PNG', help='Output file format for rendered images', choices=['PNG', 'JPEG', 'WebP', 'OPEN_EXR', 'FFMPEG'])
+    parser.add_argument('--stream_video', type=str, help='Stream the rendered frames into one video per camera while rendering (needs PNG output)', default='False', choices=['True', 'False'])
+    parser.add_argument('--keep_frames', type=str, help='With --stream_video, also keep the lossless PNG frames', default='False', choices=['True', 'False'])
+    parser.add_argument('--png_compression', type=int, help='PNG compression in percent (0-100); lower writes faster, higher gives smaller files', default=None)
+    parser.add_argument('--color_depth', type=str, help='Bit depth per channel of the written frames', default=None, choices=['8', '16'])
+    parser.add_argument('--async_write', type=str, help='Write PNG frames uncompressed and compress them in background processes while the next frame renders', default='False', choices=['True', 'False'])
     parser.add_argument('--render_resolution', type=int, nargs=2, metavar=('WIDTH', 'HEIGHT'), help='Set the render resolution', default=[1920, 1080])
     parser.add_argument('--render_samples', type=int, help='Set the render samples for Cycles rendering', default=128)
+    parser.add_argument('--frame_time_budget', type=float, help='Seconds per frame; probe renders pick the Cycles samples, adaptive sampling and denoiser to fit it')
+    parser.add_argument('--render_mode', type=str, help='Render each camera\'s animation in turn, or evaluate each frame once and render all cameras from it', default='PER_CAMERA', choices=['PER_CAMERA', 'PER_FRAME'])
+    parser.add_argument('--dedup_frames', type=str, help='Render frames that repeat an earlier pose and camera state once and link the repeats', default='False', choices=['True', 'False'])
+    parser.add_argument('--dedup_tolerance', type=float, help='Largest bone matrix, shape key or camera difference that still counts as the same state', default=1e-5)
     parser.add_argument('--render', type=str, help='debug value to set if no render is prefered', default='True')
     parser.add_argument('--cameras_apply_modifiers', type=str, help='Apply modifiers and constraints to cameras', default='True')
-    parser.add_argument('--compute_device', type=str, help='Set the compute device for rendering', default='OPTIX', choices=['CUDA', 'OPTIX', 'OPENCL', 'NONE'])
+    parser.add_argument('--compute_device', type=str, help='Set the compute device for rendering (CPU or NONE renders on the CPU; GPU types fall back to the CPU when no such device is found)', default='OPTIX', choices=['CUDA', 'OPTIX', 'OPENCL', 'CPU', 'NONE'])
+    parser.add_argument('--cpu_threads', type=int, help="Render threads per Blender process (0: all cores). Without it the scene's thread setting is left alone and Blender's -t option decides, which the launcher sets to the machine's cores divided by its parallel Blender processes (--jobs or --workers, also for queue workers and watch mode)")
+    parser.add_argument('--tile_size', type=int, help='Cycles tile size in pixels (0 renders the whole image at once)')
+    parser.add_argument('--persistent_data', type=str, help='Keep scene and BVH in memory between frames (default: on for CPU rendering)', choices=['True', 'False'])
     parser.add_argument('--save_blend', type=str, help='Save the .blend file with the rendered results as a new file', default='False', choices=['True', 'False'])
     parser.add_argument('--fbx_import', type=str, help='Import fbx instead of glb', default='False', choices=['True', 'False'])
     parser.add_argument('--vicon_color', type=str, help='Color of the Vicon mesh in hexadecimal format', default='False')
     parser.add_argument('--bone_roll', type=str, help='Copy bone rolls from one armature to another', default='True')
+    parser.add_argument('--trim_idle', type=str, help='Skip leading and trailing frames in which the animation holds still', default='False', choices=['True', 'False'])
+    parser.add_argument('--trim_tolerance', type=float, help='Largest change of any animation channel that still counts as holding still', default=1e-4)
+    parser.add_argument('--prepare_scene', type=str, help='Apply background, camera modifiers and vicon color once and cache the prepared scene for all jobs', default='False', choices=['True', 'False'])
+    parser.add_argument('--cache_dir', type=str, help='Folder for caches shared between jobs (default: .cache next to the scene)')
+    parser.add_argument('--import_cache', type=str, help='Keep imported animation files as .blend libraries in the cache folder, so re-renders skip the importer', default='False', choices=['True', 'False'])
+    parser.add_argument('--import_cache_size', type=int, help='Size limit of the import cache in MB; the least recently used imports are removed first', default=2048)
+    parser.add_argument('--jobs', type=int, help='Number of Blender processes to run at the same time; CPU threads are split between them', default=1)
+    parser.add_argument('--shards', type=int, help='Split every file into this many (camera, frame chunk) jobs that can run in parallel', default=1)
+    parser.add_argument('--force', action='store_true', help='Render all files, even if they were already rendered with the same inputs and settings')
+    parser.add_argument('--resume', type=str, help='Continue interrupted jobs in their existing render folder, rendering only the missing or broken frames', default='False', choices=['True', 'False'])
+    parser.add_argument('--batch_size', type=int, help='Number of animation files to process in a single Blender session (0 launches one Blender per file)', default=0)
+    parser.add_argument('--queue', type=str, help='Write the jobs to this shared queue folder instead of rendering them here')
+    parser.add_argument('--queue_worker', type=str, help='Render jobs from this shared queue folder until it is empty')
+    parser.add_argument('--preview', type=str, help='Render a fast QC pass of one camera into <output>/preview instead of the full render', default='False', choices=['True', 'False'])
+    parser.add_argument('--preview_camera', type=str, help='Camera to render in the preview (default: first camera of the Cameras collection)')
+    parser.add_argument('--preview_step', type=int, help='Render only every Nth frame in the preview', default=1)
+    parser.add_argument('--preview_engine', type=str, help='Render engine for the preview', default='BLENDER_WORKBENCH', choices=['BLENDER_WORKBENCH', 'BLENDER_EEVEE_NEXT', 'CYCLES'])
+    parser.add_argument('--preview_scale', type=float, help='Resolution of the preview relative to --render_resolution', default=0.25)
+    parser.add_argument('--promote', type=str, help='File listing the approved clips (one per line); only these are rendered in full')
+    parser.add_argument('--stats', type=str, help='Record wall time, CPU time and peak memory per stage and per frame, and print a summary', default='False', choices=['True', 'False'])
+    parser.add_argument('--stall_timeout', type=int, help='Flag jobs that finish no frame for this many seconds as stalled', default=600)
+    parser.add_argument('--list_queue', action='store_true', help='List length, joints and shape keys of every input file without rendering')
+    parser.add_argument('--sort_queue', type=str, help='Order in which the files are rendered', default='name', choices=['name', 'longest', 'shortest'])
+    parser.add_argument('--preflight', type=str, help='Skip input files that can\'t be parsed, have no animation or no skinned joints', default='False', choices=['True', 'False'])
+    parser.add_argument('--min_compat', type=float, help='Skip input files of which less than this share (0-1) of the animated bones or shape keys exist on the avatar')
+    parser.add_argument('--workers', type=int, help='Number of persistent Blender worker processes to feed jobs to (0 launches one Blender per file)', default=0)
+    parser.add_argument('--watch', type=str, help='Keep running and render new or changed input files as soon as they stop growing', default='False', choices=['True', 'False'])
+    parser.add_argument('--watch_settle', type=float, help='Seconds an input file must stay unchanged before it is rendered in watch mode', default=10)
+    parser.add_argument('--watch_interval', type=float, help='Seconds between scans of the input folder in watch mode', default=5)
 
     args = parser.parse_args()
 
@@ -109,11 +760,27 @@ def main():
     input_folder = os.path.abspath(args.input)
     output_folder = os.path.abspath(args.output)
 
+    if args.list_queue:
+        # Only reads the input files, so Blender isn't needed
+        if not os.path.isdir(input_folder):
+            print(f"Input folder not found: {input_folder}")
+            sys.exit(1)
+        sys.exit(0 if list_queue(input_folder, args.fbx_import) else 1)
+
     # Validate paths
     if not os.path.isfile(blender_path):
         print(f"Blender executable not found: {blender_path}")
         sys.exit(1)
 
+    if args.queue_worker:
+        # Jobs in the queue carry their own scene and arguments
+        if not os.path.isdir(args.queue_worker):
+            print(f"Queue folder not found: {args.queue_worker}")
+            sys.exit(1)
+        if not run_queue_worker(blender_path, os.path.abspath(args.queue_worker), jobs=args.jobs, stall_timeout=args.stall_timeout):
+            sys.exit(1)
+        return
+
     if not os.path.isfile(scene_path):
         print(f"Scene file not found: {scene_path}")
         sys.exit(1)
@@ -162,6 +829,50 @@ def main():
         print("Error: 'output_format' argument must be 'PNG', 'JPEG', 'WebP', 'OPEN_EXR', or 'FFMPEG'")
         sys.exit(1)
     
+    args.stream_video = args.stream_video == 'True'
+    args.keep_frames = args.keep_frames == 'True'
+    if args.stream_video and args.output_format != 'PNG':
+        print("Error: 'stream_video' needs the PNG output format")
+        sys.exit(1)
+    if args.stream_video and not videoEncoder.find_ffmpeg():
+        print("Error: 'stream_video' needs ffmpeg on the PATH")
+        sys.exit(1)
+
+    args.preview = args.preview == 'True'
+    if args.preview and args.promote:
+        print("Error: 'preview' and 'promote' can't be used together")
+        sys.exit(1)
+    if args.preview_step < 1:
+        print("Error: 'preview_step' must be at least 1")
+        sys.exit(1)
+    if not 0 < args.preview_scale <= 1:
+        print("Error: 'preview_scale' must be between 0 and 1")
+        sys.exit(1)
+
+    approved_clips = None
+    if args.promote:
+        if not os.path.isfile(args.promote):
+            print(f"Approved clips list not found: {args.promote}")
+            sys.exit(1)
+        approved_clips = read_approved_clips(args.promote)
+
+    args.async_write = args.async_write == 'True'
+    if args.async_write and args.output_format != 'PNG':
+        print("Error: 'async_write' needs the PNG output format")
+        sys.exit(1)
+    if args.async_write and args.stream_video:
+        print("Error: 'async_write' can't be combined with 'stream_video'; the video encoder reads the frames while they are compressed")
+        sys.exit(1)
+    if args.png_compression is not None and not 0 <= args.png_compression <= 100:
+        print("Error: 'png_compression' must be between 0 and 100")
+        sys.exit(1)
+    if args.import_cache_size <= 0:
+        print("Error: 'import_cache_size' must be a positive number of MB")
+        sys.exit(1)
+    if args.min_compat is not None and not 0 <= args.min_compat <= 1:
+        print("Error: 'min_compat' must be between 0 and 1")
+        sys.exit(1)
+
     if args.render_resolution:
         width, height = args.render_resolution
         if width <= 0 or height <= 0:
@@ -176,6 +887,21 @@ def main():
         print("Error: Render samples must be a positive integer")
         sys.exit(1)
 
+    if args.cpu_threads is not None and args.cpu_threads < 0:
+        print("Error: 'cpu_threads' must be a non-negative integer")
+        sys.exit(1)
+    if args.tile_size is not None and args.tile_size < 0:
+        print("Error: 'tile_size' must be a non-negative integer")
+        sys.exit(1)
+
+    if args.frame_time_budget is not None:
+        if args.frame_time_budget <= 0:
+            print("Error: 'frame_time_budget' must be a positive number of seconds")
+            sys.exit(1)
+        if args.render_engine != 'CYCLES':
+            print("Error: 'frame_time_budget' only works with the CYCLES render engine")
+            sys.exit(1)
+
     if args.render == 'False' or args.render == 'false':
         args.render = 'False'
         print("Rendering is set to FALSE, no render will be done")
@@ -183,8 +909,8 @@ def main():
     if args.cameras_apply_modifiers.lower() not in ['False', 'false']:
         args.cameras_apply_modifiers = 'True'
 
-    if args.compute_device not in ['CUDA', 'OPTIX', 'OPENCL', 'NONE']:
-        print("Error: 'compute_device' argument must be 'CUDA', 'OPTIX', 'OPENCL', or 'NONE'")
+    if args.compute_device not in ['CUDA', 'OPTIX', 'OPENCL', 'CPU', 'NONE']:
+        print("Error: 'compute_device' argument must be 'CUDA', 'OPTIX', 'OPENCL', 'CPU', or 'NONE'")
         sys.exit(1)
 
     if args.save_blend.lower() not in ['True', 'False', 'true', 'false']:
@@ -207,9 +933,52 @@ def main():
         sys.exit(1)
     else:
         args.bone_roll = args.bone_roll.lower() == 'true'
+
+    args.trim_idle = args.trim_idle == 'True'
+    if args.trim_tolerance < 0:
+        print("Error: 'trim_tolerance' argument must be non-negative")
+        sys.exit(1)
+
+    if args.jobs <= 0:
+        print("Error: 'jobs' argument must be a positive integer")
+        sys.exit(1)
+
+    if args.workers < 0:
+        print("Error: 'workers' argument must be a non-negative integer")
+        sys.exit(1)
+
+    if args.shards <= 0:
+        print("Error: 'shards' argument must be a positive integer")
+        sys.exit(1)
+
+    if args.shards > 1 and (args.output_format == 'FFMPEG' or args.stream_video):
+        print("Error: 'shards' can't be combined with video output, each shard would write its own video")
+        sys.exit(1)
+
+    if args.batch_size < 0:
+        print("Error: 'batch_size' argument must be a non-negative integer")
+        sys.exit(1)
+
+    if args.dedup_frames == 'True' and (args.output_format == 'FFMPEG' or args.stream_video):
+        print("Error: 'dedup_frames' needs frame output; repeated frames are filled in after rendering")
+        sys.exit(1)
+    if args.dedup_tolerance <= 0:
+        print("Error: 'dedup_tolerance' must be positive")
+        sys.exit(1)
+
+    if args.resume == 'True' and (args.output_format == 'FFMPEG' or args.stream_video):
+        print("Error: 'resume' needs frame output; a video can't be continued")
+        sys.exit(1)
+
+    if args.batch_size > 0 and args.workers > 0:
+        print("Error: 'batch_size' and 'workers' can't be combined")
+        sys.exit(1)
+
+    if args.watch == 'True' and (args.queue or args.batch_size > 0):
+        print("Error: 'watch' renders on its own worker pool and can't be combined with 'queue' or 'batch_size'")
+        sys.exit(1)
     
-    # Launch Blender for each .glb file
-    launch_blender(
+    launch_options = dict(
         blender_path=blender_path,
         scene_path=scene_path,
         input_folder=input_folder,
@@ -228,8 +997,54 @@ def main():
         save_blend=args.save_blend,
         fbx_import=args.fbx_import,
         vicon_color=args.vicon_color,
-        bone_roll=args.bone_roll
+        bone_roll=args.bone_roll,
+        workers=args.workers,
+        jobs=args.jobs,
+        batch_size=args.batch_size,
+        force=args.force,
+        shards=args.shards,
+        queue_dir=os.path.abspath(args.queue) if args.queue else None,
+        trim_idle=args.trim_idle,
+        trim_tolerance=args.trim_tolerance,
+        cache_dir=os.path.abspath(args.cache_dir) if args.cache_dir else None,
+        prepare=args.prepare_scene == 'True',
+        render_mode=args.render_mode,
+        stream_video=args.stream_video,
+        keep_frames=args.keep_frames,
+        png_compression=args.png_compression,
+        color_depth=args.color_depth,
+        async_write=args.async_write,
+        preview=args.preview,
+        preview_camera=args.preview_camera,
+        preview_step=args.preview_step,
+        preview_engine=args.preview_engine,
+        preview_scale=args.preview_scale,
+        approved_clips=approved_clips,
+        stats=args.stats == 'True',
+        stall_timeout=args.stall_timeout,
+        sort_queue=args.sort_queue,
+        preflight=args.preflight == 'True',
+        min_compat=args.min_compat,
+        import_cache=args.import_cache == 'True',
+        import_cache_size=args.import_cache_size,
+        resume=args.resume == 'True',
+        frame_time_budget=args.frame_time_budget,
+        cpu_threads=args.cpu_threads,
+        tile_size=args.tile_size,
+        persistent_data=args.persistent_data,
+        dedup_frames=args.dedup_frames == 'True',
+        dedup_tolerance=args.dedup_tolerance
     )
 
+    if args.watch == 'True':
+        run_watch(blender_path, input_folder, output_folder, launch_options, workers=max(1, args.workers), deheaded=args.deheaded, settle_seconds=args.watch_settle, poll_interval=args.watch_interval, stall_timeout=args.stall_timeout)
+        return
+
+    # Launch Blender for each .glb file
+    success = launch_blender(**launch_options)
+
+    if not success:
+        sys.exit(1)
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,135 @@
+import bpy
+import sys
+import os
+import json
+import time
+import traceback
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(script_dir)  # Add current directory
+
+import mainProcessing
+import sceneState
+import jobServer
+
+# Processes a list of animation files in one Blender session. The per-run setup (background, time-stretch,
+# camera modifiers, vicon color) is applied once, then every file is imported, retargeted and rendered, and the
+# scene is restored to its state from before the first file. After each restore the scene is verified against
+# the snapshot so nothing (actions, frame range, camera modifiers, materials) leaks into the next file. The only
+# exception are the avatar's bone rolls when the next file copies rolls too: they stay, so files with the same source
+# skeleton skip Edit Mode, and a file with another skeleton puts the original rolls back while copying its own.
+#
+# Camera constraints that target the avatar can't be applied once up front: per-file rendering applies them after
+# the animation transfer. Such batches fall back to per-file processing, reloading the scene between files like a
+# persistent worker does, so they render exactly as without batching.
+#
+# Usage: blender <scene.blend> --background --python batchProcessing.py -- <jobs.json>
+# where jobs.json is a list of {"name": ..., "args": [...]} with args as expected by mainProcessing.process_file.
+
+# Options that are applied once for the whole batch and must therefore be the same for every job
+RUN_OPTIONS = {'--background_path': 1, '--timestretch': 2, '--cameras_apply_modifiers': 1, '--vicon_color': 1}
+
+def run_options(job_args):
+    options = {}
+    for option, count in RUN_OPTIONS.items():
+        if option in job_args:
+            index = job_args.index(option)
+            options[option] = job_args[index + 1:index + 1 + count]
+    return options
+
+def copies_bone_rolls(job_args):
+    return '--bone_roll' in job_args and job_args[job_args.index('--bone_roll') + 1] == 'True'
+
+def process_batch(jobs, strict=True):
+    """
+    Process all jobs in the current Blender session.
+
+    :param jobs: List of {"name": ..., "args": [...]} dictionaries.
+    :param strict: Stop the batch when state leaks between files.
+    :return: List of result dicts with name, returncode and seconds.
+    """
+    results = []
+    if not jobs:
+        return results
+
+    first_args = jobs[0]['args']
+    for job in jobs[1:]:
+        if run_options(job['args']) != run_options(first_args):
+            raise ValueError(f"Job {job['name']} uses different per-run options than {jobs[0]['name']}")
+
+    apply_modifiers = '--cameras_apply_modifiers' in first_args and first_args[first_args.index('--cameras_apply_modifiers') + 1] == 'True'
+    avatar_constraints = mainProcessing.get_avatar_camera_constraints() if apply_modifiers else []
+    if avatar_constraints:
+        print(f"Camera constraints target the avatar ({', '.join(avatar_constraints)}); processing the batch file by file.")
+        return process_per_file(jobs)
+
+    mainProcessing.setup_stats(first_args)
+    mainProcessing.prepare_scene(first_args)
+    mainProcessing.prepare_cameras_and_materials(first_args)
+    state = sceneState.capture_state()
+    base_bone_rolls = state['bone_rolls'][0] if state['bone_rolls'] else None
+
+    for i, job in enumerate(jobs):
+        print(f"Batch job {i + 1}/{len(jobs)}: {job['name']}")
+        start = time.time()
+        returncode = 0
+        mainProcessing.setup_stats(job['args'])
+        try:
+            mainProcessing.process_animation(job['args'], base_bone_rolls=base_bone_rolls)
+        except SystemExit as e:
+            returncode = e.code if isinstance(e.code, int) else 1
+        except Exception:
+            traceback.print_exc()
+            returncode = 1
+
+        # Keep the copied bone rolls for a next file that copies rolls itself, so matching skeletons never enter Edit Mode
+        keep_bone_rolls = returncode == 0 and i + 1 < len(jobs) and copies_bone_rolls(jobs[i + 1]['args'])
+        sceneState.restore_state(state, keep_bone_rolls=keep_bone_rolls)
+        leaks = sceneState.verify_state(state, keep_bone_rolls=keep_bone_rolls)
+        results.append({'name': job['name'], 'returncode': returncode, 'seconds': time.time() - start})
+
+        if leaks:
+            print(f"Scene state leaked after {job['name']}:")
+            for leak in leaks:
+                print("  " + leak)
+            if strict:
+                # Remaining jobs would render on a polluted scene
+                for remaining in jobs[i + 1:]:
+                    results.append({'name': remaining['name'], 'returncode': None, 'seconds': None})
+                break
+
+    return results
+
+def process_per_file(jobs):
+    """
+    Process every job as mainProcessing.process_file would in a fresh Blender, reloading the scene between jobs.
+
+    :param jobs: List of {"name": ..., "args": [...]} dictionaries.
+    :return: List of result dicts with name, returncode and seconds.
+    """
+    scene_path = bpy.data.filepath
+    results = []
+    for i, job in enumerate(jobs):
+        print(f"Batch job {i + 1}/{len(jobs)}: {job['name']}")
+        start = time.time()
+        if i > 0:
+            jobServer.reset_scene(scene_path)
+        returncode = jobServer.run_job(job['args'])
+        results.append({'name': job['name'], 'returncode': returncode, 'seconds': time.time() - start})
+    return results
+
+if __name__ == "__main__":
+    argv = sys.argv[sys.argv.index("--") + 1:]
+    if len(argv) != 1:
+        print("Usage: blender <scene.blend> --background --python batchProcessing.py -- <jobs.json>")
+        sys.exit(1)
+
+    with open(argv[0], 'r') as f:
+        jobs = json.load(f)
+
+    results = process_batch(jobs)
+    failed = [r['name'] for r in results if r['returncode'] != 0]
+    print(f"Batch finished: {len(results) - len(failed)} of {len(results)} files processed.")
+    if failed:
+        print("Failed or skipped:", ", ".join(failed))
+        sys.exit(1)
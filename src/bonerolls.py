@@ -1,9 +1,62 @@
 import bpy
+import hashlib
+
+# Custom property on the target armature data that records which source skeleton its rolls were copied from
+ROLL_SIGNATURE_PROPERTY = "boneRollSignature"
 
 def get_armature_from_collection(collection_name):
     return next(obj for obj in bpy.data.collections[collection_name].objects if obj.type == 'ARMATURE')
 
-def copy_bone_rolls():
+def get_bone_rolls(armature):
+    # Rolls can be derived from the rest matrices, so the source armature never has to enter Edit Mode
+    return {bone.name: bpy.types.Bone.AxisRollFromMatrix(bone.matrix_local.to_3x3())[1] for bone in armature.data.bones}
+
+def get_roll_signature(source_armature, target_armature, source_rolls):
+    """
+    Hash the source skeleton (bone names, rest pose and rolls) together with the target's bone names and rest
+    positions. Equal signatures mean copying the rolls again would give the same result.
+    """
+    sha = hashlib.sha256()
+    for bone in sorted(source_armature.data.bones, key=lambda b: b.name):
+        sha.update(bone.name.encode('utf-8'))
+        sha.update(repr([round(v, 5) for v in (*bone.head_local, *bone.tail_local, source_rolls[bone.name])]).encode('utf-8'))
+    sha.update(b'->')
+    for bone in sorted(target_armature.data.bones, key=lambda b: b.name):
+        sha.update(bone.name.encode('utf-8'))
+        sha.update(repr([round(v, 5) for v in (*bone.head_local, *bone.tail_local)]).encode('utf-8'))
+    return sha.hexdigest()
+
+def set_bone_rolls(target_armature, rolls):
+    """
+    Write rolls into the edit bones of the target armature, in place.
+
+    :param rolls: Dictionary {bone name: roll}; bones the target doesn't have are ignored.
+    :return: True if any roll was written.
+    """
+    # Only the target has to be in Edit Mode to write rolls
+    bpy.context.view_layer.objects.active = target_armature
+    bpy.ops.object.mode_set(mode='EDIT')
+    target_bones = target_armature.data.edit_bones
+
+    edited = False
+    for bone_name, roll in rolls.items():
+        if bone_name in target_bones:
+            target_bones[bone_name].roll = roll
+            edited = True
+
+    # Return to Object Mode
+    bpy.ops.object.mode_set(mode='OBJECT')
+    return edited
+
+def copy_bone_rolls(base_rolls=None):
+    """
+    Copy the bone rolls of the source armature to the target, skipping Edit Mode when the target already carries the
+    rolls of this source skeleton.
+
+    :param base_rolls: Original rolls {bone name: roll} of the target, for a target that may still carry the rolls of
+        another source skeleton (a batch doesn't restore them between files). Bones the source doesn't have are put
+        back to these rolls in the same Edit Mode session.
+    """
     # If two armatures are selected, copy bone rolls from the active armature to the other, otherwise
     # use mainAvatar and importedAnimation collections to find these armatures.
     selected_objects = [obj for obj in bpy.context.selected_objects if obj.type == 'ARMATURE']
@@ -19,29 +72,26 @@ def copy_bone_rolls():
         if source_armature is None or target_armature is None:
             print("Please select exactly two armatures or ensure mainAvatar and importedAnimation collections exist.")
             return
-    
-    print(f"\nCopying bone rolls from {source_armature.name} to {target_armature.name}\n")
 
-    # Ensure source and target are in Edit Mode
-    bpy.context.view_layer.objects.active = source_armature
-    bpy.ops.object.mode_set(mode='EDIT')
-    source_bones = {bone.name: bone.roll for bone in source_armature.data.edit_bones}
+    source_bones = get_bone_rolls(source_armature)
+    signature = get_roll_signature(source_armature, target_armature, source_bones)
 
-    bpy.context.view_layer.objects.active = target_armature
-    bpy.ops.object.mode_set(mode='EDIT')
-    target_bones = target_armature.data.edit_bones
+    # Skip entirely when the target already carries the rolls of this source skeleton
+    if target_armature.data.get(ROLL_SIGNATURE_PROPERTY) == signature:
+        print(f"Bone rolls of {target_armature.name} already match {source_armature.name}, skipping.")
+        return
 
-    edited = False
-    for bone_name, source_roll in source_bones.items():
-        if bone_name in target_bones:
-            target_bones[bone_name].roll = source_roll
-            edited = True
+    print(f"\nCopying bone rolls from {source_armature.name} to {target_armature.name}\n")
 
-    # Return to Object Mode
-    bpy.ops.object.mode_set(mode='OBJECT')
+    rolls = dict(source_bones)
+    if base_rolls:
+        current_rolls = get_bone_rolls(target_armature)
+        rolls.update({name: roll for name, roll in base_rolls.items()
+                      if name not in source_bones and name in current_rolls and abs(current_rolls[name] - roll) > 1e-6})
 
-    if not edited:
+    if not set_bone_rolls(target_armature, rolls):
         print("No bone rolls copied.")
     else:
         print("Bone rolls copied successfully.")
 
+    target_armature.data[ROLL_SIGNATURE_PROPERTY] = signature
@@ -0,0 +1,113 @@
+import os
+import re
+import sys
+import json
+
+# Compatibility index of a render scene: the bone names of the mainAvatar armature and the shape key names of its
+# meshes, stored as <scene>.compat.json next to the .blend. Animations are retargeted by name, so the share of an
+# input's animated bones and shape keys that exist on the avatar tells whether the render will actually move.
+#
+# Build the index (main.py does this once per scene version):
+#   blender <scene.blend> --background --python compatIndex.py -- <index.json> <scene hash>
+
+INDEX_SUFFIX = ".compat.json"
+
+# Exit code of a job that was rejected because its animation doesn't fit the avatar
+INCOMPATIBLE_EXIT_CODE = 3
+
+BONE_PATH_PATTERN = re.compile(r'^pose\.bones\["(.+?)"\]')
+SHAPE_KEY_PATH_PATTERN = re.compile(r'^key_blocks\["(.+?)"\]')
+
+def get_index_path(scene_path):
+    return os.path.splitext(scene_path)[0] + INDEX_SUFFIX
+
+def build_index(collection_name="mainAvatar"):
+    """
+    Collect the bone and shape key names of the avatar in the open scene. Only works inside Blender.
+
+    :return: Dictionary with sorted 'bones' and 'shape_keys' lists.
+    """
+    import bpy
+
+    bones, shape_keys = set(), set()
+    collection = bpy.data.collections.get(collection_name)
+    if collection is None:
+        print(f"No collection named '{collection_name}' found.")
+        return {'bones': [], 'shape_keys': []}
+
+    for obj in collection.objects:
+        if obj.type == 'ARMATURE':
+            bones.update(bone.name for bone in obj.data.bones)
+        elif obj.type == 'MESH' and obj.data.shape_keys:
+            shape_keys.update(key.name for key in obj.data.shape_keys.key_blocks)
+    return {'bones': sorted(bones), 'shape_keys': sorted(shape_keys)}
+
+def save_index(index, index_path, scene_hash):
+    record = dict(index, scene_hash=scene_hash)
+    temp_path = index_path + f".{os.getpid()}.tmp"
+    with open(temp_path, 'w') as f:
+        json.dump(record, f, indent=2)
+    os.replace(temp_path, index_path)
+
+def load_index(index_path, scene_hash=None):
+    """
+    :param scene_hash: Hash of the scene file; an index built from another version of the scene is ignored.
+    :return: The index, or None if it is missing or stale.
+    """
+    try:
+        with open(index_path, 'r') as f:
+            index = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if scene_hash is not None and index.get('scene_hash') != scene_hash:
+        return None
+    return index
+
+def names_from_action(action, pattern):
+    """
+    :return: Set of bone or shape key names the F-Curves of an action animate.
+    """
+    names = set()
+    if action is None:
+        return names
+    for fcurve in action.fcurves:
+        match = pattern.match(fcurve.data_path)
+        if match:
+            names.add(match.group(1))
+    return names
+
+def score(index, bones, shape_keys):
+    """
+    Compare the names an animation drives with the avatar's.
+
+    :param index: Compatibility index of the scene.
+    :param bones: Bone names the animation drives.
+    :param shape_keys: Shape key names the animation drives.
+    :return: Dictionary with matched/total counts, the missing names and 'score': the lowest share of matched
+        bones or shape keys (1.0 when everything matches).
+    """
+    result = {'score': 1.0}
+    for kind, names in (('bones', set(bones)), ('shape_keys', set(shape_keys))):
+        known = set(index[kind])
+        missing = sorted(names - known)
+        result[kind] = (len(names) - len(missing), len(names))
+        result[f"missing_{kind}"] = missing
+        if names:
+            result['score'] = min(result['score'], (len(names) - len(missing)) / len(names))
+    return result
+
+def describe(result):
+    text = (f"compatibility {result['score']:.0%}: {result['bones'][0]}/{result['bones'][1]} bones, "
+            f"{result['shape_keys'][0]}/{result['shape_keys'][1]} shape keys")
+    for kind in ('bones', 'shape_keys'):
+        missing = result[f"missing_{kind}"]
+        if missing:
+            more = f" and {len(missing) - 5} more" if len(missing) > 5 else ""
+            text += f"; missing {kind.replace('_', ' ')}: {', '.join(missing[:5])}{more}"
+    return text
+
+if __name__ == "__main__":
+    argv = sys.argv[sys.argv.index("--") + 1:]
+    index = build_index()
+    save_index(index, argv[0], argv[1] if len(argv) > 1 else None)
+    print(f"Saved the compatibility index ({len(index['bones'])} bones, {len(index['shape_keys'])} shape keys) at {argv[0]}")
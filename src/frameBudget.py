@@ -0,0 +1,305 @@
+import bpy
+import os
+import json
+import time
+import shutil
+import numpy as np
+
+# Time-budgeted Cycles quality. Before the real render, a few probe frames per camera are rendered at increasing
+# sample counts. Each probe is timed, and the difference to the probe with twice the samples is used as the
+# noise estimate. The highest sample count whose slowest probe fits the budget (interpolated between the probed
+# levels) becomes the cap for adaptive sampling, unless the noise stops dropping before that: once doubling the
+# samples removes less than NOISE_GAIN_MIN of the remaining noise, more samples only cost time. The denoiser is on,
+# and Cycles' time limit is a hard stop for frames that are harder than the probes.
+#
+# The chosen settings and the measurements are written to render_settings.json in the render folder. Only one
+# process probes per render folder: it holds render_settings.json.lock while probing, and other shards of the same
+# file wait for the settings instead of probing themselves, so all shards render with the same samples. Resumed
+# jobs that find the file reuse it.
+
+SETTINGS_FILE = "render_settings.json"
+SAMPLE_LEVELS = [16, 32, 64, 128, 256, 512, 1024, 2048, 4096]
+# Share of the budget the probes may use, as headroom for frames that are harder than the probes
+BUDGET_MARGIN = 0.9
+NOISE_THRESHOLD = 0.01
+# Smallest share of the noise that doubling the samples must remove to be worth the render time
+NOISE_GAIN_MIN = 0.1
+# Seconds without a probe finishing after which another process takes over a probe lock (at least 4x the budget)
+PROBE_LOCK_STALE = 600
+
+def get_probe_frames(start_frame, end_frame, frame_step=1, count=2):
+    """
+    :return: Up to `count` frames spread evenly over the range.
+    """
+    frames = list(range(start_frame, end_frame + 1, frame_step))
+    if len(frames) <= count:
+        return frames
+    return sorted(set(frames[round(i * (len(frames) - 1) / max(1, count - 1))] for i in range(count)))
+
+def read_pixels(path):
+    image = bpy.data.images.load(path)
+    try:
+        pixels = np.empty(len(image.pixels), dtype=np.float32)
+        image.pixels.foreach_get(pixels)
+    finally:
+        bpy.data.images.remove(image)
+    return pixels
+
+def noise_estimate(pixels, reference):
+    """
+    RMS difference between two renders of the same frame; with the reference at twice the samples this tracks the
+    noise left in the first one.
+    """
+    return float(np.sqrt(np.mean((pixels - reference) ** 2)))
+
+def render_probe(scene, camera, frame, samples, path_prefix):
+    """
+    Render one probe frame.
+
+    :param path_prefix: File path without frame number and extension.
+    :return: (seconds, pixels)
+    """
+    scene.camera = camera
+    scene.frame_set(frame)
+    scene.cycles.samples = samples
+    # Name the file the same way render_frame does, so the path of the written still is known
+    scene.render.filepath = path_prefix
+    scene.render.filepath = scene.render.frame_path(frame=frame)
+    start = time.time()
+    bpy.ops.render.render(write_still=True)
+    return time.time() - start, read_pixels(scene.render.filepath)
+
+def noise_flattened(levels):
+    """
+    :return: Index of the first level whose noise estimate is less than NOISE_GAIN_MIN below the previous level's,
+        or None if the noise still drops (or isn't known yet).
+    """
+    for i in range(1, len(levels)):
+        previous, current = levels[i - 1]['noise'], levels[i]['noise']
+        if previous is None or current is None:
+            continue
+        if previous == 0 or current > previous * (1 - NOISE_GAIN_MIN):
+            return i
+    return None
+
+def probe(renderer, budget, probe_count=2, heartbeat=None):
+    """
+    Render probe frames at increasing sample counts until the slowest probe exceeds the budget or the noise stops
+    dropping.
+
+    :param heartbeat: Optional callable run after every probe render.
+    :return: List of measurements: {'samples', 'seconds' (slowest probe), 'noise' (largest estimate, None for
+        the last level)}.
+    """
+    scene = renderer.scene
+    cameras = renderer.get_cameras()
+    frames = get_probe_frames(scene.frame_start, scene.frame_end, scene.frame_step, probe_count)
+    if not cameras or not frames:
+        return []
+    # Per process, so nothing else writes or removes probe files in it
+    probe_dir = os.path.join(renderer.output_dir, f"_probe_{os.getpid()}")
+    os.makedirs(probe_dir, exist_ok=True)
+
+    image_settings = scene.render.image_settings
+    state = (scene.camera, scene.frame_current, scene.render.filepath, scene.cycles.samples, image_settings.file_format)
+    # Probes are written as stills, which video formats can't do
+    image_settings.file_format = 'PNG'
+    levels = []
+    previous = {}
+    try:
+        for samples in SAMPLE_LEVELS:
+            seconds = []
+            noise = []
+            current = {}
+            for camera in cameras:
+                for frame in frames:
+                    path_prefix = os.path.join(probe_dir, f"{camera.name}_{samples}_")
+                    elapsed, pixels = render_probe(scene, camera, frame, samples, path_prefix)
+                    seconds.append(elapsed)
+                    if heartbeat:
+                        heartbeat()
+                    current[(camera.name, frame)] = pixels
+                    if (camera.name, frame) in previous:
+                        noise.append(noise_estimate(previous[(camera.name, frame)], pixels))
+
+            if levels:
+                levels[-1]['noise'] = max(noise) if noise else None
+            levels.append({'samples': samples, 'seconds': max(seconds), 'noise': None})
+            print(f"Frame budget probe: {samples} samples, slowest frame {max(seconds):.2f}s")
+            previous = current
+            if max(seconds) > budget:
+                break
+            flat = noise_flattened(levels)
+            if flat is not None:
+                print(f"Frame budget probe: the noise stops dropping at {levels[flat]['samples']} samples")
+                break
+    finally:
+        scene.camera, scene.render.filepath, scene.cycles.samples, image_settings.file_format = state[0], state[2], state[3], state[4]
+        scene.frame_set(state[1])
+        shutil.rmtree(probe_dir, ignore_errors=True)
+    return levels
+
+def choose_settings(levels, budget, denoiser):
+    """
+    Pick the highest probed sample count that fits the budget, but no more than the count after which the noise
+    stopped dropping.
+
+    :return: Dictionary of Cycles settings.
+    """
+    fitting = [level for level in levels if level['seconds'] <= budget * BUDGET_MARGIN]
+    if not fitting:
+        print(f"Warning: even {levels[0]['samples']} samples take {levels[0]['seconds']:.2f}s per frame, more than the budget of {budget}s")
+    chosen = fitting[-1] if fitting else levels[0]
+    samples = chosen['samples']
+
+    # Render time grows about linearly with the samples, so fill the gap up to the first level over the budget
+    over = [level for level in levels if level['samples'] > samples]
+    if fitting and over and over[0]['seconds'] > chosen['seconds']:
+        per_sample = (over[0]['seconds'] - chosen['seconds']) / (over[0]['samples'] - samples)
+        extra = (budget * BUDGET_MARGIN - chosen['seconds']) / per_sample
+        samples = min(over[0]['samples'], samples + int(extra) // 8 * 8)
+
+    flat = noise_flattened(levels)
+    if flat is not None and levels[flat]['samples'] < samples:
+        print(f"Frame budget: the noise stops dropping at {levels[flat]['samples']} samples, using those instead of {samples}")
+        samples = levels[flat]['samples']
+
+    return {
+        'samples': samples,
+        'use_adaptive_sampling': True,
+        'adaptive_threshold': NOISE_THRESHOLD,
+        'use_denoising': True,
+        'denoiser': denoiser,
+        'time_limit': budget,
+    }
+
+def apply_settings(scene, settings):
+    cycles = scene.cycles
+    cycles.samples = settings['samples']
+    cycles.use_adaptive_sampling = settings['use_adaptive_sampling']
+    cycles.adaptive_threshold = settings['adaptive_threshold']
+    cycles.use_denoising = settings['use_denoising']
+    cycles.denoiser = settings['denoiser']
+    cycles.time_limit = settings['time_limit']
+
+def tune(renderer, budget, probe_count=2):
+    """
+    Choose and apply Cycles settings that render the renderer's frames within `budget` seconds each, and record
+    them in the render folder.
+
+    :param renderer: CamerasRenderer with its cameras and frame range set.
+    :param budget: Seconds per frame.
+    :param probe_count: Probe frames per camera.
+    :return: The applied settings.
+    """
+    scene = renderer.scene
+    if scene.render.engine != 'CYCLES':
+        print("Warning: The frame time budget only applies to Cycles. Ignoring request...")
+        return None
+
+    settings_path = os.path.join(renderer.output_dir, SETTINGS_FILE)
+    settings = load_settings(settings_path, budget)
+    if settings is None:
+        settings = probe_once(renderer, budget, probe_count, settings_path)
+    else:
+        print(f"Using the render settings in {settings_path}")
+    if settings:
+        apply_settings(scene, settings)
+    return settings
+
+def load_settings(settings_path, budget):
+    """
+    :return: The settings recorded for this budget, or None if there are none.
+    """
+    try:
+        with open(settings_path, 'r') as f:
+            record = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return record['settings'] if record.get('budget') == budget else None
+
+def acquire_lock(lock_path, stale_after):
+    """
+    Create the lock file, taking it over if its holder stopped updating it.
+
+    :return: True if this process holds the lock.
+    """
+    try:
+        os.close(os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+        return True
+    except FileExistsError:
+        pass
+    try:
+        age = time.time() - os.path.getmtime(lock_path)
+    except OSError:
+        # Released in the meantime
+        return False
+    if age > stale_after:
+        print(f"Frame budget: taking over the probe lock {lock_path}, not updated for {age:.0f}s")
+        try:
+            os.remove(lock_path)
+        except OSError:
+            pass
+    return False
+
+def probe_once(renderer, budget, probe_count, settings_path, poll_interval=2):
+    """
+    Probe and record the settings, or wait for the process that is already probing this render folder.
+
+    :return: The settings, or None if nothing could be probed.
+    """
+    lock_path = settings_path + ".lock"
+    stale_after = max(PROBE_LOCK_STALE, 4 * budget)
+    waiting = False
+    while not acquire_lock(lock_path, stale_after):
+        if not waiting:
+            print(f"Frame budget: another process is probing, waiting for {settings_path}")
+            waiting = True
+        time.sleep(poll_interval)
+        settings = load_settings(settings_path, budget)
+        if settings:
+            print(f"Using the render settings in {settings_path}")
+            return settings
+
+    try:
+        # Another process may have finished probing just before this one got the lock
+        settings = load_settings(settings_path, budget)
+        if settings:
+            print(f"Using the render settings in {settings_path}")
+            return settings
+        return probe_and_record(renderer, budget, probe_count, settings_path, heartbeat=lambda: os.utime(lock_path))
+    finally:
+        try:
+            os.remove(lock_path)
+        except OSError:
+            pass
+
+def probe_and_record(renderer, budget, probe_count, settings_path, heartbeat=None):
+    scene = renderer.scene
+    denoiser = 'OPTIX' if scene.cycles.device == 'GPU' and renderer.compute_device_type == 'OPTIX' else 'OPENIMAGEDENOISE'
+    # Probe with the final denoiser and without a time limit, so the measurements match the real render
+    scene.cycles.use_denoising = True
+    scene.cycles.denoiser = denoiser
+    scene.cycles.use_adaptive_sampling = True
+    scene.cycles.adaptive_threshold = NOISE_THRESHOLD
+    scene.cycles.time_limit = 0
+
+    levels = probe(renderer, budget, probe_count, heartbeat=heartbeat)
+    if not levels:
+        print("Warning: No cameras or frames to probe for the frame time budget.")
+        return None
+    settings = choose_settings(levels, budget, denoiser)
+
+    record = {
+        'budget': budget,
+        'settings': settings,
+        'probes': levels,
+        'resolution': [scene.render.resolution_x, scene.render.resolution_y],
+        'blender': bpy.app.version_string,
+    }
+    temp_path = settings_path + f".{os.getpid()}.tmp"
+    with open(temp_path, 'w') as f:
+        json.dump(record, f, indent=2)
+    os.replace(temp_path, settings_path)
+    print(f"Frame budget {budget}s: {settings['samples']} samples (adaptive), {denoiser} denoiser; settings in {settings_path}")
+    return settings
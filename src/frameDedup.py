@@ -0,0 +1,102 @@
+import bpy
+import os
+import shutil
+import hashlib
+import numpy as np
+
+# Hold-frame deduplication. Sign language clips hold poses for many frames; with a static camera those frames
+# render to the same image. Every frame of the range is evaluated once and fingerprinted from what changes the
+# image: the evaluated pose bone matrices and object transforms of the avatar (and of any other animated object),
+# its shape key values, and per camera the camera's world matrix and lens. Only the first frame of each
+# fingerprint is rendered; the other frames get a hardlink (or copy) of its file, under their own frame number.
+#
+# Everything else in the scene (lights, materials, world) is assumed to be static, and motion blur must be off:
+# with motion blur a frame also depends on its neighbours.
+
+def read_floats(collection, attribute, size):
+    values = np.empty(len(collection) * size, dtype=np.float64)
+    collection.foreach_get(attribute, values)
+    return values
+
+def get_animated_objects(scene, collection_name="mainAvatar"):
+    """
+    :return: The avatar's objects plus every other animated object that isn't a camera.
+    """
+    objects = []
+    collection = bpy.data.collections.get(collection_name)
+    if collection:
+        objects.extend(collection.objects)
+    objects.extend(obj for obj in scene.objects if obj.animation_data and obj.type != 'CAMERA' and obj not in objects)
+    return objects
+
+def fingerprint_objects(objects, tolerance):
+    """
+    Fingerprint the evaluated state of objects: world matrices, pose bone matrices and shape key values, rounded
+    to `tolerance`.
+    """
+    sha = hashlib.blake2b(digest_size=16)
+    for obj in objects:
+        values = [np.array(obj.matrix_world, dtype=np.float64).ravel()]
+        if obj.type == 'ARMATURE' and obj.pose:
+            values.append(read_floats(obj.pose.bones, 'matrix', 16))
+        elif obj.type == 'MESH' and obj.data.shape_keys:
+            values.append(read_floats(obj.data.shape_keys.key_blocks, 'value', 1))
+        sha.update(obj.name.encode('utf-8'))
+        sha.update(np.round(np.concatenate(values) / tolerance).astype(np.int64).tobytes())
+    return sha.hexdigest()
+
+def fingerprint_camera(camera, tolerance):
+    values = np.concatenate([
+        np.array(camera.matrix_world, dtype=np.float64).ravel(),
+        [camera.data.lens, camera.data.shift_x, camera.data.shift_y, camera.data.dof.focus_distance],
+    ])
+    return hashlib.blake2b(np.round(values / tolerance).astype(np.int64).tobytes(), digest_size=16).hexdigest()
+
+def fingerprint_frames(scene, frames, cameras, tolerance=1e-5, known=None):
+    """
+    Evaluate frames and fingerprint the scene state seen by each camera.
+
+    :param frames: Frame numbers to fingerprint.
+    :param cameras: Camera objects.
+    :param known: Fingerprints from an earlier call; frames in it aren't evaluated again.
+    :return: Dictionary {frame: {camera name: fingerprint}}.
+    """
+    fingerprints = dict(known or {})
+    objects = get_animated_objects(scene)
+    frame_current = scene.frame_current
+    try:
+        for frame in frames:
+            if frame in fingerprints and all(camera.name in fingerprints[frame] for camera in cameras):
+                continue
+            scene.frame_set(frame)
+            state = fingerprint_objects(objects, tolerance)
+            fingerprints.setdefault(frame, {}).update(
+                (camera.name, state + fingerprint_camera(camera, tolerance)) for camera in cameras)
+    finally:
+        scene.frame_set(frame_current)
+    return fingerprints
+
+def find_duplicates(fingerprints, frames, camera_name):
+    """
+    :return: Dictionary {frame: earlier frame with the same fingerprint} for the frames that repeat an earlier one.
+    """
+    first = {}
+    duplicates = {}
+    for frame in frames:
+        fingerprint = fingerprints[frame][camera_name]
+        if fingerprint in first:
+            duplicates[frame] = first[fingerprint]
+        else:
+            first[fingerprint] = frame
+    return duplicates
+
+def fill_frame(source_path, target_path):
+    """
+    Make target_path a copy of source_path, as a hardlink where the file system supports it.
+    """
+    if os.path.exists(target_path):
+        os.remove(target_path)
+    try:
+        os.link(source_path, target_path)
+    except OSError:
+        shutil.copy2(source_path, target_path)
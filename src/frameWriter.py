@@ -0,0 +1,217 @@
+import os
+import sys
+import zlib
+import struct
+import threading
+import subprocess
+
+# Background compression of rendered frames. Blender writes each PNG frame uncompressed, which is fast, and hands
+# it to an AsyncFrameWriter; its worker processes recompress the image data with the requested zlib level and
+# atomically replace the file. Blender holds the GIL for the whole render call, so threads inside Blender would
+# only compress while Python runs between frames; separate processes compress while the next frame renders.
+#
+# Worker process (started by AsyncFrameWriter with Blender's bundled Python):
+#   python frameWriter.py <zlib level>
+# reads one frame path per line from stdin and answers every path with "ok\t<path>" or "<error>\t<path>".
+
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+PNG_END = b'\x00\x00\x00\x00IEND\xaeB`\x82'
+JPEG_START = b'\xff\xd8'
+JPEG_END = b'\xff\xd9'
+
+def read_png_chunks(path):
+    """
+    Read all chunks of a PNG file.
+
+    :param path: Path to the PNG file.
+    :return: List of (chunk type, chunk data) tuples.
+    """
+    with open(path, 'rb') as f:
+        data = f.read()
+    if not data.startswith(PNG_SIGNATURE):
+        raise ValueError(f"Not a PNG file: {path}")
+
+    chunks = []
+    offset = len(PNG_SIGNATURE)
+    while offset + 8 <= len(data):
+        length, chunk_type = struct.unpack('>I4s', data[offset:offset + 8])
+        chunk_data = data[offset + 8:offset + 8 + length]
+        crc = data[offset + 8 + length:offset + 12 + length]
+        if len(chunk_data) != length or len(crc) != 4 or struct.unpack('>I', crc)[0] != zlib.crc32(chunk_type + chunk_data):
+            raise ValueError(f"Corrupt PNG chunk {chunk_type!r} in {path}")
+        chunks.append((chunk_type, chunk_data))
+        offset += 12 + length
+        if chunk_type == b'IEND':
+            break
+    return chunks
+
+def write_png(path, chunks):
+    """
+    Write PNG chunks to a file, replacing it atomically.
+
+    :param path: Path to the PNG file.
+    :param chunks: List of (chunk type, chunk data) tuples.
+    """
+    temp_path = path + ".tmp"
+    with open(temp_path, 'wb') as f:
+        f.write(PNG_SIGNATURE)
+        for chunk_type, chunk_data in chunks:
+            f.write(struct.pack('>I', len(chunk_data)))
+            f.write(chunk_type)
+            f.write(chunk_data)
+            f.write(struct.pack('>I', zlib.crc32(chunk_type + chunk_data)))
+    os.replace(temp_path, path)
+
+def recompress_png(path, level):
+    """
+    Recompress the image data of a PNG file with another zlib level. Pixels and row filters stay the same.
+
+    :param path: Path to the PNG file.
+    :param level: zlib compression level, 0-9.
+    """
+    chunks = read_png_chunks(path)
+    image_data = zlib.decompress(b''.join(data for chunk_type, data in chunks if chunk_type == b'IDAT'))
+
+    output = []
+    for chunk_type, data in chunks:
+        if chunk_type == b'IDAT':
+            # All image data goes into the position of the first IDAT chunk
+            if not any(t == b'IDAT' for t, _ in output):
+                output.append((b'IDAT', zlib.compress(image_data, level)))
+        else:
+            output.append((chunk_type, data))
+    write_png(path, output)
+
+def compression_to_zlib_level(compression):
+    # Blender's 0-100% PNG compression maps onto zlib levels 0-9 the same way
+    return max(0, min(9, int(compression / 11.1111)))
+
+def is_valid_frame(path):
+    """
+    Check that a frame file was written completely: not empty and, for PNG and JPEG, with the signature at the
+    start and the end marker at the end. A render that crashed or a placeholder leaves a file that fails this.
+
+    :param path: Path to the frame file.
+    :return: True if the frame can be kept.
+    """
+    try:
+        size = os.path.getsize(path)
+        if size == 0:
+            return False
+        with open(path, 'rb') as f:
+            head = f.read(len(PNG_SIGNATURE))
+            f.seek(max(0, size - len(PNG_END)))
+            tail = f.read()
+    except OSError:
+        return False
+
+    if head.startswith(PNG_SIGNATURE[:4]):
+        return head == PNG_SIGNATURE and tail == PNG_END
+    if head.startswith(JPEG_START):
+        # Some writers pad after the end marker
+        return JPEG_END in tail
+    return True
+
+class AsyncFrameWriter:
+    def __init__(self, compression=15, workers=2, max_pending=None):
+        """
+        Frame sink for CamerasRenderer that compresses written PNG frames in background processes.
+
+        :param compression: Target PNG compression in percent (0-100), like Blender's setting.
+        :param workers: Number of compression processes.
+        :param max_pending: Maximum number of frames waiting for compression. When it is reached, the render loop
+            blocks until a worker catches up, so memory and disk usage can't grow without limit.
+        """
+        self.level = compression_to_zlib_level(compression)
+        self.slots = threading.Semaphore(max_pending or 2 * workers)
+        self.lock = threading.Lock()
+        self.errors = []
+        self.written = 0
+        self.workers = []
+        for _ in range(workers):
+            process = subprocess.Popen([sys.executable, os.path.abspath(__file__), str(self.level)],
+                                       stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True, bufsize=1)
+            worker = {'process': process, 'pending': 0, 'alive': True}
+            worker['reader'] = threading.Thread(target=self.__read_results, args=(worker,), daemon=True)
+            worker['reader'].start()
+            self.workers.append(worker)
+
+    def __read_results(self, worker):
+        for line in worker['process'].stdout:
+            status, path = line.rstrip('\r\n').split('\t', 1)
+            with self.lock:
+                worker['pending'] -= 1
+                if status == 'ok':
+                    self.written += 1
+                else:
+                    self.errors.append((path, status))
+            self.slots.release()
+
+        # The worker exited; frames it didn't answer stay uncompressed
+        with self.lock:
+            worker['alive'] = False
+            lost = worker['pending']
+            worker['pending'] = 0
+            if lost:
+                self.errors.append((f"{lost} frames", f"compression process exited with code {worker['process'].wait()}"))
+        for _ in range(lost):
+            self.slots.release()
+
+    def frame_written(self, camera_name, frame, path):
+        self.slots.acquire()
+        with self.lock:
+            alive = [worker for worker in self.workers if worker['alive']]
+            worker = min(alive, key=lambda w: w['pending']) if alive else None
+            if worker:
+                worker['pending'] += 1
+        if worker is None:
+            # Every worker died; compress on the render thread rather than leave the frame uncompressed
+            self.slots.release()
+            recompress_png(path, self.level)
+            with self.lock:
+                self.written += 1
+            return
+        try:
+            worker['process'].stdin.write(path + "\n")
+            worker['process'].stdin.flush()
+        except OSError:
+            # The reader thread releases the slot and records the frame once it sees the worker exit
+            pass
+
+    def finish(self):
+        """
+        Wait until every queued frame is compressed and stop the worker processes.
+        """
+        for worker in self.workers:
+            try:
+                worker['process'].stdin.close()
+            except OSError:
+                pass
+        for worker in self.workers:
+            worker['process'].wait()
+            worker['reader'].join()
+        self.workers = []
+
+        print(f"Compressed {self.written} frames in the background")
+        for path, error in self.errors:
+            print(f"Warning: compressing {path} failed: {error}")
+
+def serve_worker(level):
+    """
+    Compress the frames named on stdin, one path per line, and report each on stdout.
+    """
+    for line in sys.stdin:
+        path = line.rstrip('\r\n')
+        try:
+            recompress_png(path, level)
+            status = 'ok'
+        except Exception as e:
+            status = f"{type(e).__name__}: {e}".replace('\t', ' ').replace('\n', ' ')
+        sys.stdout.write(f"{status}\t{path}\n")
+        sys.stdout.flush()
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        print("Usage: python frameWriter.py <zlib level> < frame paths")
+        sys.exit(1)
+    serve_worker(int(sys.argv[1]))
@@ -0,0 +1,132 @@
+import bpy
+import os
+import json
+import hashlib
+
+import importAnim as ia
+import jobCache
+
+# Cache of imported animation files. The first import of a file writes the importedAnimation collection (the
+# armature, the face mesh and their body and shape key actions) into a small .blend library; later jobs append it
+# from there instead of running the glTF or FBX importer again. Libraries are keyed by the file contents, the
+# importer options and the Blender version, and the cache folder is kept below a size limit by evicting the least
+# recently used libraries.
+
+CACHE_FOLDER = "imports"
+
+def get_import_key(filepath):
+    """
+    :return: Hex key of an import: file hash, importer options and Blender version.
+    """
+    options = ia.AnimImporter.FBX_IMPORT_OPTIONS if filepath.lower().endswith(".fbx") else ia.AnimImporter.GLB_IMPORT_OPTIONS
+    description = {
+        'file': jobCache.hash_file(filepath),
+        'format': os.path.splitext(filepath)[1].lower(),
+        'options': options,
+        'blender': bpy.app.version_string,
+    }
+    return hashlib.sha256(json.dumps(description, sort_keys=True).encode('utf-8')).hexdigest()
+
+def get_library_path(cache_dir, key):
+    return os.path.join(cache_dir, CACHE_FOLDER, f"import_{key[:16]}.blend")
+
+def load_library(library_path, collection_name):
+    """
+    Append the cached collection and link it to the scene.
+
+    :return: True if the collection was loaded.
+    """
+    try:
+        with bpy.data.libraries.load(library_path) as (data_from, data_to):
+            if collection_name not in data_from.collections:
+                return False
+            data_to.collections = [collection_name]
+    except OSError as e:
+        print(f"Import cache {library_path} can't be read: {e}")
+        return False
+
+    collection = data_to.collections[0]
+    if collection is None:
+        return False
+    if collection.name != collection_name:
+        # A leftover collection of the same name would make the importer's lookups find the wrong one
+        print(f"Import cache: loaded collection was renamed to {collection.name}, ignoring the cache.")
+        bpy.data.collections.remove(collection)
+        return False
+    bpy.context.scene.collection.children.link(collection)
+    return True
+
+def store_library(library_path, importer):
+    """
+    Write the imported collection and its actions into a library, atomically so parallel jobs can share the cache.
+    """
+    collection = bpy.data.collections[importer.collection_name]
+    data_blocks = {collection}
+    data_blocks.update(action for action in (importer.action, importer.shape_key_action) if action is not None)
+
+    os.makedirs(os.path.dirname(library_path), exist_ok=True)
+    temp_path = f"{os.path.splitext(library_path)[0]}.{os.getpid()}.tmp.blend"
+    bpy.data.libraries.write(temp_path, data_blocks, fake_user=True)
+    os.replace(temp_path, library_path)
+
+def evict(cache_dir, max_size_mb, keep=None):
+    """
+    Remove the least recently used libraries until the cache folder is below max_size_mb.
+
+    :param keep: Library that is never removed (the one just used).
+    """
+    folder = os.path.join(cache_dir, CACHE_FOLDER)
+    entries = []
+    for file_name in os.listdir(folder):
+        if not file_name.startswith("import_") or not file_name.endswith(".blend") or ".tmp" in file_name:
+            continue
+        path = os.path.join(folder, file_name)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        entries.append((stat.st_mtime, stat.st_size, path))
+
+    total = sum(size for _, size, _ in entries)
+    max_bytes = max_size_mb * 1024 * 1024
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        if path == keep:
+            continue
+        try:
+            os.remove(path)
+            total -= size
+            print(f"Import cache: evicted {os.path.basename(path)}")
+        except OSError:
+            pass
+
+def import_animation(filepath, cache_dir, max_size_mb):
+    """
+    Import an animation file, from the cache if it was imported before.
+
+    :param filepath: Path to the .glb or .fbx file.
+    :param cache_dir: Folder for caches shared between jobs.
+    :param max_size_mb: Size limit of the import cache in MB.
+    :return: AnimImporter with the importedAnimation collection in the scene.
+    """
+    library_path = get_library_path(cache_dir, get_import_key(filepath))
+    importer = ia.AnimImporter()
+    importer.filepath = filepath
+
+    if os.path.isfile(library_path) and load_library(library_path, importer.collection_name):
+        # Mark as recently used for the eviction
+        os.utime(library_path)
+        print(f"Loaded the imported animation from the cache {library_path}")
+        importer.find_action_body()
+        importer.find_shape_key_animation()
+        return importer
+
+    importer = ia.AnimImporter(filepath)
+    try:
+        store_library(library_path, importer)
+        print(f"Stored the imported animation in the cache {library_path}")
+        evict(cache_dir, max_size_mb, keep=library_path)
+    except (OSError, RuntimeError) as e:
+        print(f"Warning: couldn't store the imported animation in the cache: {e}")
+    return importer
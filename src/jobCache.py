@@ -0,0 +1,159 @@
+import os
+import glob
+import json
+import hashlib
+
+import frameWriter
+
+# Content-addressed job keys. A job key hashes everything that influences a job's output: the input file, the
+# scene .blend, the optional background file and every render argument. When a job finishes, mainProcessing.py
+# records the key and the outputs it wrote in the manifest folder inside the output folder, so a later run can
+# skip jobs that were already rendered with exactly the same inputs and settings.
+
+MANIFEST_FOLDER = "render_manifest"
+
+file_hashes = {}
+
+def hash_file(path, chunk_size=1024 * 1024):
+    """
+    Hash the contents of a file. Results are cached per path, size and modification time.
+
+    :param path: Path to the file.
+    :return: Hex encoded SHA-256 of the file contents.
+    """
+    stat = os.stat(path)
+    cache_key = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+    if cache_key in file_hashes:
+        return file_hashes[cache_key]
+
+    sha = hashlib.sha256()
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            sha.update(chunk)
+
+    file_hashes[cache_key] = sha.hexdigest()
+    return file_hashes[cache_key]
+
+def compute_job_key(job_args, scene_path, background=None):
+    """
+    Compute the content-addressed key of a job.
+
+    :param job_args: Arguments for mainProcessing.py, starting with the input file path.
+    :param scene_path: Path to the scene .blend the job renders in.
+    :param background: Optional path to the background file.
+    :return: Hex encoded key.
+    """
+    # Paths are replaced by content hashes so moving files around doesn't invalidate renders
+    args = list(job_args[1:])
+    if background and '--background_path' in args:
+        args[args.index('--background_path') + 1] = None
+
+    description = {
+        'input': hash_file(job_args[0]),
+        'scene': hash_file(scene_path),
+        'background': hash_file(background) if background else None,
+        'args': args,
+    }
+    return hashlib.sha256(json.dumps(description, sort_keys=True).encode('utf-8')).hexdigest()
+
+def count_valid_frames(camera_dir):
+    """
+    :return: Number of completely written files in a camera folder; placeholders and partial frames don't count.
+    """
+    return sum(frameWriter.is_valid_frame(os.path.join(camera_dir, file_name)) for file_name in os.listdir(camera_dir))
+
+def get_manifest_path(output_folder, job_key):
+    return os.path.join(output_folder, MANIFEST_FOLDER, f"{job_key}.json")
+
+def record_completed_job(output_folder, job_key, input_file, render_dir):
+    """
+    Record a finished job and the valid frames it wrote per camera in the manifest.
+
+    :param output_folder: Base output folder holding the manifest.
+    :param job_key: Key of the job, see compute_job_key.
+    :param input_file: The animation file that was rendered.
+    :param render_dir: Folder the job rendered into.
+    """
+    outputs = {}
+    for camera_name in sorted(os.listdir(render_dir)):
+        camera_dir = os.path.join(render_dir, camera_name)
+        if os.path.isdir(camera_dir):
+            outputs[camera_name] = count_valid_frames(camera_dir)
+
+    record = {
+        'key': job_key,
+        'input': input_file,
+        'output_dir': render_dir,
+        'outputs': outputs,
+    }
+
+    manifest_path = get_manifest_path(output_folder, job_key)
+    if not os.path.exists(os.path.dirname(manifest_path)):
+        os.makedirs(os.path.dirname(manifest_path), exist_ok=True)
+
+    # Write to a temporary file first so a crash never leaves a half written record behind
+    temp_path = manifest_path + f".{os.getpid()}.tmp"
+    with open(temp_path, 'w') as f:
+        json.dump(record, f, indent=2)
+    os.replace(temp_path, manifest_path)
+
+def get_job_marker_name(job_key):
+    return f"job_{job_key[:16]}.json"
+
+def write_job_marker(render_dir, job_key, input_file):
+    """
+    Mark a render folder as belonging to a job, so an interrupted job can be resumed in it.
+
+    :param render_dir: Folder the job renders into.
+    :param job_key: Key of the job, see compute_job_key.
+    :param input_file: The animation file that is rendered.
+    """
+    marker_path = os.path.join(render_dir, get_job_marker_name(job_key))
+    with open(marker_path, 'w') as f:
+        json.dump({'key': job_key, 'input': input_file}, f, indent=2)
+
+def find_render_dir(output_folder, file_name, job_key):
+    """
+    Find the render folder an earlier run of a job wrote into (<output>/<date>/<file name>/render_N).
+
+    :return: The most recently started matching folder, or None.
+    """
+    pattern = os.path.join(glob.escape(output_folder), '*', glob.escape(file_name), 'render_*', get_job_marker_name(job_key))
+    found = []
+    for marker_path in glob.glob(pattern):
+        try:
+            with open(marker_path, 'r') as f:
+                if json.load(f).get('key') != job_key:
+                    continue
+            found.append((os.path.getmtime(marker_path), os.path.dirname(marker_path)))
+        except (OSError, ValueError):
+            continue
+    return max(found)[1] if found else None
+
+def is_job_complete(output_folder, job_key):
+    """
+    Check whether a job with this key was rendered before and all of its outputs are still there.
+
+    :return: True if the job can be skipped.
+    """
+    manifest_path = get_manifest_path(output_folder, job_key)
+    if not os.path.isfile(manifest_path):
+        return False
+
+    try:
+        with open(manifest_path, 'r') as f:
+            record = json.load(f)
+    except (OSError, ValueError):
+        return False
+
+    if not record.get('outputs'):
+        return False
+
+    for camera_name, count in record['outputs'].items():
+        camera_dir = os.path.join(record['output_dir'], camera_name)
+        if not os.path.isdir(camera_dir) or count_valid_frames(camera_dir) < count:
+            return False
+    return True
@@ -0,0 +1,263 @@
+import os
+import re
+import sys
+import time
+import threading
+import subprocess
+from collections import deque
+
+# Follows the output of running Blender jobs. Every job's output goes into <log_dir>/<job>.log; the lines that
+# CamerasRenderer and Blender print are parsed on the way to keep count of rendered frames:
+#
+#   Frames to render: 600      (once per render call, with the number of frames it will render)
+#   Rendered frame 12 of Cam_Front
+#   Saved: '/output/Cam_Front/frame_0012.png'      (Blender, after writing a frame)
+#
+# From these the monitor prints a status line with frames per second per job, frames done out of the (estimated)
+# total of the run and an ETA, and flags jobs that didn't finish a frame for `stall_timeout` seconds. Any other
+# output, such as Cycles' per-sample lines, doesn't count as progress.
+
+FRAMES_TOTAL_PATTERN = re.compile(r'^Frames to render: (\d+)')
+FRAME_DONE_PATTERN = re.compile(r'^Rendered frame (\d+)')
+FRAME_SAVED_PATTERN = re.compile(r'^Saved: ')
+
+def format_seconds(seconds):
+    seconds = int(seconds)
+    if seconds >= 3600:
+        return f"{seconds // 3600}h{seconds % 3600 // 60:02d}m"
+    return f"{seconds // 60}m{seconds % 60:02d}s"
+
+class JobMonitor:
+    def __init__(self, log_dir, total_jobs=None, stall_timeout=600, interval=None, tail_lines=20, expected_frames=None):
+        """
+        :param log_dir: Folder for the per-job log files.
+        :param total_jobs: Number of jobs in the run, used for the frame total estimate (None if unknown).
+        :param stall_timeout: Seconds without a finished frame after which a running job is flagged as stalled.
+        :param expected_frames: {job name: frames per camera} of every job in the run, from inspecting the animation
+            files (None where unknown). Gives the frame total of the whole queue before the jobs report their own.
+        :param interval: Seconds between status lines (default: 2 on a terminal, 60 otherwise).
+        :param tail_lines: Number of log lines to print when a job fails.
+        """
+        self.log_dir = log_dir
+        self.total_jobs = total_jobs
+        self.expected_frames = expected_frames or {}
+        self.stall_timeout = stall_timeout
+        self.interactive = sys.stdout.isatty()
+        self.interval = interval or (2 if self.interactive else 60)
+        self.tail_lines = tail_lines
+        self.jobs = {}
+        self.lock = threading.Lock()
+        self.start_time = time.time()
+        self.stop_event = threading.Event()
+        self.thread = None
+        os.makedirs(log_dir, exist_ok=True)
+
+    def get_log_path(self, name):
+        return os.path.join(self.log_dir, f"{name}.log")
+
+    def start(self):
+        """
+        Start printing status lines in the background.
+        """
+        self.start_time = time.time()
+        self.thread = threading.Thread(target=self.__report, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread:
+            self.thread.join()
+            self.thread = None
+        if self.interactive:
+            print()
+        print(self.status_line())
+
+    def __report(self):
+        last_report = time.time()
+        while not self.stop_event.wait(1):
+            self.check_stalls()
+            if time.time() - last_report < self.interval:
+                continue
+            last_report = time.time()
+            if self.interactive:
+                sys.stdout.write("\r" + self.status_line()[:200].ljust(200))
+                sys.stdout.flush()
+            else:
+                print(self.status_line())
+
+    def job_started(self, name, log_path=None):
+        with self.lock:
+            self.jobs[name] = {
+                'start': time.time(),
+                'last_output': time.time(),
+                'last_progress': time.time(),
+                'frames_total': None,
+                'frames_done': 0,
+                'returncode': None,
+                'finished': False,
+                'stalled': False,
+                'log_path': log_path,
+                'tail': deque(maxlen=self.tail_lines),
+                'pump': None,
+            }
+
+    def feed(self, name, line):
+        """
+        Process one line of a job's output.
+        """
+        with self.lock:
+            job = self.jobs.get(name)
+            if job is None:
+                return
+            job['last_output'] = time.time()
+            job['tail'].append(line.rstrip('\n'))
+
+            match = FRAMES_TOTAL_PATTERN.match(line)
+            if match:
+                job['frames_total'] = (job['frames_total'] or 0) + int(match.group(1))
+                return
+            frame_done = FRAME_DONE_PATTERN.match(line)
+            if not frame_done and not FRAME_SAVED_PATTERN.match(line):
+                return
+            if frame_done:
+                job['frames_done'] += 1
+            job['last_progress'] = time.time()
+            if job['stalled']:
+                job['stalled'] = False
+                print(f"\nJob {name} is making progress again")
+
+    def pump(self, name, pipe, log_file):
+        """
+        Copy a pipe into a log file line by line and feed every line to the monitor, until the pipe closes.
+        """
+        for line in iter(pipe.readline, ''):
+            log_file.write(line)
+            log_file.flush()
+            self.feed(name, line)
+        pipe.close()
+
+    def start_process(self, name, command):
+        """
+        Start a command with its output going to the job's log file through the monitor.
+
+        :return: The Popen object. Call job_finished once it has exited.
+        """
+        log_path = self.get_log_path(name)
+        log_file = open(log_path, 'w', encoding='utf-8', errors='replace')
+        log_file.write(f"{command}\n\n")
+
+        # Python output in Blender is block buffered when piped; the frame lines have to arrive right away
+        env = dict(os.environ, PYTHONUNBUFFERED='1')
+        process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, encoding='utf-8', errors='replace', env=env)
+
+        self.job_started(name, log_path)
+        pump = threading.Thread(target=self.__pump_and_close, args=(name, process.stdout, log_file), daemon=True)
+        pump.start()
+        self.jobs[name]['pump'] = pump
+        return process
+
+    def __pump_and_close(self, name, pipe, log_file):
+        try:
+            self.pump(name, pipe, log_file)
+        finally:
+            log_file.close()
+
+    def job_finished(self, name, returncode):
+        """
+        Mark a job as finished; for a failed job, print the end of its log.
+        """
+        job = self.jobs.get(name)
+        if job is None:
+            return
+        if job['pump']:
+            job['pump'].join()
+        with self.lock:
+            job['finished'] = True
+            job['returncode'] = returncode
+            job['end'] = time.time()
+
+        if returncode not in (0, None):
+            print(f"\nJob {name} failed (exit code {returncode}). Last lines of {job['log_path'] or 'its output'}:")
+            for line in job['tail']:
+                print(f"  | {line}")
+
+    def check_stalls(self):
+        """
+        Flag running jobs that haven't finished a frame for stall_timeout seconds (since they started, before the
+        first frame).
+
+        :return: Names of the stalled jobs.
+        """
+        now = time.time()
+        stalled = []
+        with self.lock:
+            for name, job in self.jobs.items():
+                if job['finished'] or now - job['last_progress'] < self.stall_timeout:
+                    continue
+                stalled.append(name)
+                if not job['stalled']:
+                    job['stalled'] = True
+                    print(f"\nWarning: job {name} made no progress for {format_seconds(now - job['last_progress'])} "
+                          f"(log: {job['log_path'] or '-'})")
+        return stalled
+
+    def estimate_total_frames(self, jobs):
+        """
+        Estimate the frames of the whole run: the jobs that reported their frame count, plus the expected frames of
+        the others times the cameras per frame seen so far. Without expected frames, jobs that didn't report yet are
+        assumed to be as long as the ones that did.
+
+        :param jobs: List of (name, job) of the started jobs.
+        :return: The estimate, or None before any job reported its frame count.
+        """
+        reported = {name: job['frames_total'] for name, job in jobs if job['frames_total']}
+        if not reported:
+            return None
+
+        known = [frames for frames in self.expected_frames.values() if frames]
+        ratios = [frames / self.expected_frames[name] for name, frames in reported.items() if self.expected_frames.get(name)]
+        if known and ratios:
+            # Frames to render per expected frame: the number of cameras, less with resume or dedup
+            ratio = sum(ratios) / len(ratios)
+            average = sum(known) / len(known)
+            remaining = [name for name in self.expected_frames if name not in reported]
+            return int(sum(reported.values()) + ratio * sum(self.expected_frames[name] or average for name in remaining))
+
+        average = sum(reported.values()) / len(reported)
+        total_jobs = max(self.total_jobs or 0, len(jobs))
+        return int(sum(reported.values()) + average * (total_jobs - len(reported)))
+
+    def status_line(self):
+        """
+        :return: One line with jobs done, frames done out of the estimated total, throughput, ETA and per-job fps.
+        """
+        now = time.time()
+        with self.lock:
+            jobs = list(self.jobs.items())
+
+        done_frames = sum(job['frames_done'] for _, job in jobs)
+        finished = sum(1 for _, job in jobs if job['finished'])
+
+        total_frames = self.estimate_total_frames(jobs)
+
+        elapsed = max(now - self.start_time, 1e-6)
+        fps = done_frames / elapsed
+        parts = [f"jobs {finished}/{self.total_jobs if self.total_jobs else '?'}"]
+        if total_frames:
+            parts.append(f"frames {done_frames}/~{total_frames}")
+        else:
+            parts.append(f"frames {done_frames}")
+        parts.append(f"{fps:.2f} fps")
+        if total_frames and fps > 0:
+            parts.append(f"ETA {format_seconds(max(0, total_frames - done_frames) / fps)}")
+
+        running = []
+        for name, job in jobs:
+            if job['finished']:
+                continue
+            job_fps = job['frames_done'] / max(now - job['start'], 1e-6)
+            progress = f"{job['frames_done']}/{job['frames_total']}" if job['frames_total'] else f"{job['frames_done']}"
+            running.append(f"{name} {progress} {job_fps:.2f}fps{' STALLED' if job['stalled'] else ''}")
+        if running:
+            parts.append("; ".join(running))
+        return f"[{format_seconds(elapsed)}] " + " | ".join(parts)
@@ -0,0 +1,229 @@
+import os
+import json
+import time
+import socket
+import threading
+import subprocess
+
+# Job queue on shared storage (e.g. a NAS mounted on every render node). The coordinator writes one JSON file
+# per job into pending/. Workers on any node claim a job by renaming it into claimed/ (rename is atomic, so only
+# one worker wins), keep the claim alive by touching the file while the job runs, and move it to done/ or
+# failed/ afterwards. Claims that stop receiving heartbeats are renamed back into pending/ by any worker.
+#
+# Heartbeat ages are measured against the storage's clock, not the node's: a worker touches <queue>/clock and
+# compares the claims' modification times with its modification time. With NFS both are set by the server, so the
+# nodes' clocks don't have to be in sync. Storage that takes file times from the client's clock (some SMB setups)
+# needs the nodes' clocks synced, e.g. with NTP, to well within stale_after.
+#
+#   <queue>/clock
+#   <queue>/pending/<job>.json
+#   <queue>/claimed/<job>@<worker>.json
+#   <queue>/done/<job>.json
+#   <queue>/failed/<job>.json
+
+STATES = ['pending', 'claimed', 'done', 'failed']
+
+def init_queue(queue_dir):
+    for state in STATES:
+        os.makedirs(os.path.join(queue_dir, state), exist_ok=True)
+
+def write_json_atomic(path, data):
+    temp_path = path + f".{socket.gethostname()}-{os.getpid()}.tmp"
+    with open(temp_path, 'w') as f:
+        json.dump(data, f, indent=2)
+    os.replace(temp_path, path)
+
+def get_queue_time(queue_dir):
+    """
+    :return: Current time of the shared storage, as the modification time of a freshly touched reference file.
+    """
+    clock_path = os.path.join(queue_dir, 'clock')
+    with open(clock_path, 'a'):
+        pass
+    os.utime(clock_path)
+    return os.path.getmtime(clock_path)
+
+def job_id_from_claim(claim_name):
+    return claim_name.rsplit('@', 1)[0]
+
+def list_jobs(queue_dir, state):
+    folder = os.path.join(queue_dir, state)
+    return sorted(name for name in os.listdir(folder) if name.endswith('.json'))
+
+def submit_jobs(queue_dir, jobs, force=False):
+    """
+    Write jobs into the queue. Jobs that are already pending, claimed or done are left alone; failed jobs are
+    queued again.
+
+    :param queue_dir: Queue folder on shared storage.
+    :param jobs: List of (job id, job dict) tuples. The job dict holds everything a worker needs to build the
+        Blender command (scene, script arguments, ...).
+    :param force: Queue jobs that are already done again, replacing their done/ entry.
+    :return: Number of jobs added to pending/.
+    """
+    init_queue(queue_dir)
+    known = set(list_jobs(queue_dir, 'pending'))
+    if not force:
+        known |= set(list_jobs(queue_dir, 'done'))
+    known |= set(job_id_from_claim(name[:-len('.json')]) + '.json' for name in list_jobs(queue_dir, 'claimed'))
+
+    added = 0
+    for job_id, job in jobs:
+        file_name = f"{job_id}.json"
+        if file_name in known:
+            print(f"Queue already has {job_id}, not adding it again")
+            continue
+
+        for state in ['failed', 'done']:
+            try:
+                os.remove(os.path.join(queue_dir, state, file_name))
+            except FileNotFoundError:
+                pass
+
+        write_json_atomic(os.path.join(queue_dir, 'pending', file_name), {'id': job_id, 'job': job})
+        added += 1
+    return added
+
+def queue_status(queue_dir):
+    """
+    :return: Dictionary with the number of jobs per state.
+    """
+    return {state: len(list_jobs(queue_dir, state)) for state in STATES}
+
+class QueueWorker:
+    def __init__(self, queue_dir, build_command, worker_id=None, heartbeat_interval=15, stale_after=120, poll_interval=5, monitor=None):
+        """
+        Worker that claims jobs from a shared queue folder and runs them until the queue is drained.
+
+        :param queue_dir: Queue folder on shared storage.
+        :param build_command: Callable turning a job dict into the command line to run on this node.
+        :param worker_id: Unique id of this worker (default: host name and process id).
+        :param heartbeat_interval: Seconds between heartbeats on the claimed job.
+        :param stale_after: Seconds without heartbeat after which a claim is considered dead and re-queued.
+        :param poll_interval: Seconds to wait before looking again when nothing can be claimed.
+        :param monitor: Optional JobMonitor that captures each job's output in a log file and reports progress.
+        """
+        self.queue_dir = queue_dir
+        self.build_command = build_command
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+        self.heartbeat_interval = heartbeat_interval
+        self.stale_after = stale_after
+        self.poll_interval = poll_interval
+        self.results = []
+        self.monitor = monitor
+        init_queue(queue_dir)
+
+    def requeue_stale_claims(self):
+        """
+        Move claims whose heartbeat stopped back into pending/.
+
+        :return: Number of re-queued jobs.
+        """
+        requeued = 0
+        claimed_dir = os.path.join(self.queue_dir, 'claimed')
+        claims = list_jobs(self.queue_dir, 'claimed')
+        if not claims:
+            return requeued
+        now = get_queue_time(self.queue_dir)
+        for claim_name in claims:
+            claim_path = os.path.join(claimed_dir, claim_name)
+            try:
+                age = now - os.path.getmtime(claim_path)
+            except FileNotFoundError:
+                continue
+            if age < self.stale_after:
+                continue
+
+            job_id = job_id_from_claim(claim_name[:-len('.json')])
+            try:
+                os.rename(claim_path, os.path.join(self.queue_dir, 'pending', f"{job_id}.json"))
+            except FileNotFoundError:
+                # Another worker re-queued it first, or the owner just finished
+                continue
+            print(f"Worker {self.worker_id}: re-queued stale job {job_id} (no heartbeat for {age:.0f}s)")
+            requeued += 1
+        return requeued
+
+    def claim_job(self):
+        """
+        Atomically claim the first pending job.
+
+        :return: (job id, path to the claim file, job dict), or None if nothing could be claimed.
+        """
+        for file_name in list_jobs(self.queue_dir, 'pending'):
+            job_id = file_name[:-len('.json')]
+            pending_path = os.path.join(self.queue_dir, 'pending', file_name)
+            claim_path = os.path.join(self.queue_dir, 'claimed', f"{job_id}@{self.worker_id}.json")
+            try:
+                # Refresh the modification time first so the claim isn't mistaken for a stale one
+                os.utime(pending_path)
+                os.rename(pending_path, claim_path)
+            except FileNotFoundError:
+                continue
+
+            # Claiming counts as the first heartbeat
+            os.utime(claim_path)
+            with open(claim_path, 'r') as f:
+                return job_id, claim_path, json.load(f)['job']
+        return None
+
+    def __heartbeat(self, claim_path, stop):
+        while not stop.wait(self.heartbeat_interval):
+            try:
+                os.utime(claim_path)
+            except FileNotFoundError:
+                print(f"Worker {self.worker_id}: lost the claim on {os.path.basename(claim_path)}")
+                return
+
+    def run_job(self, job_id, claim_path, job):
+        command = self.build_command(job)
+        print(f"Worker {self.worker_id}: running {job_id}\n{command}\n")
+
+        stop = threading.Event()
+        heartbeat = threading.Thread(target=self.__heartbeat, args=(claim_path, stop), daemon=True)
+        heartbeat.start()
+        start = time.time()
+        try:
+            if self.monitor:
+                returncode = self.monitor.start_process(job_id, command).wait()
+                self.monitor.job_finished(job_id, returncode)
+            else:
+                returncode = subprocess.run(command).returncode
+        finally:
+            stop.set()
+            heartbeat.join()
+
+        seconds = time.time() - start
+        self.results.append({'name': job_id, 'returncode': returncode, 'seconds': seconds})
+
+        state = 'done' if returncode == 0 else 'failed'
+        record = {'id': job_id, 'job': job, 'worker': self.worker_id, 'returncode': returncode, 'seconds': seconds}
+        result_path = os.path.join(self.queue_dir, state, f"{job_id}.json")
+        try:
+            os.rename(claim_path, result_path)
+            write_json_atomic(result_path, record)
+        except FileNotFoundError:
+            # The claim was re-queued while we were running; the job will run again elsewhere
+            print(f"Worker {self.worker_id}: claim on {job_id} was re-queued before the job finished")
+
+    def run(self):
+        """
+        Claim and run jobs until no job is pending or claimed anymore.
+
+        :return: List of result dicts with name, returncode and seconds for the jobs this worker ran.
+        """
+        print(f"Worker {self.worker_id} serving queue {self.queue_dir}")
+        while True:
+            self.requeue_stale_claims()
+            claimed = self.claim_job()
+            if claimed:
+                self.run_job(*claimed)
+                continue
+
+            # Nothing to claim; stay around while other workers' claims might still come back
+            if not list_jobs(self.queue_dir, 'claimed'):
+                break
+            time.sleep(self.poll_interval)
+
+        print(f"Worker {self.worker_id}: queue drained, ran {len(self.results)} jobs")
+        return self.results
@@ -0,0 +1,96 @@
+import bpy
+import sys
+import os
+import json
+import time
+import socket
+import argparse
+import traceback
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(script_dir)  # Add current directory
+
+import mainProcessing
+
+# Runs inside a long-lived Blender process. Connects back to the dispatcher (workerPool.BlenderWorkerPool),
+# receives jobs as JSON lines and runs them through mainProcessing.process_file. Between jobs the scene is
+# reloaded from disk so every job starts from a pristine copy, while Blender itself, Cycles and the add-ons
+# stay initialized.
+
+def send_message(stream, message):
+    stream.write(json.dumps(message) + "\n")
+    stream.flush()
+
+def reset_scene(scene_path):
+    """
+    Reload the scene from disk, discarding everything the previous job changed.
+
+    :param scene_path: Path to the .blend file to reload.
+    :return: Seconds spent reloading.
+    """
+    start = time.time()
+    bpy.ops.wm.open_mainfile(filepath=scene_path, load_ui=False)
+    return time.time() - start
+
+def run_job(job_args):
+    """
+    Run a single job and translate its outcome into an exit code.
+
+    :param job_args: Arguments for mainProcessing.process_file.
+    :return: 0 on success, non-zero on failure.
+    """
+    try:
+        mainProcessing.process_file(job_args)
+    except SystemExit as e:
+        return e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+    except Exception:
+        traceback.print_exc()
+        return 1
+    return 0
+
+def serve(host, port, worker_id):
+    scene_path = bpy.data.filepath
+    if not scene_path:
+        print("Job server needs a saved scene to reset to between jobs.")
+        return
+
+    sock = socket.create_connection((host, port))
+    stream = sock.makefile('rw', encoding='utf-8', newline='\n')
+    send_message(stream, {'type': 'hello', 'worker': worker_id})
+
+    pristine = True
+    for line in stream:
+        message = json.loads(line)
+        if message['type'] == 'quit':
+            break
+        if message['type'] != 'job':
+            print(f"Job server {worker_id}: ignoring unknown message {message}")
+            continue
+
+        reset_seconds = 0.0
+        if not pristine:
+            reset_seconds = reset_scene(scene_path)
+        pristine = False
+
+        print(f"Job server {worker_id}: starting job {message['name']}")
+        start = time.time()
+        status = run_job(message['args'])
+        send_message(stream, {
+            'type': 'done',
+            'name': message['name'],
+            'status': status,
+            'seconds': time.time() - start,
+            'reset_seconds': reset_seconds,
+        })
+
+    stream.close()
+    sock.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve render jobs to a BlenderAutoRender dispatcher.")
+    parser.add_argument("--host", type=str, default="127.0.0.1", help="Dispatcher host to connect to.")
+    parser.add_argument("--port", type=int, required=True, help="Dispatcher port to connect to.")
+    parser.add_argument("--worker", type=int, default=0, help="Id of this worker, used in log output.")
+    args = parser.parse_args(sys.argv[sys.argv.index("--") + 1:])
+
+    serve(args.host, args.port, args.worker)
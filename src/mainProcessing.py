@@ -8,60 +8,112 @@ sys.path.append(script_dir)  # Add current directory
 import renderCameras as rc
 import importAnim as ia
 import optionalScripts.vicon_color as vc
+import optionalScripts.replaceBackground as rb
 import bonerolls
+import jobCache
+import stageStats
+import compatIndex
+import importCache
 
-# Parse arguments passed after '--'
-argv = sys.argv[sys.argv.index("--") + 1:]  # Get arguments after '--'
+def replace_background(background_path):
+    rb.replace_background(background_path)
 
-# Required arguments
-glb_file = argv[0]  # Path to the .glb file
-output_folder = argv[1]  # Path to the output folder
-render_engine = argv[2]  # Render engine to use ("CYCLES" or "BLENDER_EEVEE")
-
-# Optional arguments
-background_path = None
-timestretch = None
-
-# Optional: Replace the background
-if '--background_path' in argv:
-    background_path = argv[argv.index('--background_path') + 1]
-    # Prepare arguments for the script
-    sys.argv = [__file__, "--", background_path]
-    # Run the background script
-    bpy.ops.script.python_file_run(filepath=os.path.join(os.path.dirname(__file__), "optionalScripts/replaceBackground.py"))
-
-# Optional: Apply time-stretching
-if '--timestretch' in argv:
-    target_fps = int(argv[argv.index('--timestretch') + 1])
-    old_fps = int(argv[argv.index('--timestretch') + 2])
-    timestretch = (target_fps, old_fps)
-    target_fps, old_fps = timestretch
+def apply_timestretch(target_fps, old_fps):
     # Prepare arguments for the script
     sys.argv = [__file__, "--", str(target_fps), str(old_fps)]
     # Run the time-stretching script
     bpy.ops.script.python_file_run(filepath=os.path.join(os.path.dirname(__file__), "optionalScripts/timeStretch.py"))
 
-# Load the .glb file, load all relevant animations, and transfer them to the target avatar. Then remove the imported collection
-print("Importing the following .glb file:", glb_file)
-importer = ia.AnimImporter(glb_file)
-importer.find_action_body()
-importer.find_shape_key_animation()
-if '--bone_roll' in argv and argv[argv.index('--bone_roll') + 1] == 'True':
-    bonerolls.copy_bone_rolls()
-start_frame, end_frame = importer.get_animation_range()
-print("frame range:", start_frame, end_frame)
-print("Imported the following animations:", importer.action, importer.shape_key_action)
-transfer = ia.AnimationTransfer(importer.action, importer.shape_key_action, bpy.data.collections["mainAvatar"])
-print("Transferring animations...")
-transfer.transfer_bone_animation()
-transfer.transfer_shape_key_animation()
-importer.remove_collection_and_contents()
-print("Animations transfer done.")
-
-# Optional: Apply modifiers and constraints to all cameras
-if '--cameras_apply_modifiers' in argv and argv[argv.index('--cameras_apply_modifiers') + 1] == 'True':
-    # On the Cameras collection, for each camera, apply their modifiers and constraints
+def get_cache_dir(argv):
+    """
+    Folder for caches shared between jobs: --cache_dir if given, otherwise .cache next to the scene.
+    """
+    if '--cache_dir' in argv:
+        return argv[argv.index('--cache_dir') + 1]
+    if bpy.data.filepath:
+        return os.path.join(os.path.dirname(bpy.data.filepath), ".cache")
+    return None
+
+def setup_stats(argv):
+    """
+    Record per-stage timings of this job if --stats_dir is given.
+    """
+    stats_dir = argv[argv.index('--stats_dir') + 1] if '--stats_dir' in argv else None
+    job_name = argv[argv.index('--file_name') + 1] if '--file_name' in argv else os.path.basename(argv[0]).split('.')[0]
+    stageStats.configure(stats_dir, job_name)
+
+def check_compatibility(action, shape_key_action, min_compat, index_path=None):
+    """
+    Compare the bones and shape keys the imported animation drives with the avatar's, and stop the job if too few of
+    them exist on the avatar.
+
+    :param min_compat: Lowest compatibility score (0-1) that is still rendered.
+    :param index_path: The scene's stored compatibility index; without it (or if it can't be read) the avatar is
+        walked instead.
+    """
+    index = compatIndex.load_index(index_path) if index_path else None
+    if index is None:
+        index = compatIndex.build_index()
+    bones = compatIndex.names_from_action(action, compatIndex.BONE_PATH_PATTERN)
+    shape_keys = compatIndex.names_from_action(shape_key_action, compatIndex.SHAPE_KEY_PATH_PATTERN)
+    result = compatIndex.score(index, bones, shape_keys)
+    print(f"Avatar {compatIndex.describe(result)}")
+    if result['score'] < min_compat:
+        print(f"Error: compatibility {result['score']:.0%} is below the minimum of {min_compat:.0%}, not rendering this file")
+        sys.exit(compatIndex.INCOMPATIBLE_EXIT_CODE)
+
+def import_and_transfer(glb_file, bone_roll=True, trim_idle=False, trim_tolerance=1e-4, cache_dir=None, min_compat=None, import_cache_size=None, base_bone_rolls=None, compat_index_path=None):
+    """
+    Load the animation file, transfer its animations to the target avatar and remove the imported collection.
+
+    :param glb_file: Path to the .glb or .fbx file.
+    :param bone_roll: Copy the bone rolls of the imported armature to the avatar first.
+    :param trim_idle: Leave out leading and trailing frames in which nothing moves.
+    :param trim_tolerance: Largest change of any channel that still counts as not moving.
+    :param cache_dir: Folder for caches shared between jobs (the import cache).
+    :param min_compat: Stop before the transfer if the animation's compatibility score with the avatar is lower;
+        None skips the check.
+    :param compat_index_path: Stored compatibility index of the scene, used for the check instead of the avatar.
+    :param import_cache_size: Size limit in MB of the import cache in cache_dir; None imports without the cache.
+    :param base_bone_rolls: Original rolls of the avatar, when it may still carry the rolls of a previous file.
+    :return: Start and end frame of the imported animation.
+    """
+    print("Importing the following .glb file:", glb_file)
+    with stageStats.stage('import'):
+        if cache_dir and import_cache_size:
+            importer = importCache.import_animation(glb_file, cache_dir, import_cache_size)
+        else:
+            importer = ia.AnimImporter(glb_file)
+        importer.find_action_body()
+        importer.find_shape_key_animation()
+    if min_compat is not None:
+        with stageStats.stage('compatibility'):
+            check_compatibility(importer.action, importer.shape_key_action, min_compat, index_path=compat_index_path)
+    if bone_roll:
+        with stageStats.stage('bone_rolls'):
+            bonerolls.copy_bone_rolls(base_rolls=base_bone_rolls)
+    with stageStats.stage('frame_range'):
+        start_frame, end_frame = importer.get_animation_range(trim_idle=trim_idle, tolerance=trim_tolerance)
+    print("frame range:", start_frame, end_frame)
+    print("Imported the following animations:", importer.action, importer.shape_key_action)
+    transfer = ia.AnimationTransfer(importer.action, importer.shape_key_action, bpy.data.collections["mainAvatar"])
+    print("Transferring animations...")
+    with stageStats.stage('transfer'):
+        transfer.transfer_bone_animation()
+        transfer.transfer_shape_key_animation()
+    with stageStats.stage('cleanup'):
+        importer.remove_collection_and_contents()
+    print("Animations transfer done.")
+    return start_frame, end_frame
+
+def apply_camera_modifiers(skip_avatar_constraints=False):
+    """
+    On the Cameras collection, for each camera, apply their modifiers and constraints.
+
+    :param skip_avatar_constraints: Leave the constraints that target the avatar, for a scene without an animation.
+    """
     cameras_collection = bpy.data.collections.get("Cameras")
+    avatar_objects = get_avatar_objects() if skip_avatar_constraints else set()
     if cameras_collection:
         for obj in cameras_collection.objects:
             if obj.type == 'CAMERA':
@@ -72,42 +124,80 @@ if '--cameras_apply_modifiers' in argv and argv[argv.index('--cameras_apply_modi
                 for mod in obj.modifiers:
                     bpy.ops.modifier.apply(modifier=mod.name)
                 for con in obj.constraints:
-                    bpy.ops.constraint.apply(constraint=con.name)
+                    if not targets_objects(con, avatar_objects):
+                        bpy.ops.constraint.apply(constraint=con.name)
 
                 # Deselect object
                 obj.select_set(False)
 
-if '--vicon_color' in argv:
-    vicon_color = argv[argv.index('--vicon_color') + 1]
-    if vicon_color is not None and vicon_color is not False:
-        col = bpy.data.collections["mainAvatar"]
-        mesh = None
-        if col is None:
-            print("No collection named 'mainAvatar' found.")
-            exit(1)
-
-        for obj in col.objects:
-            if obj.type == 'MESH':
-                mesh = obj
-                break
-        vc.set_color_mesh_mat(mesh, vicon_color)
-
-# Optional: Render the scene
-render = 'True'
-if '--render' in argv:
-    render = argv[argv.index('--render') + 1]
-
-if render == 'True':
+def get_avatar_objects():
+    avatar_collection = bpy.data.collections.get("mainAvatar")
+    return set(avatar_collection.all_objects) if avatar_collection else set()
+
+def targets_objects(constraint, objects):
+    targets = [getattr(constraint, 'target', None)] + [target.target for target in getattr(constraint, 'targets', [])]
+    return any(target in objects for target in targets if target is not None)
+
+def get_avatar_camera_constraints():
+    """
+    :return: Names ("camera: constraint") of the camera constraints that target an object of the avatar. Applying
+        these bakes the avatar's current pose into the camera, so they must be applied after the animation transfer.
+    """
+    cameras_collection = bpy.data.collections.get("Cameras")
+    avatar_objects = get_avatar_objects()
+    if cameras_collection is None or not avatar_objects:
+        return []
+
+    found = []
+    for obj in cameras_collection.objects:
+        if obj.type != 'CAMERA':
+            continue
+        for con in obj.constraints:
+            if targets_objects(con, avatar_objects):
+                found.append(f"{obj.name}: {con.name}")
+    return found
+
+def apply_vicon_color(vicon_color):
+    col = bpy.data.collections["mainAvatar"]
+    mesh = None
+    if col is None:
+        print("No collection named 'mainAvatar' found.")
+        exit(1)
+
+    for obj in col.objects:
+        if obj.type == 'MESH':
+            mesh = obj
+            break
+    vc.set_color_mesh_mat(mesh, vicon_color)
+
+def render_cameras(argv, output_folder, render_engine, start_frame, end_frame):
+    """
+    Render all cameras with the render settings given in argv.
+
+    :return: (output folder the frames were written to, True if every frame has a valid file)
+    """
     if '--compute_device' in argv:
         compute_device = argv[argv.index('--compute_device') + 1]
 
     if '--file_name' in argv:
         file_name = argv[argv.index('--file_name') + 1]
 
+    render_dir = None
+    if '--render_dir' in argv:
+        render_dir = argv[argv.index('--render_dir') + 1]
+
     # Render the scene
-    camera_renderer = rc.CamerasRenderer(output_folder, render_engine, compute_device_type=compute_device, incr_folder_prefix=file_name)
+    camera_renderer = rc.CamerasRenderer(output_folder, render_engine, compute_device_type=compute_device, incr_folder_prefix=file_name, render_dir=render_dir)
     output_folder = camera_renderer.output_dir
 
+    # Mark the folder as this job's, so an interrupted render can be resumed in it
+    if '--job_key' in argv:
+        jobCache.write_job_marker(output_folder, argv[argv.index('--job_key') + 1], argv[0])
+
+    # Optional: Keep the frames an interrupted run already wrote and render only the missing ones
+    if '--resume' in argv and argv[argv.index('--resume') + 1] == 'True':
+        camera_renderer.set_resume(True)
+
     # Optional: Set the frame range
     if '--frame_range' in argv:
         start_frame = int(argv[argv.index('--frame_range') + 1])
@@ -116,9 +206,34 @@ if render == 'True':
     else:
         camera_renderer.set_frame_range(start_frame, end_frame)
 
+    # Optional: Render only every Nth frame
+    if '--frame_step' in argv:
+        camera_renderer.set_frame_step(int(argv[argv.index('--frame_step') + 1]))
+
+    # Optional: Preview pass with a single camera
+    if '--preview' in argv and argv[argv.index('--preview') + 1] == 'True':
+        if '--preview_camera' in argv:
+            camera_name = argv[argv.index('--preview_camera') + 1]
+        else:
+            cameras = camera_renderer.get_all_cameras()
+            camera_name = cameras[0].name if cameras else None
+        if camera_name:
+            print(f"Preview: rendering only camera {camera_name}")
+            camera_renderer.set_cameras([camera_name])
+
     if '--output_format' in argv:
         output_format = argv[argv.index('--output_format') + 1]
-        camera_renderer.set_output_format(output_format)
+        compression = None
+        if '--png_compression' in argv:
+            compression = int(argv[argv.index('--png_compression') + 1])
+        color_depth = None
+        if '--color_depth' in argv:
+            color_depth = argv[argv.index('--color_depth') + 1]
+        camera_renderer.set_output_format(output_format, compression=compression, color_depth=color_depth)
+
+        # Optional: Compress the PNG frames on background threads instead of on the render thread
+        if '--async_write' in argv and argv[argv.index('--async_write') + 1] == 'True':
+            camera_renderer.enable_async_writer(compression=15 if compression is None else compression)
 
     if '--render_resolution' in argv:
         width = int(argv[argv.index('--render_resolution') + 1])
@@ -129,11 +244,44 @@ if render == 'True':
         samples = int(argv[argv.index('--render_samples') + 1])
         camera_renderer.set_render_samples(samples)
 
-    print("Rendering all cameras...")
-    camera_renderer.render_all_cameras()
+    # Optional: CPU profile tuning
+    if '--cpu_threads' in argv:
+        camera_renderer.set_cpu_threads(int(argv[argv.index('--cpu_threads') + 1]))
+    if '--tile_size' in argv:
+        camera_renderer.set_tile_size(int(argv[argv.index('--tile_size') + 1]))
+    if '--persistent_data' in argv:
+        camera_renderer.set_persistent_data(argv[argv.index('--persistent_data') + 1] == 'True')
 
-# Optional: Save the .blend file
-if '--save_blend' in argv and argv[argv.index('--save_blend') + 1] == 'True':
+    # Optional: Stream the frames into per-camera videos while rendering
+    if '--stream_video' in argv and argv[argv.index('--stream_video') + 1] == 'True':
+        keep_frames = '--keep_frames' in argv and argv[argv.index('--keep_frames') + 1] == 'True'
+        camera_renderer.enable_video_stream(keep_frames=keep_frames)
+
+    if '--render_mode' in argv:
+        camera_renderer.set_render_mode(argv[argv.index('--render_mode') + 1])
+
+    # Optional: Render held poses once and link the repeated frames
+    if '--dedup_frames' in argv and argv[argv.index('--dedup_frames') + 1] == 'True':
+        tolerance = 1e-5
+        if '--dedup_tolerance' in argv:
+            tolerance = float(argv[argv.index('--dedup_tolerance') + 1])
+        camera_renderer.enable_dedup(tolerance)
+
+    # Optional: Tune the samples to a render time per frame; replaces the fixed sample count
+    if '--frame_time_budget' in argv:
+        camera_renderer.set_frame_time_budget(float(argv[argv.index('--frame_time_budget') + 1]))
+
+    if '--shard' in argv:
+        shard_index = int(argv[argv.index('--shard') + 1])
+        shard_count = int(argv[argv.index('--shard') + 2])
+        print(f"Rendering shard {shard_index + 1} of {shard_count}...")
+        camera_renderer.render_shard(shard_index, shard_count)
+    else:
+        print("Rendering all cameras...")
+        camera_renderer.render_all_cameras()
+    return output_folder, not camera_renderer.unfinished_frames
+
+def save_blend(glb_file, output_folder):
     blend_output_file = os.path.join(output_folder, os.path.basename(glb_file).replace('.glb', '.blend'))
     # Check if file exists, if so, increment the name
     i = 1
@@ -143,6 +291,106 @@ if '--save_blend' in argv and argv[argv.index('--save_blend') + 1] == 'True':
     bpy.ops.wm.save_as_mainfile(filepath=blend_output_file)
     print("Saved the .blend file at the following location:", blend_output_file)
 
+def prepare_scene(argv):
+    """
+    Apply the scene changes that don't depend on the animation file: background replacement and time-stretching.
+
+    :param argv: Arguments as passed to this script after '--'.
+    """
+    # Optional: Replace the background
+    if '--background_path' in argv:
+        with stageStats.stage('background'):
+            replace_background(argv[argv.index('--background_path') + 1])
+
+    # Optional: Apply time-stretching
+    if '--timestretch' in argv:
+        target_fps = int(argv[argv.index('--timestretch') + 1])
+        old_fps = int(argv[argv.index('--timestretch') + 2])
+        with stageStats.stage('timestretch'):
+            apply_timestretch(target_fps, old_fps)
+
+def prepare_cameras_and_materials(argv, skip_avatar_constraints=False):
+    """
+    Apply camera modifiers/constraints and the vicon color, if requested in argv.
+
+    :param argv: Arguments as passed to this script after '--'.
+    :param skip_avatar_constraints: Leave the camera constraints that target the avatar, for a scene without an animation.
+    """
+    # Optional: Apply modifiers and constraints to all cameras
+    if '--cameras_apply_modifiers' in argv and argv[argv.index('--cameras_apply_modifiers') + 1] == 'True':
+        with stageStats.stage('camera_modifiers'):
+            apply_camera_modifiers(skip_avatar_constraints=skip_avatar_constraints)
+
+    if '--vicon_color' in argv:
+        vicon_color = argv[argv.index('--vicon_color') + 1]
+        if vicon_color is not None and vicon_color is not False:
+            with stageStats.stage('vicon_color'):
+                apply_vicon_color(vicon_color)
+
+def process_animation(argv, prepare=None, base_bone_rolls=None):
+    """
+    Import, retarget, render and optionally save a single animation file. Call setup_stats(argv) first to record
+    the job's stages.
+
+    :param argv: Arguments as passed to this script after '--' (input file, output folder, render engine, options).
+    :param prepare: Optional callable run after the animation is transferred and before rendering.
+    :param base_bone_rolls: Original rolls of the avatar, when it may still carry the rolls of a previous file.
+    """
+    # Required arguments
+    glb_file = argv[0]  # Path to the .glb file
+    output_folder = argv[1]  # Path to the output folder
+    render_engine = argv[2]  # Render engine to use ("CYCLES" or "BLENDER_EEVEE")
+
+    # Load the .glb file, load all relevant animations, and transfer them to the target avatar. Then remove the imported collection
+    bone_roll = '--bone_roll' in argv and argv[argv.index('--bone_roll') + 1] == 'True'
+    trim_idle = '--trim_idle' in argv and argv[argv.index('--trim_idle') + 1] == 'True'
+    trim_tolerance = 1e-4
+    if '--trim_tolerance' in argv:
+        trim_tolerance = float(argv[argv.index('--trim_tolerance') + 1])
+    min_compat = None
+    if '--min_compat' in argv:
+        min_compat = float(argv[argv.index('--min_compat') + 1])
+    compat_index_path = argv[argv.index('--compat_index') + 1] if '--compat_index' in argv else None
+    import_cache_size = None
+    if '--import_cache_size' in argv:
+        import_cache_size = int(argv[argv.index('--import_cache_size') + 1])
+    start_frame, end_frame = import_and_transfer(glb_file, bone_roll=bone_roll, trim_idle=trim_idle, trim_tolerance=trim_tolerance, cache_dir=get_cache_dir(argv), min_compat=min_compat, import_cache_size=import_cache_size, base_bone_rolls=base_bone_rolls, compat_index_path=compat_index_path)
+
+    if prepare:
+        with stageStats.stage('prepare'):
+            prepare()
+
+    # Optional: Render the scene
+    render = 'True'
+    if '--render' in argv:
+        render = argv[argv.index('--render') + 1]
+
+    if render == 'True':
+        with stageStats.stage('render'):
+            output_folder, complete = render_cameras(argv, output_folder, render_engine, start_frame, end_frame)
+
+        # Record the finished job so later runs can skip it; with frames still claimed by another process it isn't
+        if '--job_key' in argv and not complete:
+            print("Not recording the job as complete, some frames have no valid file yet")
+        elif '--job_key' in argv:
+            jobCache.record_completed_job(argv[1], argv[argv.index('--job_key') + 1], glb_file, output_folder)
+
+    # Optional: Save the .blend file
+    if '--save_blend' in argv and argv[argv.index('--save_blend') + 1] == 'True':
+        with stageStats.stage('save_blend'):
+            save_blend(glb_file, output_folder)
+
+def process_file(argv):
+    """
+    Import, retarget and render a single animation file into the currently loaded scene.
+
+    :param argv: Arguments as passed to this script after '--' (input file, output folder, render engine, options).
+    """
+    setup_stats(argv)
+    prepare_scene(argv)
+    # Camera constraints may target the avatar, so they are applied after the animation transfer
+    process_animation(argv, prepare=lambda: prepare_cameras_and_materials(argv))
+
 # Save the .blend file with the rendered results as a new file
 # blend_output_file = os.path.join(output_folder, os.path.basename(glb_file).replace('.glb', '.blend'))
 # # Check if file exists, if so, increment the name
@@ -154,3 +402,7 @@ if '--save_blend' in argv and argv[argv.index('--save_blend') + 1] == 'True':
 
 # # Quit Blender
 # bpy.ops.wm.quit_blender()
+
+if __name__ == "__main__":
+    # Parse arguments passed after '--'
+    process_file(sys.argv[sys.argv.index("--") + 1:])
@@ -28,5 +28,5 @@ if __name__ == "__main__":
     if len(argv) < 1 or len(argv) > 1:
         print("Usage: replaceBackground.py <path_to_glb>")
     else:
-        glb_path = sys.argv[0]
+        glb_path = argv[0]
         replace_background(glb_path)
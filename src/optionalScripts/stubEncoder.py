@@ -0,0 +1,17 @@
+import sys
+
+# Stand-in for ffmpeg when it isn't installed. Reads a stream of PNG images from stdin (like ffmpeg's image2pipe),
+# writes them unchanged into the output file and reports how many frames it received.
+
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        print("Usage: stubEncoder.py <output_file> < frames")
+        sys.exit(1)
+
+    data = sys.stdin.buffer.read()
+    with open(sys.argv[1], 'wb') as f:
+        f.write(data)
+
+    print(f"Stub encoder received {data.count(PNG_SIGNATURE)} frames ({len(data)} bytes) for {sys.argv[1]}")
@@ -0,0 +1,51 @@
+import bpy
+import sys
+import os
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(script_dir)  # Add current directory
+
+import mainProcessing
+import importAnim as ia
+import bonerolls
+import sceneState
+
+# Applies the per-run scene setup once (background replacement, camera modifiers/constraints, vicon color) and
+# saves the result as a prepared .blend that every job of the run can load instead of the original scene. With
+# --bone_roll_source the avatar also gets the bone rolls (and roll signature) of that animation file, so jobs with
+# the same source skeleton never enter Edit Mode. Camera constraints that target the avatar are left in place: they
+# depend on the animation, so every job applies them after its transfer, as without a prepared scene.
+#
+# Usage: blender <scene.blend> --background --python prepareScene.py -- <prepared.blend> [--background_path <glb>]
+#        [--cameras_apply_modifiers True] [--vicon_color #RRGGBB] [--bone_roll_source <glb>]
+
+def copy_bone_rolls_from(animation_path):
+    """
+    Import an animation file, copy its bone rolls to the avatar and remove everything the import added again.
+    """
+    state = sceneState.capture_state()
+    ia.AnimImporter(animation_path)
+    bonerolls.copy_bone_rolls()
+    sceneState.restore_state(state, keep_bone_rolls=True)
+
+def prepare(argv):
+    prepared_path = argv[0]
+
+    if '--background_path' in argv:
+        mainProcessing.replace_background(argv[argv.index('--background_path') + 1])
+
+    if '--bone_roll_source' in argv:
+        copy_bone_rolls_from(argv[argv.index('--bone_roll_source') + 1])
+
+    # Constraints that target the avatar need the animation, every job applies those after its transfer
+    avatar_constraints = mainProcessing.get_avatar_camera_constraints()
+    if avatar_constraints:
+        print(f"Leaving camera constraints that target the avatar to the jobs: {', '.join(avatar_constraints)}")
+    mainProcessing.prepare_cameras_and_materials(argv, skip_avatar_constraints=True)
+
+    os.makedirs(os.path.dirname(prepared_path), exist_ok=True)
+    bpy.ops.wm.save_as_mainfile(filepath=prepared_path, copy=True)
+    print("Saved the prepared scene at the following location:", prepared_path)
+
+if __name__ == "__main__":
+    prepare(sys.argv[sys.argv.index("--") + 1:])
@@ -1,31 +1,205 @@
 import bpy
 import os
+import json
+import time
+import contextlib
 from datetime import datetime
 import argparse
 import sys
 
+script_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(script_dir)  # Add current directory
+
+import videoEncoder
+import frameWriter
+import frameBudget
+import frameDedup
+import stageStats
+
+# Seconds after which a partly written frame file counts as left behind by a crash in resume mode
+PARTIAL_FRAME_TIMEOUT = 60
+
+def split_frame_range(start_frame, end_frame, chunks):
+    """
+    Split a frame range into contiguous chunks of (nearly) equal length.
+
+    :param start_frame: First frame of the range.
+    :param end_frame: Last frame of the range (inclusive).
+    :param chunks: Number of chunks to split into.
+    :return: List of (start, end) tuples; fewer than `chunks` if the range is shorter.
+    """
+    total = end_frame - start_frame + 1
+    chunks = max(1, min(chunks, total))
+    ranges = []
+    start = start_frame
+    for i in range(chunks):
+        length = total // chunks + (1 if i < total % chunks else 0)
+        ranges.append((start, start + length - 1))
+        start += length
+    return ranges
+
+def split_frame_runs(frames, frame_step=1):
+    """
+    Group frame numbers into runs of consecutive frames (at the given step).
+
+    :param frames: Sorted frame numbers.
+    :return: List of (start, end) tuples.
+    """
+    runs = []
+    for frame in frames:
+        if runs and frame == runs[-1][1] + frame_step:
+            runs[-1] = (runs[-1][0], frame)
+        else:
+            runs.append((frame, frame))
+    return runs
+
 class CamerasRenderer:
-    def __init__(self, output_dir, render_engine="CYCLES", output_format="PNG", compute_device_type='OPTIX', incr_folder_prefix=""):
+    # PER_CAMERA renders each camera's whole animation in turn; PER_FRAME evaluates the scene once per frame and
+    # renders every camera from that evaluation
+    RENDER_MODES = ['PER_CAMERA', 'PER_FRAME']
+    # Compute device types that render on the CPU
+    CPU_DEVICE_TYPES = ['CPU', 'NONE']
+
+    def __init__(self, output_dir, render_engine="CYCLES", output_format="PNG", compute_device_type='OPTIX', incr_folder_prefix="", render_dir=None):
         """
         Initialize the CamerasRenderer with an output directory and render engine.
 
         :param output_dir: Path to the directory where rendered frames will be saved.
         :param render_engine: Render engine to use ("CYCLES" or "BLENDER_EEVEE").
+        :param render_dir: Render into this existing directory instead of a new incremental one (used when several
+            processes render parts of the same job).
         """
         self.base_output_dir = output_dir
         self.scene = bpy.context.scene
         self.compute_device_type = compute_device_type
+        self.render_mode = 'PER_CAMERA'
+        self.frame_sinks = []
+        self.camera_names = None
+        self.resume = False
+        self.placeholder_timeout = 3600
+        # {camera name: frames}, in resume mode the frames still without a valid file after rendering
+        self.unfinished_frames = {}
+        self.dedup_tolerance = None
+        self.frame_fingerprints = {}
+        self.dedup_report = {}
         self.set_render_engine(render_engine)
-        self.output_dir = self.__create_incremental_output_dir(incr_folder_prefix)
+        if render_dir:
+            os.makedirs(render_dir, exist_ok=True)
+            self.output_dir = render_dir
+        else:
+            self.output_dir = self.__create_incremental_output_dir(incr_folder_prefix)
         self.set_output_format(output_format)
 
-    def set_output_format(self, output_format):
+    def set_render_mode(self, render_mode):
+        """
+        Set the order in which frames and cameras are rendered.
+
+        :param render_mode: "PER_CAMERA" (each camera renders the full animation) or "PER_FRAME" (each frame is
+            evaluated once and rendered from all cameras).
+        """
+        if render_mode.upper() not in self.RENDER_MODES:
+            raise ValueError(f"Invalid render mode. Choose one of {self.RENDER_MODES}.")
+        self.render_mode = render_mode.upper()
+
+    def add_frame_sink(self, sink):
+        """
+        Register an object that gets every frame as soon as it is written, through
+        sink.frame_written(camera_name, frame, path), and sink.finish() once rendering is done.
+
+        :param sink: The frame sink.
+        """
+        self.frame_sinks.append(sink)
+
+    def enable_video_stream(self, keep_frames=False, codec='libx264', crf=18):
+        """
+        Stream every finished frame into a per-camera video encoder while rendering continues.
+
+        :param keep_frames: Keep the lossless PNG frames as an archive next to the video.
+        :param codec: ffmpeg video codec.
+        :param crf: Constant rate factor (quality) for the codec.
+        """
+        self.set_output_format("PNG")
+        if not keep_frames:
+            # The frames only live until the video is finished, so don't spend time compressing them
+            self.scene.render.image_settings.compression = 0
+        fps = self.scene.render.fps / self.scene.render.fps_base
+        self.add_frame_sink(videoEncoder.VideoStreamSink(fps, codec=codec, crf=crf, keep_frames=keep_frames))
+
+    def __frame_written(self, camera_name, frame, path):
+        for sink in self.frame_sinks:
+            sink.frame_written(camera_name, frame, path)
+
+    def __on_render_write(self, scene, *args):
+        self.__frame_written(scene.camera.name, scene.frame_current, scene.render.frame_path(frame=scene.frame_current))
+
+    def __on_render_pre(self, scene, *args):
+        stageStats.frame_started()
+
+    def __on_render_post(self, scene, *args):
+        # Progress line for the dispatcher's job monitor
+        print(f"Rendered frame {scene.frame_current} of {scene.camera.name}", flush=True)
+        stageStats.frame_finished(scene.camera.name, scene.frame_current)
+
+    @contextlib.contextmanager
+    def __render_handlers(self, notify_sinks=True):
+        """
+        Register the handlers that report written frames to the frame sinks, print a progress line per rendered
+        frame and time every rendered frame, for the duration of a render.
+
+        :param notify_sinks: Report frames written by an animation render to the frame sinks.
+        """
+        handlers = []
+        if notify_sinks and self.frame_sinks:
+            handlers.append((bpy.app.handlers.render_write, self.__on_render_write))
+        if stageStats.is_enabled():
+            handlers.append((bpy.app.handlers.render_pre, self.__on_render_pre))
+        handlers.append((bpy.app.handlers.render_post, self.__on_render_post))
+
+        for handler_list, handler in handlers:
+            handler_list.append(handler)
+        try:
+            yield
+        finally:
+            for handler_list, handler in handlers:
+                handler_list.remove(handler)
+
+    def finish_frame_sinks(self):
+        """
+        Let all frame sinks finish their work (close encoders, flush writers).
+        """
+        for sink in self.frame_sinks:
+            sink.finish()
+
+    def enable_async_writer(self, compression=15, workers=2, max_pending=None):
+        """
+        Let Blender write PNG frames uncompressed and compress them in background processes, so the next frame starts
+        rendering without waiting for the compression of the previous one.
+
+        :param compression: Final PNG compression in percent (0-100).
+        :param workers: Number of compression processes.
+        :param max_pending: Maximum number of frames waiting for compression before rendering blocks
+            (default: twice the number of workers).
+        """
+        self.set_output_format("PNG", compression=0)
+        self.add_frame_sink(frameWriter.AsyncFrameWriter(compression=compression, workers=workers, max_pending=max_pending))
+
+    def set_output_format(self, output_format, compression=None, color_depth=None):
         """
         Set the output format for rendering.
 
         :param output_format: Output format to use (e.g., "PNG", "JPEG", "FFMPEG", etc.).
+        :param compression: Optional PNG compression in percent (0-100). Lower is faster to write.
+        :param color_depth: Optional bit depth per channel ("8" or "16" for PNG).
         """
-        self.scene.render.image_settings.file_format = output_format
+        image_settings = self.scene.render.image_settings
+        image_settings.file_format = output_format
+        if compression is not None:
+            if output_format != 'PNG':
+                print("Warning: Compression is only relevant for PNG output. Ignoring request...")
+            else:
+                image_settings.compression = max(0, min(100, int(compression)))
+        if color_depth is not None:
+            image_settings.color_depth = str(color_depth)
 
     def set_render_engine(self, render_engine):
         """
@@ -38,19 +212,33 @@ class CamerasRenderer:
         self.scene.render.engine = render_engine.upper()
 
         if render_engine.upper() == "CYCLES":
-            self.__enable_gpu_rendering()
+            if self.compute_device_type in self.CPU_DEVICE_TYPES:
+                self.__enable_cpu_rendering()
+            else:
+                self.__enable_gpu_rendering()
 
     def __enable_gpu_rendering(self):
         # Check if CUDA, OptiX, or HIP is available
         prefs = bpy.context.preferences.addons['cycles'].preferences
-        devices = prefs.devices
 
         # Enable GPU compute
         if self.compute_device_type not in ['CUDA', 'OPTIX', 'HIP']:
             print("Invalid compute device type. Choose 'CUDA', 'OPTIX', or 'HIP'.\nFalling back to 'OPTIX'.")
-            prefs.compute_device_type = 'OPTIX'
-        else:
+            self.compute_device_type = 'OPTIX'
+        try:
             prefs.compute_device_type = self.compute_device_type
+        except TypeError:
+            # This Blender build doesn't support the backend at all
+            self.__enable_cpu_rendering(reason=f"this Blender build has no {self.compute_device_type} support")
+            return
+
+        # Refresh the device list for the chosen backend; without a matching GPU Cycles would quietly use the CPU
+        # with the GPU settings
+        prefs.get_devices()
+        devices = prefs.devices
+        if not any(device.type == self.compute_device_type for device in devices):
+            self.__enable_cpu_rendering(reason=f"no {self.compute_device_type} device found")
+            return
 
         bpy.context.scene.cycles.device = 'GPU'
 
@@ -58,6 +246,51 @@ class CamerasRenderer:
         for device in devices:
             device.use = True
 
+    def __enable_cpu_rendering(self, reason=None):
+        """
+        Render on the CPU with persistent render data, so Cycles keeps the scene and BVH between the frames of an
+        animation instead of rebuilding them for every frame.
+
+        :param reason: Why a GPU device type fell back to the CPU, for the log.
+        """
+        if reason:
+            print(f"Warning: GPU rendering unavailable ({reason}). Falling back to the CPU.")
+        self.compute_device_type = 'CPU'
+        self.scene.cycles.device = 'CPU'
+        self.scene.render.use_persistent_data = True
+
+    def set_cpu_threads(self, threads):
+        """
+        Set the number of render threads.
+
+        :param threads: Number of threads, or 0 to use all cores.
+        """
+        if threads > 0:
+            self.scene.render.threads_mode = 'FIXED'
+            self.scene.render.threads = threads
+        else:
+            self.scene.render.threads_mode = 'AUTO'
+
+    def set_tile_size(self, tile_size):
+        """
+        Render in tiles of tile_size x tile_size pixels (Cycles). Smaller tiles use less memory; 0 renders the
+        whole image at once.
+
+        :param tile_size: Tile edge in pixels.
+        """
+        if self.scene.render.engine != 'CYCLES':
+            print("Warning: Tile size is only relevant for Cycles render engine. Ignoring request...")
+            return
+        self.scene.cycles.use_auto_tile = tile_size > 0
+        if tile_size > 0:
+            self.scene.cycles.tile_size = tile_size
+
+    def set_persistent_data(self, enabled):
+        """
+        Keep render data (scene, BVH, textures) in memory between frames. On by default when rendering on the CPU.
+        """
+        self.scene.render.use_persistent_data = enabled
+
     def set_resolution(self, width, height):
         """
         Set the resolution for rendering.
@@ -68,6 +301,18 @@ class CamerasRenderer:
         self.scene.render.resolution_x = width
         self.scene.render.resolution_y = height
 
+    def set_frame_time_budget(self, seconds, probe_frames=2):
+        """
+        Choose samples, adaptive sampling and denoising from probe renders so every frame takes about `seconds` to
+        render, and record the settings in the output directory. Call after the cameras and frame range are set.
+
+        :param seconds: Render time budget per frame.
+        :param probe_frames: Number of probe frames per camera.
+        :return: The applied Cycles settings, or None if the render engine isn't Cycles.
+        """
+        with stageStats.stage('frame_budget_probe'):
+            return frameBudget.tune(self, seconds, probe_frames)
+
     def set_render_samples(self, samples):
         """
         Set the number of samples for rendering.
@@ -115,6 +360,173 @@ class CamerasRenderer:
         self.scene.frame_start = start_frame
         self.scene.frame_end = end_frame
 
+    def set_frame_step(self, frame_step):
+        """
+        Render only every Nth frame of the range.
+
+        :param frame_step: Number of frames to advance between rendered frames.
+        """
+        if frame_step < 1:
+            raise ValueError("Frame step must be at least 1.")
+        self.scene.frame_step = frame_step
+
+    def set_cameras(self, camera_names):
+        """
+        Render only the given cameras of the 'Cameras' collection.
+
+        :param camera_names: List of camera names, or None to render all cameras.
+        """
+        if camera_names is not None:
+            available = [obj.name for obj in self.get_all_cameras()]
+            for name in camera_names:
+                if name not in available:
+                    print(f"Warning: Camera '{name}' not found in the 'Cameras' collection. Available: {available}")
+        self.camera_names = camera_names
+
+    def set_resume(self, resume=True, placeholder_timeout=3600):
+        """
+        Keep the valid frames already in the output directory and render only the missing ones. Frames are written
+        with Blender's placeholder and no-overwrite settings, so several processes can fill the gaps of the same
+        sequence without rendering a frame twice.
+
+        :param resume: Render only missing frames.
+        :param placeholder_timeout: Seconds after which an empty placeholder counts as left behind by a process that
+            died, instead of claiming a frame another process is rendering. Must be longer than a frame renders.
+        """
+        self.resume = resume
+        self.placeholder_timeout = placeholder_timeout
+
+    def enable_dedup(self, tolerance=1e-5):
+        """
+        Render each distinct state of a camera's range once and fill the frames that repeat it (held poses under a
+        static camera) with links to the rendered file. Not used with motion blur, which makes a frame depend on its
+        neighbours.
+
+        :param tolerance: Largest difference of a bone matrix, shape key value or camera value that still counts as
+            the same state.
+        """
+        if self.scene.render.use_motion_blur:
+            print("Warning: Hold-frame dedup doesn't work with motion blur. Rendering every frame...")
+            return
+        self.dedup_tolerance = tolerance
+
+    def __split_duplicates(self, camera, frames):
+        """
+        Split the frames to render into the ones that show a new state and the ones that repeat an earlier frame of
+        the range.
+
+        :return: (frames to render, {duplicate frame: frame it repeats})
+        """
+        all_frames = list(range(self.scene.frame_start, self.scene.frame_end + 1, self.scene.frame_step))
+        cameras = self.get_cameras()
+        if camera not in cameras:
+            cameras.append(camera)
+        # Fingerprint all cameras in one pass, so the next camera doesn't evaluate the frames again
+        self.frame_fingerprints = frameDedup.fingerprint_frames(self.scene, all_frames, cameras, self.dedup_tolerance, known=self.frame_fingerprints)
+        duplicates = frameDedup.find_duplicates(self.frame_fingerprints, all_frames, camera.name)
+        return [frame for frame in frames if frame not in duplicates], {frame: duplicates[frame] for frame in frames if frame in duplicates}
+
+    def __fill_duplicates(self, camera, duplicates, rendered):
+        """
+        Give every duplicate frame a link to (or copy of) the frame it repeats, and count them for the report.
+        """
+        for frame, source in sorted(duplicates.items()):
+            if not frameWriter.is_valid_frame(self.get_frame_path(camera, source)):
+                # The frame it repeats is still being rendered by another process; a later resume fills it
+                duplicates.pop(frame)
+                continue
+            path = self.get_frame_path(camera, frame)
+            frameDedup.fill_frame(self.get_frame_path(camera, source), path)
+            self.__frame_written(camera.name, frame, path)
+            print(f"Rendered frame {frame} of {camera.name} (reused frame {source})", flush=True)
+
+        report = self.dedup_report.setdefault(camera.name, {'rendered': 0, 'reused': 0})
+        report['rendered'] += rendered
+        report['reused'] += len(duplicates)
+
+    def print_dedup_report(self, file_name="dedup_report.json"):
+        """
+        Print how many frames the hold-frame dedup saved and write the numbers to a JSON file in the output
+        directory.
+        """
+        if self.dedup_tolerance is None or not self.dedup_report:
+            return
+        rendered = sum(report['rendered'] for report in self.dedup_report.values())
+        reused = sum(report['reused'] for report in self.dedup_report.values())
+        total = rendered + reused
+        print(f"Hold-frame dedup: reused {reused} of {total} frames ({reused / max(total, 1):.0%}), rendered {rendered}")
+        for camera_name, report in self.dedup_report.items():
+            print(f"  {camera_name}: reused {report['reused']}, rendered {report['rendered']}")
+        with open(os.path.join(self.output_dir, file_name), 'w') as f:
+            json.dump({'tolerance': self.dedup_tolerance, 'rendered': rendered, 'reused': reused, 'cameras': self.dedup_report}, f, indent=2)
+
+    def get_frame_path(self, camera, frame):
+        """
+        :return: Path of a camera's frame file in the output directory.
+        """
+        filepath = self.scene.render.filepath
+        self.scene.render.filepath = os.path.join(self.output_dir, camera.name, "frame_")
+        try:
+            return self.scene.render.frame_path(frame=frame)
+        finally:
+            self.scene.render.filepath = filepath
+
+    def get_frames_to_render(self, camera, start_frame=None, end_frame=None):
+        """
+        :return: Frame numbers of a range (default: the scene's range) that have to be rendered for a camera: all of
+            them, or in resume mode the ones without a valid frame file. Frames with a recent placeholder are left to
+            the process that claimed it. Doesn't touch the files; see remove_stale_frames.
+        """
+        start_frame = self.scene.frame_start if start_frame is None else start_frame
+        end_frame = self.scene.frame_end if end_frame is None else end_frame
+        frames = list(range(start_frame, end_frame + 1, self.scene.frame_step))
+        if not self.resume:
+            return frames
+
+        missing = []
+        for frame in frames:
+            path = self.get_frame_path(camera, frame)
+            if frameWriter.is_valid_frame(path):
+                continue
+            if os.path.exists(path) and self.is_claimed(path):
+                continue
+            missing.append(frame)
+        return missing
+
+    def remove_stale_frames(self, camera, frames):
+        """
+        Remove the invalid files no process is writing any more (left behind by a crash) of frames that are about to
+        be rendered; with no-overwrite Blender would skip them.
+        """
+        for frame in frames:
+            path = self.get_frame_path(camera, frame)
+            if os.path.exists(path) and not frameWriter.is_valid_frame(path) and not self.is_claimed(path):
+                os.remove(path)
+
+    def is_claimed(self, path):
+        """
+        :return: True if an invalid frame file may still be in progress: an empty placeholder younger than the
+            placeholder timeout, or a partly written file changed within the last minute.
+        """
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return False
+        timeout = self.placeholder_timeout if stat.st_size == 0 else PARTIAL_FRAME_TIMEOUT
+        return time.time() - stat.st_mtime < timeout
+
+    def get_unfinished_frames(self, camera):
+        """
+        :return: Frames of the scene's range that have no valid file for the camera.
+        """
+        frames = range(self.scene.frame_start, self.scene.frame_end + 1, self.scene.frame_step)
+        return [frame for frame in frames if not frameWriter.is_valid_frame(self.get_frame_path(camera, frame))]
+
+    def count_frames_to_render(self, cameras, start_frame=None, end_frame=None):
+        if not self.resume:
+            return self.count_frames(start_frame, end_frame) * len(cameras)
+        return sum(len(self.get_frames_to_render(camera, start_frame, end_frame)) for camera in cameras)
+
     def render_camera(self, camera):
         """
         Render animation frames for a given camera.
@@ -124,21 +536,252 @@ class CamerasRenderer:
         camera_output_path = os.path.join(self.output_dir, camera.name)
         if not os.path.exists(camera_output_path):
             os.makedirs(camera_output_path)
+        self.scene.camera = camera
         self.scene.render.filepath = os.path.join(camera_output_path, "frame_")
-        bpy.ops.render.render(animation=True)
 
-    def render_all_cameras(self):
+        if self.resume or self.dedup_tolerance is not None:
+            self.__render_frame_list(camera)
+            return
+
+        # Hand every frame to the sinks right after Blender wrote it
+        with stageStats.stage('render_camera', camera=camera.name), self.__render_handlers():
+            bpy.ops.render.render(animation=True)
+
+    def __render_frame_list(self, camera):
         """
-        Render all cameras in the 'Cameras' collection.
+        Render only the frames that need it, in runs of consecutive frames that are animation renders of their own:
+        in resume mode the frames without a valid file, with dedup only the first frame of every distinct state.
+        """
+        frame_start, frame_end = self.scene.frame_start, self.scene.frame_end
+        frames = self.get_frames_to_render(camera)
+        if self.resume:
+            self.remove_stale_frames(camera, frames)
+        skipped = self.count_frames() - len(frames)
+        duplicates = {}
+        if self.dedup_tolerance is not None:
+            frames, duplicates = self.__split_duplicates(camera, frames)
+        runs = split_frame_runs(frames, self.scene.frame_step)
+        if skipped:
+            print(f"Resume: {camera.name} has {skipped} frames done or claimed by another process, rendering {len(frames)} in {len(runs)} runs")
+
+        render = self.scene.render
+        overwrite, placeholder = render.use_overwrite, render.use_placeholder
+        if self.resume:
+            render.use_overwrite = False
+            render.use_placeholder = True
+        try:
+            for start, end in runs:
+                self.set_frame_range(start, end)
+                with stageStats.stage('render_camera', camera=camera.name, start=start, end=end), self.__render_handlers():
+                    bpy.ops.render.render(animation=True)
+        finally:
+            render.use_overwrite, render.use_placeholder = overwrite, placeholder
+            self.set_frame_range(frame_start, frame_end)
+
+        if self.dedup_tolerance is not None:
+            self.__fill_duplicates(camera, duplicates, len(frames))
+
+        if self.resume:
+            self.__check_unfinished(camera)
+
+    def __check_unfinished(self, camera):
+        """
+        Record and report the frames of the camera's current range that still have no valid file, so the job isn't
+        recorded as complete.
+        """
+        unfinished = self.get_unfinished_frames(camera)
+        if unfinished:
+            self.unfinished_frames.setdefault(camera.name, []).extend(unfinished)
+            print(f"Resume: {len(unfinished)} frames of {camera.name} still have no valid file, most likely placeholders of another process "
+                  f"(first: {unfinished[0]}); resume again if that process stopped")
+
+    def render_frame(self, camera, frame):
+        """
+        Render a single frame of a camera as a still, using the scene's current evaluation.
+
+        :param camera: Camera object to render from.
+        :param frame: Frame number, used for the file name. The scene must already be at this frame.
+        """
+        camera_output_path = os.path.join(self.output_dir, camera.name)
+        if not os.path.exists(camera_output_path):
+            os.makedirs(camera_output_path)
+        self.scene.camera = camera
+        # frame_path expands the frame number and extension the same way animation renders name their files
+        self.scene.render.filepath = os.path.join(camera_output_path, "frame_")
+        self.scene.render.filepath = self.scene.render.frame_path(frame=frame)
+        bpy.ops.render.render(write_still=True)
+        self.__frame_written(camera.name, frame, self.scene.render.filepath)
+
+    def render_all_cameras_per_frame(self, cameras=None):
+        """
+        Render all cameras frame by frame: the scene is evaluated once per frame and every camera renders from that
+        evaluation, with persistent render data so the renderer keeps its scene and BVH between the cameras.
+
+        :param cameras: Camera objects to render (default: all cameras in the 'Cameras' collection).
+        """
+        if cameras is None:
+            cameras = self.get_cameras()
+        if not cameras:
+            return
+
+        persistent_data = self.scene.render.use_persistent_data
+        self.scene.render.use_persistent_data = True
+        try:
+            # render_frame reports its frames to the sinks itself
+            # In resume mode only the frames some camera is missing are evaluated, with dedup only new states
+            frames = {camera.name: self.get_frames_to_render(camera) for camera in cameras}
+            if self.resume:
+                for camera in cameras:
+                    self.remove_stale_frames(camera, frames[camera.name])
+            duplicates = {}
+            if self.dedup_tolerance is not None:
+                for camera in cameras:
+                    frames[camera.name], duplicates[camera.name] = self.__split_duplicates(camera, frames[camera.name])
+            frames = {camera_name: set(camera_frames) for camera_name, camera_frames in frames.items()}
+            with self.__render_handlers(notify_sinks=False):
+                for frame in range(self.scene.frame_start, self.scene.frame_end + 1, self.scene.frame_step):
+                    missing = [camera for camera in cameras if frame in frames[camera.name]]
+                    if not missing:
+                        continue
+                    with stageStats.stage('frame_set', frame=frame):
+                        self.scene.frame_set(frame)
+                    for camera in missing:
+                        self.render_frame(camera, frame)
+            for camera in cameras:
+                if camera.name in duplicates:
+                    self.__fill_duplicates(camera, duplicates[camera.name], len(frames[camera.name]))
+                if self.resume:
+                    self.__check_unfinished(camera)
+        finally:
+            self.scene.render.use_persistent_data = persistent_data
+
+    def get_all_cameras(self):
+        """
+        Get all cameras in the 'Cameras' collection.
+
+        :return: List of camera objects, empty if there is no 'Cameras' collection.
         """
         cameras_collection = bpy.data.collections.get("Cameras")
         if not cameras_collection:
             print("No 'Cameras' collection found")
-            return
+            return []
+
+        return [obj for obj in cameras_collection.objects if obj.type == 'CAMERA']
+
+    def get_cameras(self):
+        """
+        Get the cameras to render: all cameras in the 'Cameras' collection, or the ones chosen with set_cameras.
+
+        :return: List of camera objects.
+        """
+        cameras = self.get_all_cameras()
+        if self.camera_names is None:
+            return cameras
+        return [obj for obj in cameras if obj.name in self.camera_names]
 
-        for obj in cameras_collection.objects:
-            if obj.type == 'CAMERA':
+    def count_frames(self, start_frame=None, end_frame=None):
+        """
+        :return: Number of frames rendered per camera for a range (default: the scene's range).
+        """
+        start_frame = self.scene.frame_start if start_frame is None else start_frame
+        end_frame = self.scene.frame_end if end_frame is None else end_frame
+        return len(range(start_frame, end_frame + 1, self.scene.frame_step))
+
+    def render_all_cameras(self):
+        """
+        Render all cameras in the 'Cameras' collection.
+        """
+        print(f"Frames to render: {self.count_frames_to_render(self.get_cameras())}", flush=True)
+        # Video output needs one continuous animation render per camera
+        if self.render_mode == 'PER_FRAME' and self.scene.render.image_settings.file_format != 'FFMPEG':
+            self.render_all_cameras_per_frame()
+        else:
+            for obj in self.get_cameras():
                 self.render_camera(obj)
+        self.finish_frame_sinks()
+        self.print_dedup_report()
+
+    def benchmark_render_modes(self, frames=5):
+        """
+        Render the first frames of the range in both render modes into <output_dir>/_benchmark and print the timings.
+
+        :param frames: Number of frames to render per mode.
+        :return: Dictionary with the seconds per frame (all cameras) for each mode.
+        """
+        output_dir = self.output_dir
+        frame_start, frame_end = self.scene.frame_start, self.scene.frame_end
+        self.set_frame_range(frame_start, min(frame_end, frame_start + frames - 1))
+        rendered_frames = self.scene.frame_end - self.scene.frame_start + 1
+
+        timings = {}
+        try:
+            for render_mode in self.RENDER_MODES:
+                self.output_dir = os.path.join(output_dir, "_benchmark", render_mode.lower())
+                start = time.time()
+                if render_mode == 'PER_FRAME':
+                    self.render_all_cameras_per_frame()
+                else:
+                    for obj in self.get_cameras():
+                        self.render_camera(obj)
+                timings[render_mode] = (time.time() - start) / rendered_frames
+        finally:
+            self.output_dir = output_dir
+            self.set_frame_range(frame_start, frame_end)
+
+        print(f"Render mode benchmark over {rendered_frames} frames and {len(self.get_cameras())} cameras:")
+        for render_mode, seconds in timings.items():
+            print(f"  {render_mode}: {seconds:.2f}s per frame")
+        return timings
+
+    def get_shard_units(self, shard_index, shard_count):
+        """
+        Split the job into (camera, frame chunk) work units and pick the ones belonging to one shard.
+
+        Every camera's frame range is split into enough chunks to give each of the `shard_count` shards at least
+        one unit; units are dealt out round-robin.
+
+        :param shard_index: Index of this shard, from 0 to shard_count - 1.
+        :param shard_count: Total number of shards the job is split into.
+        :return: List of (camera, start_frame, end_frame) tuples.
+        """
+        cameras = self.get_cameras()
+        if not cameras:
+            return []
+
+        chunks = -(-shard_count // len(cameras))  # ceil
+        frame_ranges = split_frame_range(self.scene.frame_start, self.scene.frame_end, chunks)
+        units = [(camera, start, end) for camera in cameras for start, end in frame_ranges]
+        return units[shard_index::shard_count]
+
+    def render_shard(self, shard_index, shard_count):
+        """
+        Render only this shard's (camera, frame chunk) units, per camera or, in PER_FRAME mode, per frame for the
+        shard's cameras of each chunk. The frames end up in the same per-camera frame_#### layout as render_camera
+        produces, so the shards of a job together form the full render.
+
+        :param shard_index: Index of this shard, from 0 to shard_count - 1.
+        :param shard_count: Total number of shards the job is split into.
+        """
+        frame_start, frame_end = self.scene.frame_start, self.scene.frame_end
+        units = self.get_shard_units(shard_index, shard_count)
+        print(f"Frames to render: {sum(self.count_frames_to_render([camera], start, end) for camera, start, end in units)}", flush=True)
+        if self.render_mode == 'PER_FRAME':
+            # The shard's cameras that share a frame chunk render it frame by frame from one evaluation
+            chunks = {}
+            for camera, start, end in units:
+                chunks.setdefault((start, end), []).append(camera)
+            for (start, end), cameras in chunks.items():
+                print(f"Shard {shard_index + 1}/{shard_count}: rendering {', '.join(camera.name for camera in cameras)} frames {start}-{end} per frame")
+                self.set_frame_range(start, end)
+                self.render_all_cameras_per_frame(cameras)
+        else:
+            for camera, start, end in units:
+                print(f"Shard {shard_index + 1}/{shard_count}: rendering {camera.name} frames {start}-{end}")
+                self.set_frame_range(start, end)
+                self.render_camera(camera)
+        self.set_frame_range(frame_start, frame_end)
+        self.finish_frame_sinks()
+        self.print_dedup_report(f"dedup_report_shard{shard_index + 1}.json")
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Render animations from all cameras in the 'Cameras' collection.")
@@ -149,6 +792,10 @@ if __name__ == "__main__":
                         help="Start frame for rendering (default: scene's start frame).")
     parser.add_argument("--end_frame", type=int, default=bpy.context.scene.frame_end,
                         help="End frame for rendering (default: scene's end frame).")
+    parser.add_argument("--render_mode", type=str, default="PER_CAMERA", choices=CamerasRenderer.RENDER_MODES,
+                        help="Render each camera's animation in turn, or all cameras per evaluated frame.")
+    parser.add_argument("--benchmark", type=int, default=0,
+                        help="Instead of rendering, compare both render modes over this many frames.")
 
     # Adjust argument parsing to handle Blender's "--" separator
     if "--" in sys.argv:
@@ -158,4 +805,8 @@ if __name__ == "__main__":
 
     renderer = CamerasRenderer(args.output_dir, args.render_engine)
     renderer.set_frame_range(args.start_frame, args.end_frame)
-    renderer.render_all_cameras()
+    renderer.set_render_mode(args.render_mode)
+    if args.benchmark > 0:
+        renderer.benchmark_render_modes(args.benchmark)
+    else:
+        renderer.render_all_cameras()
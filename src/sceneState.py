@@ -0,0 +1,236 @@
+import bpy
+
+import bonerolls
+
+# Snapshot of the scene state a job may change, so a batch can put the scene back between animation files
+# and prove that nothing from one file leaks into the next. Covered: the tracked datablocks, actions, frame range,
+# the active camera, the render and Cycles settings in RENDER_SETTINGS, camera transforms, material input values
+# and the avatar's bone rolls. Not covered, and therefore kept from one file to the next in a batch: the user
+# preferences (such as the Cycles compute device type) and any scene setting not listed here.
+
+# Datablock collections that importing and retargeting an animation adds to
+TRACKED_DATA = ['objects', 'collections', 'actions', 'meshes', 'armatures', 'materials', 'images', 'textures', 'node_groups', 'shape_keys']
+
+# Scene settings a job may change while rendering, as attribute paths below the scene, in the order they are restored
+# (the file format before the options that depend on it, the engine before the Cycles settings)
+RENDER_SETTINGS = [
+    'render.engine', 'render.filepath', 'render.image_settings.file_format', 'render.image_settings.color_depth',
+    'render.image_settings.compression', 'render.resolution_x', 'render.resolution_y', 'render.fps',
+    'render.frame_map_old', 'render.frame_map_new', 'render.threads_mode', 'render.threads',
+    'render.use_persistent_data', 'render.use_overwrite', 'render.use_placeholder',
+    'cycles.device', 'cycles.samples', 'cycles.use_adaptive_sampling', 'cycles.adaptive_threshold',
+    'cycles.use_denoising', 'cycles.denoiser', 'cycles.time_limit', 'cycles.use_auto_tile', 'cycles.tile_size',
+]
+
+def value_to_tuple(value):
+    try:
+        return tuple(round(v, 6) for v in value)
+    except TypeError:
+        return round(value, 6) if isinstance(value, float) else value
+
+def capture_animation():
+    animation = {}
+    for obj in bpy.data.objects:
+        if obj.animation_data:
+            animation[f"OBJECT:{obj.name}"] = obj.animation_data.action.name if obj.animation_data.action else None
+    for key in bpy.data.shape_keys:
+        if key.animation_data:
+            animation[f"KEY:{key.name}"] = key.animation_data.action.name if key.animation_data.action else None
+    return animation
+
+def capture_cameras():
+    cameras = {}
+    cameras_collection = bpy.data.collections.get("Cameras")
+    if cameras_collection:
+        for obj in cameras_collection.objects:
+            if obj.type == 'CAMERA':
+                cameras[obj.name] = {
+                    'matrix_world': tuple(value_to_tuple(row) for row in obj.matrix_world),
+                    'modifiers': [mod.name for mod in obj.modifiers],
+                    'constraints': [con.name for con in obj.constraints],
+                }
+    return cameras
+
+def capture_material_values():
+    values = {}
+    for mat in bpy.data.materials:
+        if not mat.use_nodes or not mat.node_tree:
+            continue
+        for node in mat.node_tree.nodes:
+            for node_input in node.inputs:
+                if hasattr(node_input, 'default_value'):
+                    values[(mat.name, node.name, node_input.identifier)] = value_to_tuple(node_input.default_value)
+    return values
+
+def capture_render_settings():
+    scene = bpy.context.scene
+    settings = {}
+    for path in RENDER_SETTINGS:
+        owner_path, name = path.rsplit('.', 1)
+        owner = scene
+        try:
+            for part in owner_path.split('.'):
+                owner = getattr(owner, part)
+            settings[path] = value_to_tuple(getattr(owner, name))
+        except AttributeError:
+            # E.g. no Cycles settings when the add-on isn't loaded
+            continue
+    return settings
+
+def restore_render_settings(settings):
+    scene = bpy.context.scene
+    for path in RENDER_SETTINGS:
+        if path not in settings:
+            continue
+        owner_path, name = path.rsplit('.', 1)
+        owner = scene
+        for part in owner_path.split('.'):
+            owner = getattr(owner, part)
+        if value_to_tuple(getattr(owner, name)) != settings[path]:
+            try:
+                setattr(owner, name, settings[path])
+            except (TypeError, ValueError) as e:
+                print(f"Couldn't restore render setting {path}: {e}")
+
+def get_avatar_armature():
+    collection = bpy.data.collections.get("mainAvatar")
+    if collection is None:
+        return None
+    return next((obj for obj in collection.objects if obj.type == 'ARMATURE'), None)
+
+def capture_bone_rolls():
+    """
+    :return: (rolls rounded to 6 decimals, roll signature) of the avatar's armature, or None without an avatar.
+    """
+    armature = get_avatar_armature()
+    if armature is None:
+        return None
+    rolls = {name: round(roll, 6) for name, roll in bonerolls.get_bone_rolls(armature).items()}
+    return rolls, armature.data.get(bonerolls.ROLL_SIGNATURE_PROPERTY)
+
+def restore_bone_rolls(state):
+    armature = get_avatar_armature()
+    if state is None or armature is None or capture_bone_rolls() == state:
+        return
+    rolls, signature = state
+    bonerolls.set_bone_rolls(armature, rolls)
+    if signature is None:
+        if bonerolls.ROLL_SIGNATURE_PROPERTY in armature.data:
+            del armature.data[bonerolls.ROLL_SIGNATURE_PROPERTY]
+    else:
+        armature.data[bonerolls.ROLL_SIGNATURE_PROPERTY] = signature
+
+def capture_state():
+    """
+    Capture everything a job may change in the current scene.
+
+    :return: Dictionary describing the scene state.
+    """
+    scene = bpy.context.scene
+    return {
+        'data': {name: set(block.name for block in getattr(bpy.data, name)) for name in TRACKED_DATA},
+        'animation': capture_animation(),
+        'frame_range': (scene.frame_start, scene.frame_end, scene.frame_step, scene.frame_current),
+        'camera': scene.camera.name if scene.camera else None,
+        'render': capture_render_settings(),
+        'cameras': capture_cameras(),
+        'materials': capture_material_values(),
+        'bone_rolls': capture_bone_rolls(),
+    }
+
+def restore_state(state, keep_bone_rolls=False):
+    """
+    Put the scene back into a previously captured state: reassign the original actions, remove datablocks that
+    were added since, and restore frame range, active camera, render settings, material values and bone rolls.
+
+    :param state: Dictionary returned by capture_state.
+    :param keep_bone_rolls: Leave the avatar's bone rolls as the last file copied them, for a next file that copies
+        rolls itself: it skips Edit Mode when its source skeleton matches them, and otherwise puts the original rolls
+        (state['bone_rolls']) back while copying its own.
+    """
+    scene = bpy.context.scene
+
+    # Reassign the original actions (or none) to everything that is animated now
+    for obj in bpy.data.objects:
+        key = f"OBJECT:{obj.name}"
+        if obj.animation_data and (key in state['animation'] or obj.animation_data.action):
+            action_name = state['animation'].get(key)
+            obj.animation_data.action = bpy.data.actions.get(action_name) if action_name else None
+    for shape_key in bpy.data.shape_keys:
+        key = f"KEY:{shape_key.name}"
+        if shape_key.animation_data and (key in state['animation'] or shape_key.animation_data.action):
+            action_name = state['animation'].get(key)
+            shape_key.animation_data.action = bpy.data.actions.get(action_name) if action_name else None
+
+    # Remove everything that was added since the snapshot
+    added = []
+    for name in TRACKED_DATA:
+        added.extend(block for block in getattr(bpy.data, name) if block.name not in state['data'][name])
+    if added:
+        bpy.data.batch_remove(added)
+
+    scene.frame_start, scene.frame_end, scene.frame_step, scene.frame_current = state['frame_range']
+    scene.frame_set(scene.frame_current)
+
+    scene.camera = bpy.data.objects.get(state['camera']) if state['camera'] else None
+    restore_render_settings(state['render'])
+    if not keep_bone_rolls:
+        restore_bone_rolls(state['bone_rolls'])
+
+    for (mat_name, node_name, identifier), value in state['materials'].items():
+        mat = bpy.data.materials.get(mat_name)
+        if mat is None:
+            continue
+        node = mat.node_tree.nodes.get(node_name)
+        if node is None:
+            continue
+        for node_input in node.inputs:
+            if node_input.identifier == identifier and value_to_tuple(node_input.default_value) != value:
+                node_input.default_value = value
+
+def verify_state(state, keep_bone_rolls=False):
+    """
+    Compare the current scene with a captured state.
+
+    :param state: Dictionary returned by capture_state.
+    :param keep_bone_rolls: The bone rolls were deliberately kept by restore_state, don't compare them.
+    :return: List of human readable differences; empty if nothing leaked.
+    """
+    current = capture_state()
+    leaks = []
+
+    for name in TRACKED_DATA:
+        extra = current['data'][name] - state['data'][name]
+        missing = state['data'][name] - current['data'][name]
+        if extra:
+            leaks.append(f"{name} added: {sorted(extra)}")
+        if missing:
+            leaks.append(f"{name} removed: {sorted(missing)}")
+
+    for key in set(state['animation']) | set(current['animation']):
+        if state['animation'].get(key) != current['animation'].get(key):
+            leaks.append(f"{key} action is {current['animation'].get(key)}, expected {state['animation'].get(key)}")
+
+    if current['frame_range'] != state['frame_range']:
+        leaks.append(f"frame range is {current['frame_range']}, expected {state['frame_range']}")
+
+    if current['camera'] != state['camera']:
+        leaks.append(f"active camera is {current['camera']}, expected {state['camera']}")
+
+    for key, value in state['render'].items():
+        if current['render'].get(key) != value:
+            leaks.append(f"render setting {key} is {current['render'].get(key)}, expected {value}")
+
+    if current['cameras'] != state['cameras']:
+        for name in set(state['cameras']) | set(current['cameras']):
+            if state['cameras'].get(name) != current['cameras'].get(name):
+                leaks.append(f"camera {name} changed (transform, modifiers or constraints)")
+
+    changed = [key for key, value in state['materials'].items() if current['materials'].get(key) != value]
+    for mat_name, node_name, identifier in changed:
+        leaks.append(f"material {mat_name} node {node_name} input {identifier} changed")
+
+    if not keep_bone_rolls and current['bone_rolls'] != state['bone_rolls']:
+        leaks.append("bone rolls of the avatar changed")
+
+    return leaks
@@ -0,0 +1,115 @@
+import os
+import time
+import subprocess
+
+def threads_per_job(jobs, cpu_count=None):
+    """
+    Split the available CPU threads evenly over concurrently running jobs.
+
+    :param jobs: Number of jobs running at the same time.
+    :param cpu_count: Number of CPU threads to split (default: all threads of this machine).
+    :return: Number of threads each job may use, at least 1.
+    """
+    if cpu_count is None:
+        cpu_count = os.cpu_count() or 1
+    return max(1, cpu_count // max(1, jobs))
+
+class JobScheduler:
+    def __init__(self, jobs=1, poll_interval=0.2, terminate_timeout=10, monitor=None):
+        """
+        Run Blender commands concurrently, at most `jobs` at a time.
+
+        :param jobs: Maximum number of processes running at the same time.
+        :param poll_interval: Seconds between checks for finished processes.
+        :param terminate_timeout: Seconds to wait for a process to exit after cancelling it before killing it.
+        :param monitor: Optional JobMonitor that captures each job's output in a log file and reports progress.
+        """
+        self.jobs = max(1, jobs)
+        self.monitor = monitor
+        self.poll_interval = poll_interval
+        self.terminate_timeout = terminate_timeout
+        self.results = []
+
+    def start_job(self, name, command):
+        if self.monitor:
+            print(f"Starting job {name}, log: {self.monitor.get_log_path(name)}")
+            return self.monitor.start_process(name, command)
+        print(f"Running Blender command:\n{command}\n")
+        return subprocess.Popen(command)
+
+    def finish_job(self, name, returncode):
+        if self.monitor:
+            self.monitor.job_finished(name, returncode)
+
+    def run(self, commands):
+        """
+        Run all commands and wait for them to finish. Ctrl-C cancels running and pending jobs.
+
+        :param commands: List of (name, command) tuples.
+        :return: List of result dicts with name, returncode and seconds. A returncode of None means cancelled.
+        """
+        pending = list(commands)
+        running = []
+
+        try:
+            while pending or running:
+                while pending and len(running) < self.jobs:
+                    name, command = pending.pop(0)
+                    running.append((name, self.start_job(name, command), time.time()))
+
+                for job in list(running):
+                    name, process, start = job
+                    returncode = process.poll()
+                    if returncode is not None:
+                        running.remove(job)
+                        self.finish_job(name, returncode)
+                        self.results.append({'name': name, 'returncode': returncode, 'seconds': time.time() - start})
+                        print(f"Job {name} finished with exit code {returncode} after {time.time() - start:.1f}s")
+
+                time.sleep(self.poll_interval)
+        except KeyboardInterrupt:
+            print(f"\nCancelling {len(running)} running and {len(pending)} pending jobs...")
+            self.cancel(running)
+            for name, _ in pending:
+                self.results.append({'name': name, 'returncode': None, 'seconds': None})
+
+        return self.results
+
+    def cancel(self, running):
+        for _, process, _ in running:
+            if process.poll() is None:
+                process.terminate()
+
+        for name, process, start in running:
+            try:
+                process.wait(timeout=self.terminate_timeout)
+            except subprocess.TimeoutExpired:
+                process.kill()
+                process.wait()
+            self.finish_job(name, None)
+            self.results.append({'name': name, 'returncode': None, 'seconds': time.time() - start})
+
+def print_summary(results):
+    """
+    Print a per-job overview and totals for a finished run.
+
+    :param results: List of result dicts as returned by JobScheduler.run or BlenderWorkerPool.run.
+    :return: True if every job succeeded.
+    """
+    succeeded = [r for r in results if r['returncode'] == 0]
+    cancelled = [r for r in results if r['returncode'] is None]
+    failed = [r for r in results if r['returncode'] not in (0, None)]
+
+    print("\nRun summary:")
+    for r in results:
+        if r['returncode'] is None:
+            status = "cancelled"
+        elif r['returncode'] == 0:
+            status = "ok"
+        else:
+            status = f"failed (exit code {r['returncode']})"
+        seconds = f"{r['seconds']:.1f}s" if r['seconds'] is not None else "-"
+        print(f"  {r['name']}: {status}, {seconds}")
+
+    print(f"{len(succeeded)} succeeded, {len(failed)} failed, {len(cancelled)} cancelled out of {len(results)} jobs.")
+    return len(succeeded) == len(results)
@@ -0,0 +1,170 @@
+import os
+import sys
+import json
+import time
+import math
+import contextlib
+
+try:
+    import resource
+except ImportError:
+    # Not available on Windows; peak memory is left out of the records there
+    resource = None
+
+# Per-stage timing records. Every Blender process appends one JSON line per stage (import, bone rolls, transfer,
+# camera modifiers, rendering a camera, ...) and per rendered frame to its own file in the stats folder:
+#
+#   {"job": "clip_01", "stage": "transfer", "wall": 3.2, "cpu": 3.1, "process_peak_rss_mb": 812.4, "job_peak_growth_mb": 96.0}
+#   {"job": "clip_01", "stage": "frame", "camera": "Cam_Front", "frame": 12, "wall": 1.9, ...}
+#
+# Peak memory comes from the operating system's peak resident size, which only ever grows over a process's
+# lifetime. process_peak_rss_mb is that peak; in pool and batch mode it includes the jobs the process ran before.
+# job_peak_growth_mb is how far the current job raised it: a job that needs less memory than an earlier one in the
+# same process shows 0.
+#
+# main.py reads all records of a run afterwards and prints percentiles per stage.
+
+FRAME_STAGE = "frame"
+
+stats_path = None
+job_name = None
+job_peak_start = None
+frame_start = None
+
+def configure(stats_dir, job):
+    """
+    Start writing records for a job. Each process and job gets its own file, so no two processes ever append to
+    the same file.
+
+    :param stats_dir: Folder to write the records to, or None to disable recording.
+    :param job: Name of the job the records belong to.
+    """
+    global stats_path, job_name, job_peak_start
+    job_name = job
+    job_peak_start = peak_rss_mb()
+    if stats_dir is None:
+        stats_path = None
+        return
+    os.makedirs(stats_dir, exist_ok=True)
+    stats_path = os.path.join(stats_dir, f"{job}_{os.getpid()}.jsonl")
+
+def is_enabled():
+    return stats_path is not None
+
+def peak_rss_mb():
+    """
+    :return: Peak resident memory of this process so far in MB, or None if it can't be measured.
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+def write_record(record):
+    if stats_path is None:
+        return
+    peak = peak_rss_mb()
+    growth = peak - job_peak_start if peak is not None and job_peak_start is not None else None
+    record = dict(record, job=job_name, process_peak_rss_mb=peak, job_peak_growth_mb=growth)
+    with open(stats_path, 'a') as f:
+        f.write(json.dumps(record) + "\n")
+
+@contextlib.contextmanager
+def stage(name, **fields):
+    """
+    Measure wall and CPU time of a block and record it as a stage. Does nothing when recording is disabled.
+
+    :param name: Name of the stage.
+    :param fields: Extra fields for the record, e.g. the camera name.
+    """
+    if stats_path is None:
+        yield
+        return
+
+    wall, cpu = time.perf_counter(), time.process_time()
+    try:
+        yield
+    finally:
+        write_record(dict(fields, stage=name, wall=time.perf_counter() - wall, cpu=time.process_time() - cpu))
+
+def frame_started():
+    global frame_start
+    frame_start = (time.perf_counter(), time.process_time())
+
+def frame_finished(camera_name, frame):
+    if frame_start is None:
+        return
+    wall, cpu = frame_start
+    write_record({'stage': FRAME_STAGE, 'camera': camera_name, 'frame': frame,
+                  'wall': time.perf_counter() - wall, 'cpu': time.process_time() - cpu})
+
+def load_records(stats_dir):
+    """
+    Read all records written to a stats folder.
+
+    :return: List of record dicts.
+    """
+    records = []
+    for file_name in sorted(os.listdir(stats_dir)):
+        if not file_name.endswith('.jsonl'):
+            continue
+        with open(os.path.join(stats_dir, file_name), 'r') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    # A process that was killed mid-write leaves a partial last line
+                    continue
+    return records
+
+def percentile(values, p):
+    """
+    Nearest-rank percentile of a list of numbers.
+    """
+    values = sorted(values)
+    return values[max(0, math.ceil(p / 100 * len(values)) - 1)]
+
+def summarize(records):
+    """
+    Aggregate the records per stage.
+
+    :return: Dictionary from stage name to count, total wall and CPU time, wall time percentiles, the highest process
+        peak memory and the largest growth of the peak within one job.
+    """
+    stages = {}
+    for record in records:
+        stages.setdefault(record['stage'], []).append(record)
+
+    summary = {}
+    for name, stage_records in stages.items():
+        walls = [r['wall'] for r in stage_records]
+        peaks = [r['process_peak_rss_mb'] for r in stage_records if r.get('process_peak_rss_mb') is not None]
+        growths = [r['job_peak_growth_mb'] for r in stage_records if r.get('job_peak_growth_mb') is not None]
+        summary[name] = {
+            'count': len(stage_records),
+            'jobs': len(set(r.get('job') for r in stage_records)),
+            'wall_total': sum(walls),
+            'cpu_total': sum(r['cpu'] for r in stage_records),
+            'p50': percentile(walls, 50),
+            'p90': percentile(walls, 90),
+            'p99': percentile(walls, 99),
+            'max': max(walls),
+            'process_peak_rss_mb': max(peaks) if peaks else None,
+            'job_peak_growth_mb': max(growths) if growths else None,
+        }
+    return summary
+
+def print_summary(summary):
+    """
+    Print the per-stage summary, stages with the most total wall time first.
+    """
+    print("\nStage summary (wall seconds):")
+    print(f"  {'stage':<20} {'count':>6} {'total':>9} {'cpu':>9} {'p50':>8} {'p90':>8} {'p99':>8} {'max':>8} {'proc peak MB':>13} {'job +MB':>8}")
+    for name, s in sorted(summary.items(), key=lambda item: -item[1]['wall_total']):
+        peak = f"{s['process_peak_rss_mb']:.0f}" if s['process_peak_rss_mb'] is not None else "-"
+        growth = f"{s['job_peak_growth_mb']:.0f}" if s['job_peak_growth_mb'] is not None else "-"
+        print(f"  {name:<20} {s['count']:>6} {s['wall_total']:>9.1f} {s['cpu_total']:>9.1f} {s['p50']:>8.2f} {s['p90']:>8.2f} {s['p99']:>8.2f} {s['max']:>8.2f} {peak:>13} {growth:>8}")
@@ -0,0 +1,125 @@
+import os
+import sys
+import shutil
+import subprocess
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+STUB_ENCODER_SCRIPT = os.path.join(script_dir, "optionalScripts", "stubEncoder.py")
+
+def find_ffmpeg():
+    return shutil.which("ffmpeg")
+
+class VideoEncoder:
+    def __init__(self, output_path, fps, codec='libx264', crf=18, ffmpeg_path=None, stub_encoder=False):
+        """
+        Encoder process that receives finished frames on stdin while rendering continues.
+
+        :param output_path: Video file to write.
+        :param fps: Frame rate of the video.
+        :param codec: ffmpeg video codec.
+        :param crf: Constant rate factor (quality) for the codec.
+        :param ffmpeg_path: Path to ffmpeg.
+        :param stub_encoder: Use the stub encoder instead of ffmpeg. It only concatenates the frames, so it is meant for
+            checks of the streaming itself, never for real renders.
+        """
+        self.output_path = output_path
+        self.frames = 0
+        if stub_encoder:
+            self.command = [sys.executable, STUB_ENCODER_SCRIPT, output_path]
+        elif ffmpeg_path:
+            self.command = [
+                ffmpeg_path, '-y', '-loglevel', 'error',
+                '-f', 'image2pipe', '-framerate', str(fps), '-i', '-',
+                '-c:v', codec, '-pix_fmt', 'yuv420p', '-crf', str(crf),
+                output_path,
+            ]
+        else:
+            raise ValueError("No ffmpeg path given for the video encoder")
+        self.process = subprocess.Popen(self.command, stdin=subprocess.PIPE)
+
+    def add_frame(self, path):
+        """
+        :return: False if the encoder has exited and can't take the frame.
+        """
+        with open(path, 'rb') as f:
+            data = f.read()
+        try:
+            # Writing blocks when the encoder falls behind, which keeps memory bounded
+            self.process.stdin.write(data)
+        except (BrokenPipeError, OSError):
+            return False
+        self.frames += 1
+        return True
+
+    def close(self):
+        """
+        Finish the video.
+
+        :return: Exit code of the encoder.
+        """
+        try:
+            self.process.stdin.close()
+        except (BrokenPipeError, OSError):
+            pass
+        return self.process.wait()
+
+class VideoStreamSink:
+    def __init__(self, fps, codec='libx264', crf=18, keep_frames=False, stub_encoder=False):
+        """
+        Frame sink for CamerasRenderer that streams every written frame into one encoder per camera, so encoding
+        overlaps with rendering. The video is written next to the frames as <camera>/<camera>.mp4.
+
+        :param fps: Frame rate of the videos.
+        :param codec: ffmpeg video codec.
+        :param crf: Constant rate factor (quality) for the codec.
+        :param keep_frames: Keep the lossless frames as an archive instead of deleting them once the video is
+            finished. Frames of an encoder that failed are always kept.
+        :param stub_encoder: Stream into the stub encoder instead of ffmpeg, for checking the sink without ffmpeg.
+            The stub writes no real video, so the frames are always kept.
+        """
+        self.fps = fps
+        self.codec = codec
+        self.crf = crf
+        self.keep_frames = keep_frames or stub_encoder
+        self.stub_encoder = stub_encoder
+        self.encoders = {}
+        self.frame_paths = {}
+        self.ffmpeg_path = None if stub_encoder else find_ffmpeg()
+        if not stub_encoder and not self.ffmpeg_path:
+            raise RuntimeError("ffmpeg not found on the PATH, can't stream the frames into a video")
+
+    def frame_written(self, camera_name, frame, path):
+        encoder = self.encoders.get(camera_name)
+        if encoder is None:
+            extension = '.frames' if self.stub_encoder else '.mp4'
+            output_path = os.path.join(os.path.dirname(path), camera_name + extension)
+            encoder = VideoEncoder(output_path, self.fps, codec=self.codec, crf=self.crf, ffmpeg_path=self.ffmpeg_path,
+                                   stub_encoder=self.stub_encoder)
+            self.encoders[camera_name] = encoder
+            self.frame_paths[camera_name] = []
+
+        if not encoder.add_frame(path):
+            print(f"Warning: encoder for {camera_name} stopped, frame {frame} is only kept as {path}")
+        self.frame_paths[camera_name].append(path)
+
+    def finish(self):
+        """
+        Finish every video, then delete its frames unless keep_frames is set or the encoder failed.
+
+        :return: True if every encoder finished successfully.
+        """
+        success = True
+        for camera_name, encoder in self.encoders.items():
+            returncode = encoder.close()
+            if returncode != 0 or encoder.frames != len(self.frame_paths[camera_name]):
+                print(f"Warning: encoder for {camera_name} exited with code {returncode} after {encoder.frames} of "
+                      f"{len(self.frame_paths[camera_name])} frames, keeping its frames")
+                success = False
+                continue
+            print(f"Encoded {encoder.frames} frames of {camera_name} into {encoder.output_path}")
+            if not self.keep_frames:
+                for path in self.frame_paths[camera_name]:
+                    os.remove(path)
+        self.encoders = {}
+        self.frame_paths = {}
+        return success
@@ -0,0 +1,244 @@
+import os
+import json
+import time
+import threading
+import traceback
+
+# Daemon mode of main.py: watches the input folder and renders every new or changed animation file as soon as it
+# stopped growing, on a pool of warm Blender workers that stays up between files. Which files were handled is
+# persisted in a state file, so a restarted daemon neither renders them again nor forgets the ones it was still
+# working on. Jobs run on a pool for the scene they were built for: when a new prepared scene comes up (the scene
+# file or the options changed), a pool for it is started and the previous one is closed once its jobs are done.
+#
+# State file: {file name: {'size': bytes, 'mtime_ns': int, 'status': 'queued'|'done'|'failed'|'skipped', 'time': epoch}}
+
+STATE_FILE = "watch_state.json"
+
+class WatchState:
+    def __init__(self, path):
+        self.path = path
+        self.files = {}
+        self.lock = threading.Lock()
+        if os.path.isfile(path):
+            try:
+                with open(path, 'r') as f:
+                    self.files = json.load(f)
+            except ValueError:
+                print(f"Warning: watch state {path} is unreadable, starting with an empty state")
+
+    def get(self, file_name):
+        return self.files.get(file_name)
+
+    def mark(self, file_name, stat, status):
+        """
+        Record the status of a file version and write the state file.
+        """
+        with self.lock:
+            self.files[file_name] = {'size': stat[0], 'mtime_ns': stat[1], 'status': status, 'time': time.time()}
+            temp_path = self.path + ".tmp"
+            with open(temp_path, 'w') as f:
+                json.dump(self.files, f, indent=2)
+            os.replace(temp_path, self.path)
+
+class FolderWatcher:
+    def __init__(self, input_folder, list_files, state, settle_seconds=10):
+        """
+        :param input_folder: Folder to watch.
+        :param list_files: Callable returning the animation file names in the folder.
+        :param state: WatchState with the files that were already handled.
+        :param settle_seconds: Seconds a file's size and modification time must stay the same before it is used.
+        """
+        self.input_folder = input_folder
+        self.list_files = list_files
+        self.state = state
+        self.settle_seconds = settle_seconds
+        self.seen = {}
+        self.in_progress = set()
+
+    def stat(self, file_name):
+        stat = os.stat(os.path.join(self.input_folder, file_name))
+        return stat.st_size, stat.st_mtime_ns
+
+    def is_handled(self, file_name, stat):
+        """
+        A file is handled if this version of it finished (or was skipped), or it is being rendered right now. Files
+        the state still lists as queued were interrupted by a restart and are picked up again.
+        """
+        if file_name in self.in_progress:
+            return True
+        entry = self.state.get(file_name)
+        if entry is None or (entry['size'], entry['mtime_ns']) != tuple(stat):
+            return False
+        return entry['status'] != 'queued'
+
+    def poll(self):
+        """
+        :return: Names of the files that stopped changing and weren't handled yet, with their (size, mtime) stats.
+        """
+        now = time.time()
+        ready = []
+        current = set()
+        for file_name in self.list_files():
+            try:
+                stat = self.stat(file_name)
+            except OSError:
+                continue
+            current.add(file_name)
+
+            last = self.seen.get(file_name)
+            if last is None or last[0] != stat:
+                # New or still being written
+                self.seen[file_name] = (stat, now)
+                continue
+            if now - last[1] < self.settle_seconds or stat[0] == 0:
+                continue
+            if not self.is_handled(file_name, stat):
+                ready.append((file_name, stat))
+
+        # Forget files that disappeared
+        for file_name in set(self.seen) - current:
+            del self.seen[file_name]
+        return ready
+
+class WatchDaemon:
+    def __init__(self, input_folder, list_files, launch, create_pool, state_path, settle_seconds=10, poll_interval=5):
+        """
+        :param input_folder: Folder to watch.
+        :param list_files: Callable returning the animation file names in the folder.
+        :param launch: Callable(file_names, submit_job) that builds the jobs for these files and passes each of them
+            to submit_job(name, job_args, scene_path).
+        :param create_pool: Callable(scene_path) returning a started BlenderWorkerPool.
+        :param state_path: Path to the state file.
+        :param settle_seconds: Seconds a file must stop changing before it is rendered.
+        :param poll_interval: Seconds between scans of the input folder.
+        """
+        self.launch = launch
+        self.create_pool = create_pool
+        self.poll_interval = poll_interval
+        self.state = WatchState(state_path)
+        self.watcher = FolderWatcher(input_folder, list_files, self.state, settle_seconds)
+        self.pools = {}
+        self.scene_path = None
+        self.jobs = {}
+        self.files = {}
+        self.lock = threading.Lock()
+        self.stopping = False
+
+    def submit_job(self, name, job_args, scene_path):
+        file_name = os.path.basename(job_args[0])
+        with self.lock:
+            self.jobs[name] = (file_name, scene_path)
+            self.files[file_name]['jobs'] += 1
+            self.files[file_name]['submitted'] += 1
+        if scene_path not in self.pools:
+            if self.pools:
+                print(f"\nWatch: the scene changed to {scene_path}, starting workers for it")
+            self.pools[scene_path] = self.__start_pool(scene_path)
+        self.scene_path = scene_path
+        self.pools[scene_path].submit(name, job_args)
+
+    def __start_pool(self, scene_path, jobs=()):
+        pool = self.create_pool(scene_path)
+        pool.on_result = self.job_finished
+        pool.serve()
+        for name, job_args in jobs:
+            pool.submit(name, job_args)
+        return pool
+
+    def job_finished(self, result):
+        if self.stopping:
+            # Jobs cut off by the shutdown stay queued in the state and run again after a restart
+            return
+        with self.lock:
+            job = self.jobs.pop(result['name'], None)
+            if job is None:
+                return
+            file_name = job[0]
+            entry = self.files[file_name]
+            entry['jobs'] -= 1
+            entry['failed'] = entry['failed'] or result['returncode'] != 0
+            if entry['jobs'] > 0 or entry['launching']:
+                return
+            del self.files[file_name]
+        self.__finish_file(file_name, entry)
+
+    def __finish_file(self, file_name, entry):
+        if entry['failed']:
+            status = 'failed'
+        elif entry['submitted']:
+            status = 'done'
+        else:
+            # No jobs: already rendered or left out by the checks
+            status = 'skipped'
+        self.watcher.in_progress.discard(file_name)
+        self.state.mark(file_name, entry['stat'], status)
+        print(f"\nWatch: {file_name} {status} after {time.time() - entry['start']:.0f}s")
+
+    def check_pool(self):
+        """
+        Close the pools of earlier scenes once their jobs are done. Restart a pool if all of its workers died, and
+        hand them the jobs that were still waiting.
+        """
+        for scene_path, pool in list(self.pools.items()):
+            if scene_path != self.scene_path:
+                with self.lock:
+                    running = any(job_scene == scene_path for _, job_scene in self.jobs.values())
+                if not running:
+                    print(f"\nWatch: closing the workers of the previous scene {scene_path}")
+                    del self.pools[scene_path]
+                    pool.close()
+                    continue
+            if pool.serving_workers() > 0:
+                continue
+            print("Watch: every Blender worker stopped, restarting the pool")
+            jobs = pool.pending_jobs()
+            pool.close()
+            self.pools[scene_path] = self.__start_pool(scene_path, jobs)
+
+    def ingest(self, ready):
+        file_names = [file_name for file_name, _ in ready]
+        print(f"\nWatch: new input {', '.join(file_names)}")
+        with self.lock:
+            for file_name, stat in ready:
+                self.files[file_name] = {'stat': stat, 'jobs': 0, 'submitted': 0, 'failed': False, 'launching': True, 'start': time.time()}
+                self.watcher.in_progress.add(file_name)
+        for file_name, stat in ready:
+            self.state.mark(file_name, stat, 'queued')
+
+        try:
+            self.launch(file_names, self.submit_job)
+        except Exception:
+            traceback.print_exc()
+            with self.lock:
+                for file_name in file_names:
+                    self.files[file_name]['failed'] = True
+
+        # Files whose jobs all finished already, or that got none, are done now
+        finished = []
+        with self.lock:
+            for file_name in file_names:
+                entry = self.files[file_name]
+                entry['launching'] = False
+                if entry['jobs'] == 0:
+                    finished.append((file_name, self.files.pop(file_name)))
+        for file_name, entry in finished:
+            self.__finish_file(file_name, entry)
+
+    def run(self):
+        """
+        Watch the folder until interrupted with Ctrl+C.
+        """
+        print(f"Watching {self.watcher.input_folder} (state: {self.state.path}). Press Ctrl+C to stop.")
+        try:
+            while True:
+                ready = self.watcher.poll()
+                if ready:
+                    self.ingest(ready)
+                self.check_pool()
+                time.sleep(self.poll_interval)
+        except KeyboardInterrupt:
+            print("\nWatch: stopping")
+        finally:
+            self.stopping = True
+            for pool in self.pools.values():
+                pool.close()
@@ -0,0 +1,267 @@
+import os
+import json
+import time
+import queue
+import socket
+import threading
+import subprocess
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+JOB_SERVER_SCRIPT = os.path.join(script_dir, "jobServer.py")
+
+class BlenderWorkerPool:
+    def __init__(self, blender_path, scene_path, workers=2, deheaded=True, connect_timeout=600):
+        """
+        Pool of long-lived Blender processes that each run jobServer.py and process jobs one after another.
+
+        :param blender_path: Path to the Blender executable.
+        :param scene_path: Scene every worker loads and resets to between jobs.
+        :param workers: Number of Blender processes to start.
+        :param deheaded: Run the workers in background mode.
+        :param connect_timeout: Seconds to wait for a worker to finish starting up.
+        """
+        self.blender_path = blender_path
+        self.scene_path = scene_path
+        self.workers = workers
+        self.deheaded = deheaded
+        self.connect_timeout = connect_timeout
+        self.extra_blender_args = []
+        self.processes = []
+        self.connections = []
+        self.startup_seconds = []
+        self.results = []
+        self.server = None
+        self.monitor = None
+        self.current_jobs = {}
+        self.on_result = None
+        self.job_queue = None
+        self.stop_event = None
+        self.serve_threads = []
+
+    def build_worker_command(self, port, worker_id):
+        command = [self.blender_path, self.scene_path]
+        if self.deheaded:
+            command.append('--background')
+        command.extend(self.extra_blender_args)
+        command.extend([
+            '--python', JOB_SERVER_SCRIPT,
+            '--',
+            '--host', '127.0.0.1',
+            '--port', str(port),
+            '--worker', str(worker_id),
+        ])
+        return command
+
+    def start(self):
+        """
+        Spawn the Blender workers and wait until each of them has connected back.
+        """
+        self.server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.server.bind(('127.0.0.1', 0))
+        self.server.listen(self.workers)
+        self.server.settimeout(self.connect_timeout)
+        port = self.server.getsockname()[1]
+
+        spawn_times = {}
+        for worker_id in range(self.workers):
+            command = self.build_worker_command(port, worker_id)
+            print(f"Starting Blender worker {worker_id}:\n{command}\n")
+            spawn_times[worker_id] = time.time()
+            if self.monitor:
+                self.processes.append(self.__start_logged_worker(worker_id, command))
+            else:
+                self.processes.append(subprocess.Popen(command))
+
+        for _ in range(self.workers):
+            try:
+                conn, _ = self.server.accept()
+            except socket.timeout:
+                print(f"Warning: only {len(self.connections)} of {self.workers} Blender workers connected.")
+                break
+            stream = conn.makefile('rw', encoding='utf-8', newline='\n')
+            hello = json.loads(stream.readline())
+            worker_id = hello['worker']
+            self.startup_seconds.append(time.time() - spawn_times[worker_id])
+            self.connections.append((worker_id, conn, stream))
+            print(f"Blender worker {worker_id} ready after {self.startup_seconds[-1]:.1f}s")
+
+        if not self.connections:
+            raise RuntimeError("No Blender worker connected to the pool.")
+
+    def __start_logged_worker(self, worker_id, command):
+        # One log per worker process; each line also goes to the monitor under the job the worker is running
+        log_file = open(self.monitor.get_log_path(f"worker_{worker_id}"), 'w', encoding='utf-8', errors='replace')
+        env = dict(os.environ, PYTHONUNBUFFERED='1')
+        process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, encoding='utf-8', errors='replace', env=env)
+        thread = threading.Thread(target=self.__pump_worker_output, args=(worker_id, process.stdout, log_file), daemon=True)
+        thread.start()
+        return process
+
+    def __pump_worker_output(self, worker_id, pipe, log_file):
+        try:
+            for line in iter(pipe.readline, ''):
+                log_file.write(line)
+                log_file.flush()
+                name = self.current_jobs.get(worker_id)
+                if name:
+                    self.monitor.feed(name, line)
+        finally:
+            pipe.close()
+            log_file.close()
+
+    def __serve_worker(self, worker_id, stream, jobs, stop_event=None):
+        while True:
+            try:
+                if stop_event is None:
+                    name, job_args = jobs.get_nowait()
+                else:
+                    name, job_args = jobs.get(timeout=1)
+            except queue.Empty:
+                if stop_event is None or stop_event.is_set():
+                    return
+                continue
+
+            print(f"Worker {worker_id}: {name}")
+            if self.monitor:
+                self.monitor.job_started(name, self.monitor.get_log_path(f"worker_{worker_id}"))
+                self.current_jobs[worker_id] = name
+            try:
+                stream.write(json.dumps({'type': 'job', 'name': name, 'args': job_args}) + "\n")
+                stream.flush()
+                line = stream.readline()
+            except OSError:
+                line = ''
+
+            if not line:
+                # The worker died mid-job; record the failure and stop feeding this worker
+                print(f"Worker {worker_id} disconnected while running {name}")
+                self.__job_finished(worker_id, name, -1)
+                self.__record_result({'name': name, 'returncode': -1, 'seconds': None, 'reset_seconds': None})
+                return
+
+            reply = json.loads(line)
+            self.__job_finished(worker_id, name, reply['status'])
+            self.__record_result({
+                'name': name,
+                'returncode': reply['status'],
+                'seconds': reply['seconds'],
+                'reset_seconds': reply['reset_seconds'],
+            })
+
+    def __record_result(self, result):
+        self.results.append(result)
+        if self.on_result:
+            self.on_result(result)
+
+    def __job_finished(self, worker_id, name, returncode):
+        if self.monitor:
+            self.current_jobs.pop(worker_id, None)
+            self.monitor.job_finished(name, returncode)
+
+    def run(self, jobs):
+        """
+        Distribute jobs over the connected workers and block until all of them are done.
+
+        :param jobs: List of (name, args) tuples, args as expected by mainProcessing.process_file.
+        :return: List of result dicts with name, returncode, seconds and reset_seconds.
+        """
+        job_queue = queue.Queue()
+        for job in jobs:
+            job_queue.put(job)
+
+        threads = []
+        for worker_id, _, stream in self.connections:
+            thread = threading.Thread(target=self.__serve_worker, args=(worker_id, stream, job_queue), daemon=True)
+            thread.start()
+            threads.append(thread)
+        for thread in threads:
+            thread.join()
+
+        # Anything left over means every worker died
+        while not job_queue.empty():
+            name, _ = job_queue.get_nowait()
+            self.results.append({'name': name, 'returncode': -1, 'seconds': None, 'reset_seconds': None})
+
+        return self.results
+
+    def serve(self):
+        """
+        Keep the workers waiting for jobs added with submit() in the background, until close(). Set on_result to
+        get called with every finished job's result.
+        """
+        self.job_queue = queue.Queue()
+        self.stop_event = threading.Event()
+        for worker_id, _, stream in self.connections:
+            thread = threading.Thread(target=self.__serve_worker, args=(worker_id, stream, self.job_queue, self.stop_event), daemon=True)
+            thread.start()
+            self.serve_threads.append(thread)
+
+    def submit(self, name, job_args):
+        """
+        Queue a job for the next idle worker. Only after serve().
+        """
+        self.job_queue.put((name, job_args))
+
+    def serving_workers(self):
+        """
+        :return: Number of workers still taking jobs after serve(); 0 means every worker died.
+        """
+        return sum(1 for thread in self.serve_threads if thread.is_alive())
+
+    def pending_jobs(self):
+        """
+        Take the jobs that no worker picked up yet out of the queue.
+
+        :return: List of (name, args) tuples.
+        """
+        jobs = []
+        while self.job_queue is not None and not self.job_queue.empty():
+            jobs.append(self.job_queue.get_nowait())
+        return jobs
+
+    def close(self, timeout=30):
+        """
+        Ask all workers to quit and wait for their processes to exit.
+        """
+        if self.stop_event:
+            self.stop_event.set()
+        for _, conn, stream in self.connections:
+            try:
+                stream.write(json.dumps({'type': 'quit'}) + "\n")
+                stream.flush()
+                stream.close()
+                conn.close()
+            except OSError:
+                pass
+        self.connections = []
+
+        for process in self.processes:
+            try:
+                process.wait(timeout=timeout)
+            except subprocess.TimeoutExpired:
+                process.terminate()
+                process.wait()
+
+        if self.server:
+            self.server.close()
+            self.server = None
+
+    def report_startup_savings(self):
+        """
+        Print how much Blender startup time the pool saved compared to one process per job.
+        """
+        if not self.startup_seconds or not self.results:
+            return
+
+        startup = sum(self.startup_seconds) / len(self.startup_seconds)
+        resets = [r['reset_seconds'] for r in self.results if r['reset_seconds']]
+        reset = sum(resets) / len(resets) if resets else 0.0
+
+        # Every job after the first one on each worker pays a scene reset instead of a full startup
+        reused_jobs = max(0, len(self.results) - len(self.startup_seconds))
+        saved = reused_jobs * (startup - reset)
+        saved_per_job = saved / len(self.results)
+
+        print(f"\nWorker pool finished {len(self.results)} jobs on {len(self.startup_seconds)} workers.")
+        print(f"Average Blender startup: {startup:.1f}s, average scene reset between jobs: {reset:.1f}s")
+        print(f"Startup time saved: {saved:.1f}s in total, {saved_per_job:.1f}s per job")